@@ -0,0 +1,40 @@
+"""anomaly_stats
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'd4e5f6a7b8c9'
+down_revision = 'c3d4e5f6a7b8'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Write-time anomaly flags on activities, with a partial index for the top-N lookup
+    op.add_column('activities', sa.Column('z_score', sa.Float(), nullable=True))
+    op.add_column('activities', sa.Column('is_anomaly', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    op.create_index('idx_user_anomaly_carbon', 'activities', ['user_id', 'carbon_estimate'], unique=False,
+                    postgresql_where=sa.text('is_anomaly'))
+
+    # Running (decayed Welford) statistics per user
+    op.create_table('user_carbon_stats',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('count', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('mean', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('m2', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+def downgrade() -> None:
+    op.drop_table('user_carbon_stats')
+    op.drop_index('idx_user_anomaly_carbon', table_name='activities')
+    op.drop_column('activities', 'is_anomaly')
+    op.drop_column('activities', 'z_score')
@@ -0,0 +1,31 @@
+"""daily_carbon_rollup
+
+Revision ID: b2c3d4e5f6a7
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'b2c3d4e5f6a7'
+down_revision = 'a1b2c3d4e5f6'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Daily rollup; PK (user_id, day, activity_type) doubles as the time-series index
+    op.create_table('daily_carbon_rollup',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('activity_type', sa.String(), nullable=False, server_default=''),
+        sa.Column('total_carbon', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'activity_type')
+    )
+
+def downgrade() -> None:
+    op.drop_table('daily_carbon_rollup')
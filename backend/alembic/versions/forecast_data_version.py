@@ -0,0 +1,22 @@
+"""forecast_data_version
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2026-10-17 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5f6a7b8c9d0'
+down_revision = 'd4e5f6a7b8c9'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Existing rows have no version and are never served; the next nightly run fills it in
+    op.add_column('forecasts', sa.Column('data_version', sa.Integer(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('forecasts', 'data_version')
@@ -1,7 +1,24 @@
-@router.get("/", response_model=List[ActivityResponse])
+import asyncio
+import json
+from typing import Any, Dict, Optional
+from celery.result import AsyncResult
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from ..db.session import get_db
+from ..core.config import settings
+from ..schemas.schemas import ActivityBatchInferenceRequest, ActivityInferenceRequest, ActivityPage
+from ..services.activity_service import ActivityService
+from ..services.inference_events import inference_events
+from ..core.tasks import analyze_activity_batch_task, analyze_activity_task
+from .deps import get_current_user
+
+router = APIRouter()
+
+@router.get("/", response_model=ActivityPage)
 async def list_activities(
-    skip: int = 0, 
-    limit: int = 50, 
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
     activity_type: Optional[str] = None,
     current_user: str = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -9,31 +26,104 @@ async def list_activities(
     """
     Get activities with enterprise-grade pagination.
     Default limit is 50 to prevent memory overruns on large datasets.
+    Keyset (cursor) paging: pass the returned next_cursor to get the following page;
+    every page costs the same index range scan no matter how deep it is.
     """
-    query = db.query(Activity).filter(Activity.user_id == current_user)
-    
-    if activity_type:
-        query = query.filter(Activity.activity_type == activity_type)
-    
-    # High-performance sorted paging
-    activities = query.order_by(Activity.timestamp.desc()).offset(skip).limit(limit).all()
-    
-    return activities
+    try:
+        activities, next_cursor = ActivityService.get_activities(
+            db, current_user, cursor=cursor, limit=limit, activity_type=activity_type
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-router = APIRouter()
-from .deps import get_current_user
+    return {"items": activities, "next_cursor": next_cursor}
 
 @router.post("/infer", status_code=202)
 async def infer_activity(request: ActivityInferenceRequest, current_user: str = Depends(get_current_user)):
     """
     Async Inference: Submits data to the queue and returns a Task ID.
-    Clients should poll /infer/{task_id} for results.
+    Results are pushed on /infer/events, or fetched with a long poll on /infer/{task_id}?wait=30.
     """
     task = analyze_activity_task.delay(request.raw_data, current_user)
     return {"task_id": task.id, "status": "processing"}
 
+@router.post("/infer/batch", status_code=202)
+async def infer_activities_batch(request: ActivityBatchInferenceRequest, current_user: str = Depends(get_current_user)):
+    """
+    Batch Inference: one task for many blobs, packed into as few LLM calls as the token budget allows.
+    Poll /infer/{task_id}; the result lists the ids of the activities created, in request order.
+    The activities themselves are listed by GET / once written (within ACTIVITY_WRITE_BUFFER_FLUSH_MS).
+    """
+    if not request.raw_data:
+        raise HTTPException(status_code=400, detail="raw_data must contain at least one item")
+    if len(request.raw_data) > settings.INFERENCE_BATCH_MAX_BLOBS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.INFERENCE_BATCH_MAX_BLOBS} items per batch; split the request"
+        )
+
+    task = analyze_activity_batch_task.delay(request.raw_data, current_user)
+    return {"task_id": task.id, "status": "processing", "items": len(request.raw_data)}
+
+@router.get("/infer/events")
+async def stream_inference_events(current_user: str = Depends(get_current_user)):
+    """
+    Push delivery (Server-Sent Events): one `inference` event per finished task of the
+    current user, carrying the same payload as /infer/{task_id}. Replaces polling.
+    Activity ids in a result are pending until a later event for the same task reports
+    them "persisted" (or "persist_failed" if they could not be written).
+    """
+    async def _stream():
+        async with inference_events.subscribe(current_user) as events:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), settings.INFERENCE_EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: inference\nid: {event['task_id']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/infer/{task_id}")
-async def get_inference_result(task_id: str, current_user: str = Depends(get_current_user)):
+async def get_inference_result(
+    task_id: str,
+    wait: float = Query(0, ge=0, le=settings.INFERENCE_LONG_POLL_MAX_SECONDS),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Task status and result. With ?wait=N (seconds) this is a long poll: an unfinished task
+    is answered as soon as it completes, or with "processing" after N seconds.
+    """
+    # Result backend reads are blocking Redis round trips; keep them off the event loop
+    if not wait:
+        return await asyncio.to_thread(_task_status, task_id)
+
+    # Subscribe before checking, so a completion in between can't be missed
+    async with inference_events.subscribe(current_user) as events:
+        if await asyncio.to_thread(lambda: AsyncResult(task_id).ready()):
+            return await asyncio.to_thread(_task_status, task_id)
+        deadline = asyncio.get_running_loop().time() + wait
+        while True:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                return await asyncio.to_thread(_task_status, task_id)
+            try:
+                event = await asyncio.wait_for(events.get(), remaining)
+            except asyncio.TimeoutError:
+                # One last read, in case the event was lost (Redis reconnecting)
+                return await asyncio.to_thread(_task_status, task_id)
+            # Persistence events for the task come later and are for the event stream
+            if event.get("task_id") == task_id and event.get("status") in ("completed", "failed"):
+                return event
+
+def _task_status(task_id: str) -> Dict[str, Any]:
     task_result = AsyncResult(task_id)
     
     if task_result.state == 'PENDING':
@@ -1,25 +1,105 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status
+import os
+import uuid
+from typing import Literal
+from celery.result import AsyncResult
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Response, status
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from ..db.session import get_db
 from ..services.activity_service import ActivityService
+from ..services.import_validation import RejectionReport
+from ..core.config import settings
+from ..core.logger import logger
+from ..core.tasks import import_activities_task
+from .deps import get_current_user
 
 router = APIRouter()
 
 @router.post("/upload", status_code=status.HTTP_201_CREATED)
 async def bulk_upload_activities(
+    response: Response,
     file: UploadFile = File(...),
+    mode: Literal["inline", "stream", "async"] = Query(
+        "inline",
+        description=(
+            "'inline' parses the whole file at once; 'stream' loads it in bounded chunks via COPY; "
+            "'async' queues a background job and returns its ID immediately"
+        )
+    ),
     db: Session = Depends(get_db),
     current_user: str = Depends(get_current_user)
 ):
     """
     Mass Ingestion Endpoint.
     Delegates logic to ActivityService.
+    Use mode=stream for large exports: memory stays flat and the response
+    reports accepted/rejected rows per chunk.
+    Invalid rows are skipped and listed (row, column, reason); large rejection
+    reports are downloadable from /batch/reports/{rejection_report_id}.
+    Use mode=async for files that would outlive a proxy timeout: the upload is
+    spooled to disk and imported by a worker; poll /batch/jobs/{job_id}.
     """
     try:
-        count = await ActivityService.process_bulk_upload(file, db, current_user)
-        return {"message": f"Successfully imported {count} activities."}
+        if mode == "async":
+            job_id = str(uuid.uuid4())
+            spool_path = await ActivityService.spool_upload(file, job_id)
+            try:
+                import_activities_task.apply_async(args=[spool_path, current_user], task_id=job_id)
+            except Exception:
+                # No worker will ever pick the file up; don't leave it in the spool
+                os.remove(spool_path)
+                raise
+            response.status_code = status.HTTP_202_ACCEPTED
+            return {"job_id": job_id, "status": "queued"}
 
+        if mode == "stream":
+            report = await ActivityService.process_bulk_upload_streaming(file, db, current_user)
+        else:
+            report = await ActivityService.process_bulk_upload(file, db, current_user)
+
+        if report["rejection_report_id"]:
+            report["rejection_report_url"] = f"{settings.API_V1_STR}/batch/reports/{report['rejection_report_id']}"
+        return {
+            "message": f"Successfully imported {report['accepted']} activities ({report['rejected']} rejected).",
+            **report
+        }
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Bulk import failed: {e}")
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Bulk import failed: {str(e)}")
+
+@router.get("/reports/{report_id}")
+async def download_rejection_report(report_id: str, current_user: str = Depends(get_current_user)):
+    """
+    Downloads the full rejection report (CSV: row, column, reason) of a bulk import.
+    """
+    path = RejectionReport.path_for(current_user, report_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Report not found.")
+    return FileResponse(path, media_type="text/csv", filename=f"rejections_{report_id}.csv")
+
+@router.get("/jobs/{job_id}")
+async def get_import_job(job_id: str, current_user: str = Depends(get_current_user)):
+    """
+    Progress of a background import: rows processed, throughput and final status.
+    """
+    job = AsyncResult(job_id, app=import_activities_task.app)
+    info = job.info if isinstance(job.info, dict) else {}
+
+    if job.state == 'PENDING':
+        # Unknown IDs are indistinguishable from queued jobs in the result backend
+        return {"job_id": job_id, "status": "queued"}
+    if job.state == 'STARTED':
+        # Picked up by a worker but no chunk finished yet (meta carries no owner at this point)
+        return {"job_id": job_id, "status": "running", "rows_processed": 0}
+    if info.get("user_id") != current_user:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    if job.state == 'PROGRESS':
+        return {"job_id": job_id, "status": "running", **info}
+    if job.state == 'SUCCESS':
+        return {"job_id": job_id, **info}
+    return {"job_id": job_id, "status": job.state.lower()}
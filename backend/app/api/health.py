@@ -1,9 +1,11 @@
+import asyncio
 from fastapi import APIRouter, Depends, status, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from ..db.session import get_db
 from ..core.config import settings
 from ..db.neo4j_driver import neo4j_driver
+from ..services.circuit_breaker import llm_breaker
 import redis
 
 router = APIRouter()
@@ -16,13 +18,16 @@ async def health_check(db: Session = Depends(get_db)):
     1. PostgreSQL (Primary DB)
     2. Redis (Cache/Queue)
     3. Neo4j (Graph DB)
+    Also reports the shared LLM circuit breaker; an open circuit means inference is
+    running on local fallbacks, which is reported but does not fail the check.
     """
     health_status = {
         "status": "healthy",
         "components": {
             "postgres": "unknown",
             "redis": "unknown",
-            "neo4j": "unknown"
+            "neo4j": "unknown",
+            "llm_circuit": "unknown"
         }
     }
     has_error = False
@@ -55,6 +60,9 @@ async def health_check(db: Session = Depends(get_db)):
         health_status["components"]["neo4j"] = f"down: {str(e)}"
         has_error = True
 
+    # 4. LLM circuit breaker (informational)
+    health_status["components"]["llm_circuit"] = await asyncio.to_thread(llm_breaker.state)
+
     if has_error:
         health_status["status"] = "degraded"
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=health_status)
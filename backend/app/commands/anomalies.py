@@ -0,0 +1,31 @@
+"""
+Maintenance command for write-time anomaly scoring.
+
+    python -m app.commands.anomalies rebuild [--user-id UUID]
+
+Seeds user_carbon_stats from the last 90 days of activities and re-flags that
+window. Run once after the anomaly_stats migration; afterwards every write path
+keeps the stats current.
+"""
+import argparse
+import sys
+from ..db.session import SessionLocal
+from ..services.anomaly_service import AnomalyService
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.commands.anomalies", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=["rebuild"])
+    parser.add_argument("--user-id", help="Limit to one user (default: all users)")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        seeded = AnomalyService.rebuild(db, args.user_id)
+        print(f"Seeded anomaly stats for {seeded} users.")
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+"""
+Nightly batch forecast precompute.
+
+    python -m app.commands.forecast [--chunk-size N] [--workers N]
+
+Fits every active user's 60-day linear trend from daily_carbon_rollup in
+vectorized chunks and upserts the results into the forecasts table, which
+/analytics/forecast serves directly. Schedule it after the rollup reconcile.
+"""
+import argparse
+import sys
+from ..core.config import settings
+from ..services.batch_forecast import BatchForecastEngine
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.commands.forecast", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=settings.FORECAST_BATCH_CHUNK_USERS,
+                        help="Users per vectorized chunk (bounds memory)")
+    parser.add_argument("--workers", type=int, default=0, help="Spread chunks over N processes (0 = inline)")
+    args = parser.parse_args(argv)
+
+    result = BatchForecastEngine(chunk_size=args.chunk_size, workers=args.workers).run()
+    print(f"Wrote {result['forecasts']} forecasts in {result['chunks']} chunks.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
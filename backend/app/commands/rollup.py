@@ -0,0 +1,41 @@
+"""
+Maintenance command for the daily carbon rollup.
+
+    python -m app.commands.rollup backfill [--user-id UUID] [--since YYYY-MM-DD]
+    python -m app.commands.rollup reconcile [--user-id UUID] [--since YYYY-MM-DD] [--fix]
+
+Run `backfill` once after applying the daily_carbon_rollup migration, and
+`reconcile` periodically (e.g. nightly) to detect and repair drift.
+"""
+import argparse
+import sys
+from datetime import date
+from ..db.session import SessionLocal
+from ..services.rollup_service import RollupService
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.commands.rollup", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=["backfill", "reconcile"])
+    parser.add_argument("--user-id", help="Limit to one user (default: all users)")
+    parser.add_argument("--since", type=date.fromisoformat, help="Limit to days on/after this date (UTC)")
+    parser.add_argument("--fix", action="store_true", help="reconcile: rebuild the scope if drift is found")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.action == "backfill":
+            rows = RollupService.rebuild(db, args.user_id, args.since)
+            print(f"Backfilled {rows} rollup rows.")
+            return 0
+
+        report = RollupService.reconcile(db, args.user_id, args.since, fix=args.fix)
+        print(f"Drifted groups: {report['drifted_groups']}"
+              + (f", rebuilt {report['rebuilt_rows']} rows." if report["rebuilt_rows"] is not None else "."))
+        # Non-zero exit on unrepaired drift so cron/CI can alert on it
+        return 1 if report["drifted_groups"] and not args.fix else 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -65,6 +65,7 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "EcoTwin"
     API_V1_STR: str = "/api/v1"
     ENVIRONMENT: Literal["development", "staging", "production"] = "development"
+    LOG_LEVEL: str = "INFO"
     
     # Security
     SECRET_KEY: str = "CHANGEME_IN_PRODUCTION"
@@ -83,6 +84,89 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY: Optional[str] = None
     REDIS_URL: RedisDsn = "redis://cache:6379/0"
 
+    # Bulk Ingestion
+    BULK_UPLOAD_CHUNK_ROWS: int = 50_000   # Rows parsed/validated per chunk in streaming mode
+    BULK_INSERT_BATCH_SIZE: int = 5_000    # Rows per multi-row INSERT when COPY is unavailable
+    IMPORT_MAX_CARBON_ESTIMATE: float = 100_000.0  # kg CO2e; larger values are rejected as implausible
+    IMPORT_REJECTIONS_INLINE_LIMIT: int = 100      # Larger rejection reports are offered as a download
+    IMPORT_REPORT_DIR: str = "/tmp/ecotwin/import_reports"
+    IMPORT_SPOOL_DIR: str = "/tmp/ecotwin/import_spool"  # Must be shared by the API and import workers
+    IMPORT_QUEUE: str = "imports"  # Celery queue for bulk imports, kept apart from inference
+    ACTIVITY_WRITE_BUFFER_ROWS: int = 500         # Inferred activities per flush (multi-row INSERT)
+    ACTIVITY_WRITE_BUFFER_FLUSH_MS: int = 1_000   # Max time an inferred activity waits in the buffer
+    ACTIVITY_WRITE_BUFFER_MAX_PENDING: int = 20_000  # Rows kept across failed flushes before dropping
+    WORKER_METRICS_PORT: int = 9808  # Prometheus endpoint of each Celery worker; 0 disables it
+
+    # Graph
+    NEO4J_MAX_POOL_SIZE: int = 50                      # Per driver (sync and async each have one)
+    NEO4J_POOL_ACQUISITION_TIMEOUT_SECONDS: float = 10.0
+    GRAPH_WRITE_BATCH_SIZE: int = 1_000      # Rows per UNWIND transaction in bulk graph writes
+    GRAPH_PROJECTION_ENABLED: bool = False   # Mirror new activities into Neo4j on ingest/inference
+    COLLAB_SESSION_TTL_SECONDS: int = 24 * 3600  # Shared-twin sessions expire unless used
+    IMPACT_MAX_DEPTH: int = 4                # Hops followed by ImpactPropagationEngine (and loaded per twin)
+    IMPACT_DAMPING: float = 0.5              # Extra factor per hop beyond the first
+    IMPACT_GRAPH_CACHE_SIZE: int = 256       # Twin subgraphs kept per process
+    IMPACT_GRAPH_CACHE_TTL_SECONDS: float = 300.0  # Upper bound on staleness if invalidation is missed
+
+    # Caching
+    FORECAST_CACHE_TTL_SECONDS: int = 3600  # Upper bound on staleness; writes invalidate earlier
+
+    # Batch Forecasting
+    FORECAST_BATCH_CHUNK_USERS: int = 20_000     # Users per vectorized chunk (users x days matrix)
+    FORECAST_PRECOMPUTED_MAX_AGE_HOURS: int = 36 # Older precomputed rows fall back to on-demand fitting
+
+    # Anomaly Detection
+    ANOMALY_Z_THRESHOLD: float = 2.0
+    ANOMALY_HALF_LIFE_DAYS: float = 30.0  # Decay of running stats; ~90-day effective window
+    ANOMALY_MIN_SAMPLES: int = 10         # No flags until a user has this much (effective) history
+    ANOMALY_BACKEND: Literal["flagged", "sql", "pandas"] = "flagged"
+
+    # Inference Cache
+    INFERENCE_CACHE_ENABLED: bool = True
+    INFERENCE_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    INFERENCE_CACHE_LRU_SIZE: int = 2048  # Per-process tier in front of Redis
+    INFERENCE_CACHE_VERSION: str = "1"    # Bump to drop every cached result (e.g. model behaviour changed)
+
+    # LLM Scheduling (shared by all workers through Redis)
+    LLM_SCHEDULER_ENABLED: bool = True
+    LLM_REQUESTS_PER_MINUTE: int = 60        # Provider quota, cluster-wide
+    LLM_TOKENS_PER_MINUTE: int = 120_000
+    LLM_OUTPUT_TOKENS_PER_ITEM: int = 150    # Expected answer size, budgeted up front
+    LLM_INTERACTIVE_MAX_WAIT_SECONDS: float = 5.0   # Longer expected waits answer with local rules
+    LLM_BACKFILL_MAX_WAIT_SECONDS: float = 120.0
+
+    # LLM Backend ("fake" simulates the provider offline, for load tests)
+    LLM_BACKEND: Literal["gemini", "fake"] = "gemini"
+    FAKE_LLM_LATENCY_MS: float = 800.0          # Median simulated call latency
+    FAKE_LLM_LATENCY_SIGMA: float = 0.5         # Lognormal spread; 0 = constant latency
+    FAKE_LLM_LATENCY_MS_PER_ITEM: float = 40.0  # Extra latency per item of a batch prompt
+    FAKE_LLM_ERROR_RATE: float = 0.0            # Probability that a simulated call fails
+    FAKE_LLM_RETRY_BACKOFF_MS: float = 500.0    # First client retry delay, doubling per attempt
+
+    # LLM Circuit Breaker (state shared through Redis)
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 20.0
+    LLM_MAX_RETRIES: int = 1                    # Client-side retries per call; the breaker handles outages
+    LLM_CIRCUIT_ENABLED: bool = True
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5      # Failures within the window that open the circuit
+    LLM_CIRCUIT_FAILURE_WINDOW_SECONDS: float = 60.0
+    LLM_CIRCUIT_OPEN_SECONDS: float = 30.0      # Time before half-open probing
+    LLM_CIRCUIT_HALF_OPEN_PROBES: int = 1       # Concurrent trial calls while half-open
+
+    # Inference Result Delivery
+    INFERENCE_LONG_POLL_MAX_SECONDS: float = 30.0   # Upper bound for ?wait= on /activities/infer/{task_id}
+    INFERENCE_EVENTS_HEARTBEAT_SECONDS: float = 15.0  # SSE keep-alive comment interval
+    INFERENCE_EVENTS_QUEUE_SIZE: int = 100          # Undelivered events kept per connected client
+    INFERENCE_EVENTS_READY_TIMEOUT_SECONDS: float = 2.0  # Max wait for the Redis subscription before serving anyway
+
+    # Local Rule Classifier
+    RULE_CLASSIFIER_MIN_CONFIDENCE: float = 0.7  # Surer local answers skip the LLM; > 0.9 disables that
+
+    # Batch Inference
+    INFERENCE_BATCH_TOKEN_BUDGET: int = 6_000  # Estimated prompt tokens per packed LLM call
+    INFERENCE_BATCH_MAX_ITEMS: int = 25        # Also bounds the answer size (one record per item)
+    INFERENCE_BATCH_CONCURRENCY: int = 4       # Packed LLM calls in flight per batch task
+    INFERENCE_BATCH_MAX_BLOBS: int = 1_000     # Per /activities/infer/batch request
+
     @field_validator("BACKEND_CORS_ORIGINS", mode="before")
     def assemble_cors_origins(cls, v: Union[str, List[str]]) -> Union[List[str], str]:
         if isinstance(v, str) and not v.startswith("["):
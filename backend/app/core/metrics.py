@@ -0,0 +1,74 @@
+"""
+Custom Prometheus metrics.
+Registered on the default registry, so they are served by the Instrumentator's /metrics endpoint.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+FORECAST_CACHE_REQUESTS = Counter(
+    "ecotwin_forecast_cache_requests_total",
+    "Forecast cache lookups by outcome",
+    ["result"],  # hit | miss | error
+)
+
+# Saved LLM calls = lru_hit + redis_hit; hit ratio = saved / all lookups
+INFERENCE_CACHE_LOOKUPS = Counter(
+    "ecotwin_inference_cache_lookups_total",
+    "Inference result cache lookups by outcome",
+    ["result"],  # lru_hit | redis_hit | miss | error
+)
+
+INFERENCE_CACHE_LOOKUP_SECONDS = Histogram(
+    "ecotwin_inference_cache_lookup_seconds",
+    "Inference result cache lookup latency by outcome",
+    ["result"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+)
+
+LLM_QUEUE_DEPTH = Gauge(
+    "ecotwin_llm_queue_depth",
+    "Callers waiting for an LLM slot (cluster-wide, as last seen by this process)",
+    ["priority"],  # interactive | backfill
+)
+
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "ecotwin_llm_queue_wait_seconds",
+    "Time spent queued for an LLM slot",
+    ["priority", "outcome"],  # outcome: granted | shed
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+LLM_SCHEDULER_DECISIONS = Counter(
+    "ecotwin_llm_scheduler_decisions_total",
+    "LLM admission decisions",
+    ["priority", "outcome"],  # granted | shed | bypass (scheduler unavailable)
+)
+
+LLM_CIRCUIT_STATE = Gauge(
+    "ecotwin_llm_circuit_state",
+    "Shared LLM circuit breaker state: 0 closed, 1 half-open, 2 open, -1 unknown",
+)  # As last seen by this process's breaker calls
+
+LLM_CIRCUIT_TRANSITIONS = Counter(
+    "ecotwin_llm_circuit_transitions_total",
+    "LLM circuit breaker state changes observed by this process",
+    ["state"],  # state entered
+)
+
+LLM_CIRCUIT_REJECTIONS = Counter(
+    "ecotwin_llm_circuit_rejections_total",
+    "LLM calls skipped because the circuit was open",
+)
+
+ACTIVITY_WRITE_BUFFER_DROPPED = Counter(
+    "ecotwin_activity_write_buffer_dropped_total",
+    "Inferred activities dropped by the write-behind buffer after repeated failed flushes",
+)
+
+# Where inference time goes. "task" (Celery task incl. async_to_sync) minus "total" (engine call)
+# is the sync/async bridging overhead.
+INFERENCE_STAGE_SECONDS = Histogram(
+    "ecotwin_inference_stage_seconds",
+    "Inference pipeline latency per stage",
+    ["stage", "inference_method"],  # stage: task | total | anonymize | rules | cache | prompt | queue | llm | parse
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
@@ -1,12 +1,27 @@
 import asyncio
-from typing import Dict, Any
-from .worker import celery_app
-from .services.inference_engine import InferenceEngine
-from .core.logger import logger
+import os
+import time
+from typing import Dict, Any, List
+from fastapi import HTTPException
+from celery.signals import worker_process_shutdown
+from ..worker import celery_app
+from ..db.session import SessionLocal
+from ..services.activity_service import ActivityService
+from ..services.activity_writer import ActivityWriteBuffer, inferred_activity_rows
+from ..services.inference_engine import InferenceEngine
+from ..services.inference_events import publish_inference_event
+from .logger import logger
+from .metrics import INFERENCE_STAGE_SECONDS
 from asgiref.sync import async_to_sync
 
 # Instantiate engine once per worker process
 inference_engine = InferenceEngine()
+# Inferred activities are written behind, in multi-row batches shared by all tasks of the process
+activity_buffer = ActivityWriteBuffer()
+
+@worker_process_shutdown.connect
+def flush_activity_buffer(**kwargs):
+    activity_buffer.flush()
 
 @celery_app.task(bind=True, name="analyze_activity_task")
 def analyze_activity_task(self, raw_data: str, user_id: str) -> Dict[str, Any]:
@@ -17,13 +32,91 @@ def analyze_activity_task(self, raw_data: str, user_id: str) -> Dict[str, Any]:
     logger.info(f"Task {self.request.id}: Started inference for user {user_id}")
     try:
         # Run async function in sync context
+        started = time.perf_counter()
         result = async_to_sync(inference_engine.run_inference)(raw_data)
-        
-        # Here you would typically save 'result' to the DB associated with 'user_id'
-        # For PoC, we return it so it can be retrieved via Redis backend
+        # Includes the event loop hand-off; compare with the engine's own "total" stage
+        INFERENCE_STAGE_SECONDS.labels(stage="task", inference_method=result.get("inference_method", "unknown"))\
+            .observe(time.perf_counter() - started)
+
+        # Persisted as an Activity by the write-behind buffer; the id is known up front but the
+        # row only exists once a "persisted" event follows (see ActivityWriteBuffer)
+        records = inferred_activity_rows(self.request.id, user_id, [result])
+        activity_buffer.add(records)
         logger.info(f"Task {self.request.id}: Completed successfully.")
+        if records:
+            result["activity_id"] = str(records[0]["id"])
+            result["activity_status"] = "pending"
+        # Push to connected clients (SSE / long-poll) so they don't have to poll the result backend
+        publish_inference_event(user_id, self.request.id, "completed", result=result)
         return result
     except Exception as e:
         logger.error(f"Task {self.request.id}: Failed - {str(e)}")
+        publish_inference_event(user_id, self.request.id, "failed", error=str(e))
         # Retry logic could go here
         raise e
+
+@celery_app.task(bind=True, name="analyze_activity_batch_task")
+def analyze_activity_batch_task(self, raw_items: List[str], user_id: str) -> Dict[str, Any]:
+    """
+    Background batch inference: many blobs, few LLM calls (see InferenceEngine.run_batch_inference).
+    Results are persisted as activities; only their ids (in input order) go to the result backend.
+    """
+    logger.info(f"Task {self.request.id}: Started batch inference of {len(raw_items)} items for user {user_id}")
+    try:
+        results = async_to_sync(inference_engine.run_batch_inference)(raw_items)
+        records = inferred_activity_rows(self.request.id, user_id, results)
+        activity_buffer.add(records)
+        logger.info(f"Task {self.request.id}: Completed successfully.")
+        summary = {"count": len(results), "pending": len(records), "activity_ids": [str(r["id"]) for r in records],
+                   "activity_status": "pending"}
+        publish_inference_event(user_id, self.request.id, "completed", result=summary)
+        return summary
+    except Exception as e:
+        logger.error(f"Task {self.request.id}: Failed - {str(e)}")
+        publish_inference_event(user_id, self.request.id, "failed", error=str(e))
+        raise e
+
+@celery_app.task(bind=True, name="import_activities_task")
+def import_activities_task(self, spool_path: str, user_id: str) -> Dict[str, Any]:
+    """
+    Background bulk import of a spooled CSV (routed to the imports queue).
+    Publishes PROGRESS state after every chunk so clients can poll /batch/jobs/{job_id}.
+    Always returns a status record (completed/failed) rather than raising, so the
+    owner check on the polling endpoint keeps working for failed jobs.
+    """
+    logger.info(f"Task {self.request.id}: Started bulk import for user {user_id}")
+    started = time.monotonic()
+
+    def _progress_meta(report: Dict[str, Any]) -> Dict[str, Any]:
+        elapsed = time.monotonic() - started
+        rows = report["accepted"] + report["rejected"]
+        return {
+            "user_id": user_id,
+            "rows_processed": rows,
+            "accepted": report["accepted"],
+            "rejected": report["rejected"],
+            "chunks_processed": len(report["chunks"]),
+            "elapsed_seconds": round(elapsed, 2),
+            "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+    def _on_chunk(report: Dict[str, Any]) -> None:
+        self.update_state(state="PROGRESS", meta=_progress_meta(report))
+
+    db = SessionLocal()
+    try:
+        report = ActivityService.import_spooled_file(spool_path, db, user_id, progress=_on_chunk)
+        logger.info(f"Task {self.request.id}: Bulk import completed ({report['accepted']} records).")
+        return {"status": "completed", **_progress_meta(report), "result": report}
+    except HTTPException as e:
+        logger.warning(f"Task {self.request.id}: Bulk import rejected - {e.detail}")
+        return {"status": "failed", "user_id": user_id, "error": e.detail}
+    except Exception as e:
+        logger.error(f"Task {self.request.id}: Bulk import failed - {str(e)}")
+        return {"status": "failed", "user_id": user_id, "error": str(e)}
+    finally:
+        db.close()
+        try:
+            os.remove(spool_path)
+        except OSError:
+            pass
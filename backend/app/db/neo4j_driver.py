@@ -26,8 +26,8 @@ class Neo4jDriver:
         password = os.getenv("NEO4J_PASSWORD", "password")
         
         try:
-            # We use the sync driver for simplicity in this PoC, but AsyncGraphDatabase is preferred for high load
-            self._driver = GraphDatabase.driver(uri, auth=(user, password))
+            # Sync driver for Celery workers and scripts; async request handlers use async_neo4j_driver
+            self._driver = GraphDatabase.driver(uri, auth=(user, password), **_pool_config())
             # Verify connection
             self._driver.verify_connectivity()
             logger.info(f"Connected to Neo4j at {uri}")
@@ -45,5 +45,47 @@ class Neo4jDriver:
             self.connect()
         return self._driver.session()
 
-# Global instance
+class AsyncNeo4jDriver:
+    """
+    Singleton AsyncGraphDatabase driver for async FastAPI routes (see AsyncGraphService).
+    Created lazily on first use; connection problems surface on the first query.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AsyncNeo4jDriver, cls).__new__(cls)
+            cls._instance._driver = None
+        return cls._instance
+
+    def connect(self):
+        if self._driver:
+            return
+
+        uri = os.getenv("NEO4J_URI", "bolt://neo4j:7687")
+        user = os.getenv("NEO4J_USER", "neo4j")
+        password = os.getenv("NEO4J_PASSWORD", "password")
+        self._driver = AsyncGraphDatabase.driver(uri, auth=(user, password), **_pool_config())
+        logger.info(f"Async Neo4j driver created for {uri}")
+
+    async def close(self):
+        if self._driver:
+            await self._driver.close()
+            self._driver = None
+            logger.info("Async Neo4j connection closed.")
+
+    def get_session(self):
+        if not self._driver:
+            self.connect()
+        return self._driver.session()
+
+def _pool_config() -> dict:
+    return {
+        "max_connection_pool_size": settings.NEO4J_MAX_POOL_SIZE,
+        # How long a query waits for a free pooled connection before failing
+        "connection_acquisition_timeout": settings.NEO4J_POOL_ACQUISITION_TIMEOUT_SECONDS,
+    }
+
+# Global instances
 neo4j_driver = Neo4jDriver()
+async_neo4j_driver = AsyncNeo4jDriver()
@@ -0,0 +1,20 @@
+import redis
+from typing import Optional
+from app.core.config import settings
+
+_client: Optional[redis.Redis] = None
+
+def get_redis() -> redis.Redis:
+    """
+    Shared Redis client for caching/coordination (one connection pool per process).
+    Short timeouts: callers treat Redis as optional and fall back when it is slow or down.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            str(settings.REDIS_URL),
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5,
+            health_check_interval=30,
+        )
+    return _client
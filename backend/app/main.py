@@ -1,5 +1,7 @@
 from contextlib import asynccontextmanager
-from .db.neo4j_driver import neo4j_driver
+from .db.neo4j_driver import async_neo4j_driver, neo4j_driver
+from .services.graph_service import GraphService
+from .services.inference_events import inference_events
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -8,6 +10,8 @@ async def lifespan(app: FastAPI):
     try:
         neo4j_driver.verify_connectivity()
         logger.info("✅ Neo4j Connected")
+        # Uniqueness constraints on id per label: graph lookups become index seeks
+        logger.info(f"✅ Neo4j schema ready ({GraphService().ensure_schema()} labels constrained)")
     except Exception as e:
         logger.warning(f"⚠️ Neo4j Connection Failed: {e}")
     
@@ -16,7 +20,9 @@ async def lifespan(app: FastAPI):
     # Shutdown: Close connections
     logger.info("🛑 System Shutdown: Closing connections...")
     neo4j_driver.close()
+    await async_neo4j_driver.close()
     logger.info("✅ Neo4j Driver Closed")
+    await inference_events.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Index, Text
+from sqlalchemy import Column, String, Float, Integer, Boolean, Date, DateTime, ForeignKey, Index, Text, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
@@ -29,6 +29,10 @@ class Activity(Base):
     
     carbon_estimate = Column(Float, nullable=False)
     confidence_score = Column(Float)
+
+    # Scored at write time against the user's running stats (see AnomalyService)
+    z_score = Column(Float)
+    is_anomaly = Column(Boolean, nullable=False, default=False, server_default=text("false"))
     
     timestamp = Column(DateTime(timezone=True), default=func.now(), index=True) # Critical for time-series queries
 
@@ -37,8 +41,56 @@ class Activity(Base):
     # Composite index for common query pattern: "Get user's activities sorted by time"
     __table_args__ = (
         Index('idx_user_timestamp', 'user_id', 'timestamp'),
+        # Partial index: "top flagged activities for a user" touches only anomalous rows
+        Index('idx_user_anomaly_carbon', 'user_id', 'carbon_estimate', postgresql_where=text('is_anomaly')),
     )
 
+class DailyCarbonRollup(Base):
+    """
+    Pre-aggregated daily totals per user and activity type (days are UTC).
+    Maintained incrementally by every activity write path (see RollupService),
+    so analytics reads O(days) rows instead of O(activities).
+    """
+    __tablename__ = "daily_carbon_rollup"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    activity_type = Column(String, primary_key=True, default="")  # "" when the activity had no type
+    total_carbon = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+class Forecast(Base):
+    """
+    Nightly precomputed linear trend per user (see BatchForecastEngine).
+    Stores the fit itself rather than predictions: x = days since base_date,
+    prediction = intercept + slope * x, so any horizon can be served from one row.
+    data_version is the user's ForecastCache version when the fit's data was read;
+    the row is only served while it still matches.
+    """
+    __tablename__ = "forecasts"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    slope = Column(Float, nullable=False)
+    intercept = Column(Float, nullable=False)
+    base_date = Column(Date, nullable=False)
+    history_days = Column(Integer, nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    data_version = Column(Integer, nullable=True)
+
+class UserCarbonStats(Base):
+    """
+    Running per-user carbon statistics (Welford count/mean/M2) with exponential time decay,
+    updated on every activity write so anomaly scoring is O(1) per activity.
+    count is an effective (decayed) weight, hence a float.
+    """
+    __tablename__ = "user_carbon_stats"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    count = Column(Float, nullable=False, default=0.0)
+    mean = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
 class AuditLog(Base):
     """
     Enterprise requirement: Track who accessed what data.
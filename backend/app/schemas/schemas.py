@@ -12,11 +12,18 @@ class ActivityBase(BaseModel):
 class ActivityInferenceRequest(BaseModel):
     raw_data: str  # Example: "Booking Confirmation for John, Location: JFK Airport, Time: 8:00 AM"
 
+class ActivityBatchInferenceRequest(BaseModel):
+    raw_data: List[str]  # One blob per item, e.g. a connector backfill of emails
+
 class ActivityResponse(ActivityBase):
     id: str
     carbon_estimate: float  # In kg CO2e
     confidence_score: float
 
+class ActivityPage(BaseModel):
+    items: List[ActivityResponse]
+    next_cursor: Optional[str] = None  # Opaque; pass back as ?cursor= to fetch the next page
+
 class RecommendedAction(BaseModel):
     action: str
     potential_savings: float
@@ -0,0 +1,36 @@
+import pandas as pd
+from datetime import datetime
+from typing import Sequence
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+from ..models.models import Activity
+
+ANOMALY_COLUMNS = ('id', 'description', 'carbon_estimate', 'timestamp')
+
+class ActivityReads:
+    """
+    Column-projected read layer for analytics.
+    Runs Core selects of just the columns a computation needs and builds the DataFrame
+    straight from the result rows: no ORM instance or identity-map entry per row, and the
+    unbounded raw_data column is never fetched.
+    """
+
+    @staticmethod
+    def frame(db: Session, stmt: Select) -> pd.DataFrame:
+        """
+        Executes a Core select and returns its rows as a DataFrame (columns named after the select).
+        """
+        result = db.execute(stmt)
+        return pd.DataFrame.from_records(result.fetchall(), columns=list(result.keys()), coerce_float=True)
+
+    @staticmethod
+    def user_window(db: Session, user_id: str, since: datetime,
+                    columns: Sequence[str] = ANOMALY_COLUMNS) -> pd.DataFrame:
+        """
+        A user's activities with timestamp >= since, projected to the given activities columns
+        (an index range scan on idx_user_timestamp).
+        """
+        table = Activity.__table__
+        stmt = select(*(table.c[name] for name in columns))\
+            .where(table.c.user_id == user_id, table.c.timestamp >= since)
+        return ActivityReads.frame(db, stmt)
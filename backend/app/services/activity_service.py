@@ -1,63 +1,262 @@
 import pandas as pd
+import asyncio
+import base64
 import io
+import json
+import os
+import shutil
 import uuid
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import List, Optional, Dict, Any, Iterable, Callable, Tuple
+from sqlalchemy import tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, defer
 from fastapi import HTTPException, UploadFile
 from ..models.models import Activity
+from ..core.config import settings
 from ..core.logger import logger
+from .import_validation import ActivityImportValidator, RejectionReport
+from .rollup_service import RollupService
+from .forecast_cache import ForecastCache
+from .anomaly_service import AnomalyService
+from .graph_service import GraphService
+
+# Column order used for COPY / multi-row INSERT into the activities table
+ACTIVITY_COPY_COLUMNS = [
+    'id', 'user_id', 'activity_type', 'description', 'raw_data',
+    'carbon_estimate', 'confidence_score', 'timestamp', 'z_score', 'is_anomaly'
+]
 
 class ActivityService:
     @staticmethod
-    async def process_bulk_upload(file: UploadFile, db: Session, current_user_id: str) -> int:
+    async def process_bulk_upload(file: UploadFile, db: Session, current_user_id: str) -> Dict[str, Any]:
         """
         Handles the business logic for bulk activity upload.
-        Parses CSV, validates data, resolves user IDs, and performs bulk insertion.
-        Returns the number of records inserted.
+        Parses CSV, validates data column-wise, resolves user IDs, and performs bulk insertion.
+        Returns an import report (accepted/rejected counts and per-row rejections).
         """
-        if not file.filename.endswith('.csv'):
-            raise HTTPException(status_code=400, detail="Only CSV files are allowed.")
+        ActivityService._ensure_csv(file)
+
+        content = await file.read()
+
+        def _load() -> Dict[str, Any]:
+            try:
+                frames = [pd.read_csv(io.BytesIO(content), dtype=str, keep_default_na=False)]
+            except pd.errors.EmptyDataError:
+                raise HTTPException(status_code=400, detail="CSV file is empty.")
+            return ActivityService._ingest_frames(frames, db, current_user_id)
+
+        # Parsing and the database load are blocking: keep them off the event loop
+        return await asyncio.to_thread(_load)
+
+    @staticmethod
+    async def process_bulk_upload_streaming(
+        file: UploadFile,
+        db: Session,
+        current_user_id: str,
+        chunk_rows: int = settings.BULK_UPLOAD_CHUNK_ROWS
+    ) -> Dict[str, Any]:
+        """
+        Streaming variant of process_bulk_upload for very large exports.
+        Reads the upload in bounded chunks, validates each chunk and loads it via COPY,
+        committing per chunk so memory stays flat regardless of file size.
+        Returns the same report as process_bulk_upload plus a per-chunk breakdown.
+        The whole import runs in a worker thread, so the event loop keeps serving other requests.
+        """
+        ActivityService._ensure_csv(file)
+        await file.seek(0)
+
+        def _load() -> Dict[str, Any]:
+            try:
+                # dtype=str keeps parsing cheap and predictable; coercion happens per column in the validator
+                frames = pd.read_csv(file.file, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+            except pd.errors.EmptyDataError:
+                raise HTTPException(status_code=400, detail="CSV file is empty.")
+            return ActivityService._ingest_frames(frames, db, current_user_id)
+
+        return await asyncio.to_thread(_load)
+
+    @staticmethod
+    async def spool_upload(file: UploadFile, job_id: str) -> str:
+        """
+        Copies an upload to IMPORT_SPOOL_DIR so a background worker can import it.
+        Copies in bounded blocks; the file is never held in memory.
+        """
+        ActivityService._ensure_csv(file)
+        path = os.path.join(settings.IMPORT_SPOOL_DIR, f"{job_id}.csv")
+        await file.seek(0)
 
+        def _copy() -> None:
+            os.makedirs(settings.IMPORT_SPOOL_DIR, exist_ok=True)
+            with open(path, "wb") as spool:
+                shutil.copyfileobj(file.file, spool, length=1024 * 1024)
+
+        await asyncio.to_thread(_copy)
+        return path
+
+    @staticmethod
+    def import_spooled_file(
+        path: str,
+        db: Session,
+        current_user_id: str,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        chunk_rows: int = settings.BULK_UPLOAD_CHUNK_ROWS
+    ) -> Dict[str, Any]:
+        """
+        Background counterpart of process_bulk_upload_streaming for a spooled file.
+        Used by import_activities_task; progress is called after every chunk.
+        """
         try:
-            content = await file.read()
-            df = pd.read_csv(io.BytesIO(content))
-            
-            required_cols = {'activity_type', 'description', 'carbon_estimate'}
-            if not required_cols.issubset(df.columns):
-                raise HTTPException(status_code=400, detail=f"CSV missing columns: {required_cols - set(df.columns)}")
-
-            activities_to_insert = []
-            for _, row in df.iterrows():
-                target_uuid = ActivityService._resolve_user_id(row.get('user_id'), current_user_id)
-                if not target_uuid:
-                    continue
-
-                activities_to_insert.append(Activity(
-                    id=uuid.uuid4(),
-                    user_id=target_uuid,
-                    activity_type=row['activity_type'],
-                    description=row['description'],
-                    carbon_estimate=float(row['carbon_estimate']),
-                    confidence_score=1.0, 
-                    raw_data="bulk_import"
-                ))
-
-            if not activities_to_insert:
-                 raise HTTPException(status_code=400, detail="No valid records found to insert.")
-
-            db.bulk_save_objects(activities_to_insert)
-            db.commit()
-            
-            logger.info(f"Bulk import success: {len(activities_to_insert)} records.")
-            return len(activities_to_insert)
+            frames = pd.read_csv(path, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+        except pd.errors.EmptyDataError:
+            raise HTTPException(status_code=400, detail="CSV file is empty.")
+
+        with frames:
+            return ActivityService._ingest_frames(frames, db, current_user_id, progress)
+
+    @staticmethod
+    def _ingest_frames(
+        frames: Iterable[pd.DataFrame],
+        db: Session,
+        current_user_id: str,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Validates and loads parsed CSV frames, committing after each one.
+        Rejected rows never abort the import; they are collected into a RejectionReport.
+        """
+        validator = ActivityImportValidator(ActivityService._resolve_user_id(None, current_user_id))
+        rejection_report = RejectionReport(current_user_id)
+        report: Dict[str, Any] = {"accepted": 0, "rejected": 0, "chunks": []}
+        row_offset = 0
+
+        try:
+            for chunk_no, chunk in enumerate(frames):
+                if chunk_no == 0:
+                    validator.check_columns(chunk.columns)
+
+                validated = validator.validate(chunk, row_offset)
+                rows = ActivityService._prepare_rows(validated.rows)
+                if not rows.empty:
+                    rows = AnomalyService.score_activities(db, rows)
+                    ActivityService._copy_activities(db, rows)
+                    RollupService.apply_activities(db, rows)
+                    db.commit()
+                    ForecastCache.bump_versions(rows['user_id'].unique())
+                    ActivityService._project_to_graph(rows)
+
+                rejection_report.add(validated.rejections)
+                accepted, rejected = len(rows), validated.rejected_count
+                report["accepted"] += accepted
+                report["rejected"] += rejected
+                report["chunks"].append({"chunk": chunk_no, "accepted": accepted, "rejected": rejected})
+                row_offset += len(chunk)
+                logger.debug(f"Bulk import chunk {chunk_no}: {accepted} accepted, {rejected} rejected.")
+                if progress:
+                    progress(report)
 
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Bulk import failed: {e}")
+            logger.error(f"Bulk import failed after {report['accepted']} records: {e}")
             db.rollback()
             raise HTTPException(status_code=500, detail=f"Bulk import failed: {str(e)}")
 
+        report.update(rejection_report.as_dict())
+        if report["accepted"] == 0:
+            raise HTTPException(status_code=400, detail={"message": "No valid records found to insert.", **report})
+
+        logger.info(
+            f"Bulk import success: {report['accepted']} records in {len(report['chunks'])} chunks, "
+            f"{report['rejected']} rejected."
+        )
+        return report
+
+    @staticmethod
+    def _ensure_csv(file: UploadFile) -> None:
+        if not file.filename or not file.filename.endswith('.csv'):
+            raise HTTPException(status_code=400, detail="Only CSV files are allowed.")
+
+    @staticmethod
+    def _prepare_rows(validated_rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Adds the server-side columns (id, raw_data, confidence, timestamp) to validated rows.
+        """
+        rows = validated_rows.copy()
+        rows['id'] = [uuid.uuid4() for _ in range(len(rows))]
+        rows['raw_data'] = "bulk_import"
+        rows['confidence_score'] = 1.0
+        rows['timestamp'] = datetime.now(timezone.utc)
+        return rows
+
+    @staticmethod
+    def _copy_activities(db: Session, rows: pd.DataFrame) -> None:
+        """
+        Loads prepared rows into the activities table inside the session's transaction.
+        Uses Postgres COPY when the driver supports it (psycopg2), otherwise falls back
+        to multi-row INSERTs of BULK_INSERT_BATCH_SIZE rows.
+        """
+        rows = rows[ACTIVITY_COPY_COLUMNS]
+        cursor = db.connection().connection.cursor()
+        try:
+            if hasattr(cursor, "copy_expert"):
+                buffer = io.StringIO()
+                rows.to_csv(buffer, index=False, header=False, date_format="%Y-%m-%dT%H:%M:%S.%f%z")
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY activities ({', '.join(ACTIVITY_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+                return
+        finally:
+            cursor.close()
+
+        batch_size = settings.BULK_INSERT_BATCH_SIZE
+        records = rows.to_dict('records')
+        for start in range(0, len(records), batch_size):
+            db.execute(Activity.__table__.insert(), records[start:start + batch_size])
+
+    @staticmethod
+    def persist_inferred(db: Session, records: List[Dict[str, Any]]) -> int:
+        """
+        Writes inferred activities (see ActivityWriteBuffer) with the same anomaly/rollup/cache
+        hooks as bulk import, and commits. Ids are derived from the task id, so rows already
+        written by an earlier or concurrent attempt are skipped by ON CONFLICT; only the rows
+        this call actually inserted are scored, rolled up and counted.
+        Returns the number of rows inserted.
+        """
+        # Sorted by id so concurrent writers with overlapping ids lock them in the same order
+        rows = pd.DataFrame.from_records(records).drop_duplicates('id').sort_values('id')
+        values = rows[ACTIVITY_COPY_COLUMNS[:-2]].astype(object)
+        values = values.where(values.notna(), None).to_dict('records')
+        stmt = insert(Activity).on_conflict_do_nothing(index_elements=[Activity.id]).returning(Activity.id)
+        inserted = set()
+        batch_size = settings.BULK_INSERT_BATCH_SIZE
+        for start in range(0, len(values), batch_size):
+            inserted.update(db.execute(stmt, values[start:start + batch_size]).scalars())
+
+        rows = rows[rows['id'].isin(inserted)]
+        if rows.empty:
+            db.commit()
+            return 0
+
+        # Scored after the insert, so the running stats only ever see rows that were written
+        rows = AnomalyService.score_activities(db, rows)
+        scored = rows.loc[rows['z_score'].notna(), ['id', 'z_score', 'is_anomaly']]
+        if not scored.empty:
+            db.execute(update(Activity), scored.astype(object).to_dict('records'))
+        RollupService.apply_activities(db, rows)
+        db.commit()
+        ForecastCache.bump_versions(rows['user_id'].unique())
+        ActivityService._project_to_graph(rows)
+        return len(rows)
+
+    @staticmethod
+    def _project_to_graph(rows: pd.DataFrame) -> None:
+        # After the commit: the graph mirrors Postgres, and a Neo4j outage never fails a write
+        if settings.GRAPH_PROJECTION_ENABLED:
+            GraphService().project_activities(rows)
+
     @staticmethod
     def _resolve_user_id(csv_user_id: Optional[str], current_user_id: str) -> Optional[uuid.UUID]:
         """
@@ -71,20 +270,59 @@ class ActivityService:
                 # Fallback for dev/test tokens that might not be valid UUIDs
                 # In strict prod, this might be handled differently
                 return uuid.UUID("00000000-0000-0000-0000-000000000000")
-        
+
         try:
             return uuid.UUID(str(csv_user_id))
         except ValueError:
             return None
 
     @staticmethod
-    def get_activities(db: Session, user_id: str, skip: int = 0, limit: int = 50) -> List[Activity]:
+    def get_activities(
+        db: Session,
+        user_id: str,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        activity_type: Optional[str] = None
+    ) -> Tuple[List[Activity], Optional[str]]:
+        """
+        Retrieves one page of a user's activities, newest first, using keyset pagination.
+        The cursor encodes the (timestamp, id) of the last row of the previous page, so every
+        page is an index range scan on idx_user_timestamp regardless of depth.
+        Returns the page and the cursor for the next one (None on the last page).
+        """
+        # raw_data is audit-only and unbounded; the list response never includes it
+        query = db.query(Activity).options(defer(Activity.raw_data)).filter(Activity.user_id == user_id)
+        if activity_type:
+            query = query.filter(Activity.activity_type == activity_type)
+        if cursor:
+            last_timestamp, last_id = ActivityService.decode_cursor(cursor)
+            query = query.filter(
+                tuple_(Activity.timestamp, Activity.id)
+                < tuple_(last_timestamp, last_id, types=[Activity.timestamp.type, Activity.id.type])
+            )
+
+        # id breaks ties between activities sharing a timestamp (common in bulk imports)
+        rows = query.order_by(Activity.timestamp.desc(), Activity.id.desc()).limit(limit + 1).all()
+
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = ActivityService.encode_cursor(page[-1].timestamp, page[-1].id)
+        return page, next_cursor
+
+    @staticmethod
+    def encode_cursor(timestamp: datetime, activity_id: uuid.UUID) -> str:
+        payload = json.dumps({"t": timestamp.isoformat(), "id": str(activity_id)}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
         """
-        Retrieves a paginated list of activities for a specific user.
+        Inverse of encode_cursor. Raises ValueError for malformed or tampered cursors.
         """
-        return db.query(Activity)\
-            .filter(Activity.user_id == user_id)\
-            .order_by(Activity.timestamp.desc())\
-            .offset(skip)\
-            .limit(limit)\
-            .all()
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(payload["t"]), uuid.UUID(payload["id"])
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.logger import logger
+from ..core.metrics import ACTIVITY_WRITE_BUFFER_DROPPED
+from ..db.session import SessionLocal
+from .activity_service import ActivityService
+from .inference_events import publish_inference_event
+
+# Activities created from an inference task get ids derived from the task id, so a retried or
+# redelivered task produces the same rows and the insert can skip them.
+INFERRED_ACTIVITY_NAMESPACE = uuid.UUID("6f1c2f3e-8a4b-4d5e-9c1a-2b3c4d5e6f70")
+
+def inferred_activity_rows(task_id: str, user_id: str, results: List[Dict[str, Any]],
+                           timestamp: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Activity records for inference results, in input order (item i gets the id of "<task_id>:<i>").
+    Results without a usable carbon_estimate are skipped.
+    """
+    owner = ActivityService._resolve_user_id(None, user_id)
+    timestamp = timestamp or datetime.now(timezone.utc)
+    records = []
+    for i, result in enumerate(results):
+        try:
+            carbon = float(result.get("carbon_estimate"))
+        except (TypeError, ValueError):
+            logger.warning(f"Task {task_id}: item {i} has no usable carbon_estimate; not persisted.")
+            continue
+        try:
+            confidence = float(result.get("confidence"))
+        except (TypeError, ValueError):
+            confidence = None
+        records.append({
+            "id": uuid.uuid5(INFERRED_ACTIVITY_NAMESPACE, f"{task_id}:{i}"),
+            "user_id": owner,
+            "activity_type": result.get("activity_type"),
+            "description": result.get("description"),
+            # Audit trail: where the row came from and why the model chose these numbers
+            "raw_data": json.dumps({
+                "source": "inference", "task_id": task_id, "item": i,
+                "inference_method": result.get("inference_method"), "reasoning": result.get("reasoning"),
+            }),
+            "carbon_estimate": carbon,
+            "confidence_score": confidence,
+            "timestamp": timestamp,
+        })
+    return records
+
+def _announce(rows: List[Dict[str, Any]], status: str) -> None:
+    """
+    Tells each task's owner that its activities were written ("persisted") or given up on
+    ("persist_failed"); tasks only report their activity ids as pending.
+    """
+    by_task: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+    for row in rows:
+        task_id = json.loads(row["raw_data"])["task_id"]
+        by_task[(str(row["user_id"]), task_id)].append(str(row["id"]))
+    for (user_id, task_id), activity_ids in by_task.items():
+        publish_inference_event(user_id, task_id, status, activity_ids=activity_ids)
+
+class ActivityWriteBuffer:
+    """
+    Write-behind buffer for inferred activities, one per worker process.
+    Tasks add() their rows and return; flush() writes everything pending as multi-row INSERTs
+    once max_rows are pending or the oldest pending row is max_delay_ms old.
+    Failed flushes keep their rows for the next attempt, up to max_pending rows.
+    Every flushed or dropped row is announced to its owner as an inference event.
+    """
+    def __init__(self, max_rows: int = settings.ACTIVITY_WRITE_BUFFER_ROWS,
+                 max_delay_ms: int = settings.ACTIVITY_WRITE_BUFFER_FLUSH_MS,
+                 max_pending: int = settings.ACTIVITY_WRITE_BUFFER_MAX_PENDING,
+                 session_factory: Callable[[], Session] = SessionLocal):
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self._rows: List[Dict[str, Any]] = []
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One flush at a time; rows added meanwhile wait for the next
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        with self._lock:
+            self._rows.extend(records)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = len(self._rows) >= self.max_rows
+            # Started lazily, so a prefork child gets its own flusher
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="activity-write-buffer", daemon=True)
+                self._thread.start()
+        if full:
+            self.flush()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self) -> int:
+        """
+        Writes all pending rows now; returns how many were inserted (duplicates excluded).
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows, self._oldest = self._rows, [], None
+            if not rows:
+                return 0
+
+            db = self.session_factory()
+            try:
+                written = ActivityService.persist_inferred(db, rows)
+                logger.debug(f"Activity write buffer: {written}/{len(rows)} rows inserted.")
+                # Rows skipped as duplicates were written by an earlier attempt: persisted too
+                _announce(rows, "persisted")
+                return written
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Activity write buffer flush of {len(rows)} rows failed: {e}")
+                self._requeue(rows)
+                return 0
+            finally:
+                db.close()
+
+    def _requeue(self, rows: List[Dict[str, Any]]) -> None:
+        dropped: List[Dict[str, Any]] = []
+        with self._lock:
+            self._rows = rows + self._rows
+            overflow = len(self._rows) - self.max_pending
+            if overflow > 0:
+                logger.error(f"Activity write buffer full; dropping the {overflow} oldest rows.")
+                dropped, self._rows = self._rows[:overflow], self._rows[overflow:]
+            if self._rows and self._oldest is None:
+                self._oldest = time.monotonic()
+        if dropped:
+            ACTIVITY_WRITE_BUFFER_DROPPED.inc(len(dropped))
+            _announce(dropped, "persist_failed")
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.max_delay / 2)
+            with self._lock:
+                due = self._oldest is not None and time.monotonic() - self._oldest >= self.max_delay
+            if due:
+                self.flush()
@@ -1,34 +1,37 @@
 import pandas as pd
 import numpy as np
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
 from sklearn.linear_model import LinearRegression
-from ..models.models import Activity
+from sqlalchemy import Float, func, select
+from ..core.config import settings
+from ..models.models import Activity, DailyCarbonRollup, Forecast, UserCarbonStats
 from ..core.logger import logger
+from .activity_reads import ActivityReads
+from .forecast_cache import ForecastCache
+from .batch_forecast import BatchForecastEngine
 
 class AnalyticsService:
     @staticmethod
     def get_time_series_data(db: Session, user_id: str, days: int = 30) -> pd.DataFrame:
         """
-        Fetches activity data and resamples it to daily totals.
+        Fetches daily totals from the pre-aggregated rollup (O(days), not O(activities)).
         """
         cutoff_date = datetime.utcnow() - timedelta(days=days)
-        activities = db.query(Activity)\
-            .filter(Activity.user_id == user_id, Activity.timestamp >= cutoff_date)\
-            .all()
-        
-        if not activities:
+        daily_df = ActivityReads.frame(db, select(
+                DailyCarbonRollup.day.label('date'),
+                func.sum(DailyCarbonRollup.total_carbon).label('total_carbon'),
+                func.sum(DailyCarbonRollup.count).label('count')
+            )
+            .where(DailyCarbonRollup.user_id == user_id, DailyCarbonRollup.day >= cutoff_date.date())
+            .group_by(DailyCarbonRollup.day))
+
+        if daily_df.empty:
             return pd.DataFrame(columns=['date', 'total_carbon', 'count'])
 
-        data = [{'date': a.timestamp.date(), 'carbon': a.carbon_estimate} for a in activities]
-        df = pd.DataFrame(data)
-        df['date'] = pd.to_datetime(df['date'])
-        
-        # Group by date
-        daily_df = df.groupby('date')['carbon'].agg(['sum', 'count']).reset_index()
-        daily_df.rename(columns={'sum': 'total_carbon'}, inplace=True)
-        
+        daily_df['date'] = pd.to_datetime(daily_df['date'])
+
         # Fill missing days with 0
         idx = pd.date_range(cutoff_date.date(), datetime.utcnow().date())
         daily_df.set_index('date', inplace=True)
@@ -40,7 +43,26 @@ class AnalyticsService:
     def predict_future_footprint(db: Session, user_id: str, days_ahead: int = 7) -> List[Dict[str, Any]]:
         """
         Predicts future carbon footprint using Linear Regression on past 30 days data.
+        Served from the nightly precomputed forecasts table when fresh and no activity
+        was written since, otherwise from ForecastCache; only refit when the user's
+        activities changed.
         """
+        max_age = datetime.now(timezone.utc) - timedelta(hours=settings.FORECAST_PRECOMPUTED_MAX_AGE_HOURS)
+        precomputed = db.query(Forecast)\
+            .filter(Forecast.user_id == user_id, Forecast.computed_at >= max_age)\
+            .first()
+        if precomputed and precomputed.data_version is not None:
+            current = (ForecastCache.versions([user_id]) or {}).get(str(user_id))
+            if current == precomputed.data_version:
+                return BatchForecastEngine.predictions_from_row(precomputed, days_ahead)
+
+        return ForecastCache.get_or_compute(
+            user_id, days_ahead,
+            lambda: AnalyticsService._fit_forecast(db, user_id, days_ahead)
+        )
+
+    @staticmethod
+    def _fit_forecast(db: Session, user_id: str, days_ahead: int) -> List[Dict[str, Any]]:
         df = AnalyticsService.get_time_series_data(db, user_id, days=60) # Use 60 days history for better trend
         
         if df['total_carbon'].sum() == 0:
@@ -67,36 +89,95 @@ class AnalyticsService:
         for date, pred in zip(future_dates, predictions):
             result.append({
                 "date": date.strftime("%Y-%m-%d"),
-                "predicted_carbon": max(0, round(pred, 2)) # No negative carbon
+                "predicted_carbon": max(0.0, round(float(pred), 2)) # No negative carbon
             })
             
         return result
 
     @staticmethod
-    def detect_anomalies(db: Session, user_id: str) -> List[Dict[str, Any]]:
+    def detect_anomalies(db: Session, user_id: str, backend: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the top 5 statistical outliers (z > 2) of the last 90 days.
+        backend (default settings.ANOMALY_BACKEND):
+          - "flagged": activities scored at write time (AnomalyService), a partial-index lookup
+          - "sql": z-scores computed in Postgres with window functions, only the top rows returned
+          - "pandas": the whole window loaded and scored in pandas
+        """
+        backend = backend or settings.ANOMALY_BACKEND
+        if backend == "sql":
+            return AnalyticsService._query_anomalies(db, user_id)
+        if backend == "pandas":
+            return AnalyticsService._scan_anomalies(db, user_id)
+        if backend != "flagged":
+            raise ValueError(f"Unknown anomaly backend: {backend}")
+
+        # Users whose running stats haven't been seeded yet get the full-window query
+        has_stats = db.query(UserCarbonStats.user_id).filter(UserCarbonStats.user_id == user_id).first()
+        if not has_stats:
+            return AnalyticsService._query_anomalies(db, user_id)
+
+        cutoff_date = datetime.utcnow() - timedelta(days=90)
+        flagged = ActivityReads.frame(db, select(Activity.id, Activity.description, Activity.carbon_estimate, Activity.timestamp)
+            .where(Activity.user_id == user_id, Activity.is_anomaly, Activity.timestamp >= cutoff_date)
+            .order_by(Activity.carbon_estimate.desc())
+            .limit(5))
+
+        return AnalyticsService._anomaly_records(flagged)
+
+    @staticmethod
+    def _query_anomalies(db: Session, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Same result as _scan_anomalies, pushed down to one query: mean and sample stddev
+        are window aggregates over the user's 90-day window, so only the top rows cross the wire.
+        """
+        cutoff_date = datetime.utcnow() - timedelta(days=90)
+        window = select(
+                Activity.id,
+                Activity.description,
+                Activity.carbon_estimate,
+                Activity.timestamp,
+                ((Activity.carbon_estimate - func.avg(Activity.carbon_estimate).over())
+                    / func.nullif(func.stddev_samp(Activity.carbon_estimate).over(), 0, type_=Float)).label('z_score')
+            )\
+            .where(Activity.user_id == user_id, Activity.timestamp >= cutoff_date)\
+            .subquery()
+
+        anomalies = ActivityReads.frame(db, select(window.c.id, window.c.description, window.c.carbon_estimate, window.c.timestamp)
+            .where(window.c.z_score > settings.ANOMALY_Z_THRESHOLD)
+            .order_by(window.c.carbon_estimate.desc())
+            .limit(5))
+
+        return AnalyticsService._anomaly_records(anomalies)
+
+    @staticmethod
+    def _scan_anomalies(db: Session, user_id: str) -> List[Dict[str, Any]]:
         """
         Detects activities that are statistical outliers (> 2 standard deviations from mean).
         """
         cutoff_date = datetime.utcnow() - timedelta(days=90)
-        activities = db.query(Activity)\
-            .filter(Activity.user_id == user_id, Activity.timestamp >= cutoff_date)\
-            .all()
-            
-        if not activities:
+        df = ActivityReads.user_window(db, user_id, cutoff_date)
+
+        if df.empty:
             return []
 
-        df = pd.DataFrame([{'id': str(a.id), 'carbon': a.carbon_estimate, 'desc': a.description, 'date': a.timestamp} for a in activities])
-        
-        mean = df['carbon'].mean()
-        std = df['carbon'].std()
-        
+        mean = df['carbon_estimate'].mean()
+        std = df['carbon_estimate'].std()
+
         if std == 0:
             return []
-            
+
         # Z-Score
-        df['z_score'] = (df['carbon'] - mean) / std
-        
+        df['z_score'] = (df['carbon_estimate'] - mean) / std
+
         # Anomaly = Z-Score > 2 (Top 5% outliers)
-        anomalies = df[df['z_score'] > 2].sort_values('carbon', ascending=False).head(5)
-        
-        return anomalies[['id', 'desc', 'carbon', 'date']].to_dict('records')
+        anomalies = df[df['z_score'] > settings.ANOMALY_Z_THRESHOLD].sort_values('carbon_estimate', ascending=False).head(5)
+
+        return AnalyticsService._anomaly_records(anomalies)
+
+    @staticmethod
+    def _anomaly_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+        # Only the (at most 5) returned rows are converted to Python objects
+        return [
+            {'id': str(row.id), 'desc': row.description, 'carbon': row.carbon_estimate, 'date': row.timestamp}
+            for row in df.itertuples(index=False)
+        ]
@@ -0,0 +1,149 @@
+import uuid
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.logger import logger
+from ..models.models import UserCarbonStats
+
+ANOMALY_WINDOW_DAYS = 90
+
+def decay_factor(elapsed_days: np.ndarray, half_life_days: float = settings.ANOMALY_HALF_LIFE_DAYS) -> np.ndarray:
+    return np.power(0.5, np.maximum(elapsed_days, 0.0) / half_life_days)
+
+def merge_stats(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """
+    Chan et al. parallel combination of two (count, mean, M2) summaries; works element-wise on arrays.
+    Folding a batch in this way is equivalent to feeding its values one by one through Welford.
+    """
+    n = n_a + n_b
+    safe_n = np.where(n > 0, n, 1.0)
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / safe_n
+    m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / safe_n
+    return n, mean, m2
+
+def z_scores(values: np.ndarray, n: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> np.ndarray:
+    """
+    z of each value against (n, mean, M2) using the sample std; NaN where undefined.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(m2 / (n - 1))
+        z = (values - mean) / std
+    return np.where((n > 1) & (std > 0), z, np.nan)
+
+class AnomalyService:
+    """
+    Write-time anomaly scoring.
+    Each user has running carbon statistics (decayed Welford, half-life ANOMALY_HALF_LIFE_DAYS)
+    in user_carbon_stats. New activities are scored against the stats as they were before the
+    write, flagged when z > ANOMALY_Z_THRESHOLD, and then folded into the stats.
+    """
+
+    @staticmethod
+    def score_activities(db: Session, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Adds z_score / is_anomaly to rows about to be inserted (needs user_id, carbon_estimate)
+        and updates the users' running stats in the caller's transaction.
+        """
+        rows = rows.copy()
+        rows['z_score'] = np.nan
+        rows['is_anomaly'] = False
+        if rows.empty:
+            return rows
+
+        now = datetime.now(timezone.utc)
+        user_key = rows['user_id'].astype(str)
+        batch = pd.DataFrame({'user_id': user_key, 'carbon': rows['carbon_estimate'].astype(float)})\
+            .groupby('user_id')['carbon']\
+            .agg(n_b='count', mean_b='mean', m2_b=lambda c: float(((c - c.mean()) ** 2).sum()))
+
+        prior = AnomalyService._lock_stats(db, list(batch.index))
+        stats = batch.join(prior, how='left').fillna({'count': 0.0, 'mean': 0.0, 'm2': 0.0})
+        elapsed = (now - stats['updated_at'].fillna(now)).dt.total_seconds().to_numpy() / 86400.0
+        f = decay_factor(elapsed)
+        n_a, mean_a, m2_a = stats['count'].to_numpy() * f, stats['mean'].to_numpy(), stats['m2'].to_numpy() * f
+        n, mean, m2 = merge_stats(n_a, mean_a, m2_a,
+                                  stats['n_b'].to_numpy(dtype=float), stats['mean_b'].to_numpy(), stats['m2_b'].to_numpy())
+
+        # Score against the pre-write stats so an outlier can't mask itself; users without
+        # enough history are scored against the combined stats (matches the old batch z-score).
+        warm = n_a >= settings.ANOMALY_MIN_SAMPLES
+        ref = pd.DataFrame({
+            'n': np.where(warm, n_a, n),
+            'mean': np.where(warm, mean_a, mean),
+            'm2': np.where(warm, m2_a, m2),
+            'eligible': n >= settings.ANOMALY_MIN_SAMPLES,
+        }, index=stats.index).loc[user_key]
+
+        z = z_scores(rows['carbon_estimate'].to_numpy(dtype=float),
+                     ref['n'].to_numpy(), ref['mean'].to_numpy(), ref['m2'].to_numpy())
+        rows['z_score'] = z
+        rows['is_anomaly'] = ref['eligible'].to_numpy() & (np.nan_to_num(z, nan=-np.inf) > settings.ANOMALY_Z_THRESHOLD)
+
+        AnomalyService._store_stats(db, pd.DataFrame(
+            {'user_id': stats.index, 'count': n, 'mean': mean, 'm2': m2, 'updated_at': now}
+        ))
+        return rows
+
+    @staticmethod
+    def _lock_stats(db: Session, user_ids: list) -> pd.DataFrame:
+        # Row locks in user_id order, so concurrent writers for overlapping users can't deadlock
+        result = db.execute(text(
+            "SELECT user_id::text AS user_id, count, mean, m2, updated_at FROM user_carbon_stats "
+            "WHERE user_id = ANY(CAST(:ids AS uuid[])) ORDER BY user_id FOR UPDATE"
+        ), {"ids": [str(uuid.UUID(u)) for u in user_ids]})
+        prior = pd.DataFrame(result.all(), columns=['user_id', 'count', 'mean', 'm2', 'updated_at'])
+        prior = prior.astype({'count': float, 'mean': float, 'm2': float})
+        prior['updated_at'] = pd.to_datetime(prior['updated_at'], utc=True)
+        return prior.set_index('user_id')
+
+    @staticmethod
+    def _store_stats(db: Session, stats: pd.DataFrame) -> None:
+        stmt = insert(UserCarbonStats)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserCarbonStats.user_id],
+            set_={col: stmt.excluded[col] for col in ('count', 'mean', 'm2', 'updated_at')}
+        )
+        db.execute(stmt, stats.to_dict('records'))
+
+    @staticmethod
+    def rebuild(db: Session, user_id: Optional[str] = None) -> int:
+        """
+        Seeds running stats from the last ANOMALY_WINDOW_DAYS of activities and re-flags that
+        window in bulk (existing data predates write-time scoring). Commits; returns users seeded.
+        """
+        params = {"window": f"{ANOMALY_WINDOW_DAYS} days", "z": settings.ANOMALY_Z_THRESHOLD,
+                  "min_samples": settings.ANOMALY_MIN_SAMPLES}
+        stats_filter = activity_filter = ""
+        if user_id:
+            params["user_id"] = str(uuid.UUID(str(user_id)))
+            stats_filter = "AND user_id = CAST(:user_id AS uuid) "
+            activity_filter = "AND a.user_id = CAST(:user_id AS uuid)"
+
+        seeded = db.execute(text(
+            "INSERT INTO user_carbon_stats (user_id, count, mean, m2, updated_at) "
+            "SELECT user_id, COUNT(*), AVG(carbon_estimate), "
+            "COALESCE(VAR_SAMP(carbon_estimate) * (COUNT(*) - 1), 0), now() "
+            "FROM activities WHERE timestamp >= now() - CAST(:window AS interval) " + stats_filter +
+            "GROUP BY user_id "
+            "ON CONFLICT (user_id) DO UPDATE SET count = excluded.count, mean = excluded.mean, "
+            "m2 = excluded.m2, updated_at = excluded.updated_at"
+        ), params).rowcount
+
+        db.execute(text(
+            "UPDATE activities a SET "
+            "z_score = CASE WHEN s.m2 > 0 THEN (a.carbon_estimate - s.mean) / sqrt(s.m2 / (s.count - 1)) END, "
+            "is_anomaly = (s.count >= :min_samples AND s.m2 > 0 "
+            "AND (a.carbon_estimate - s.mean) / sqrt(s.m2 / (s.count - 1)) > :z) "
+            "FROM user_carbon_stats s "
+            "WHERE a.user_id = s.user_id AND a.timestamp >= now() - CAST(:window AS interval) " + activity_filter
+        ), params)
+        db.commit()
+
+        logger.info(f"Anomaly stats rebuilt for {seeded} users.")
+        return seeded
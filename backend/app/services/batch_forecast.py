@@ -0,0 +1,172 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from itertools import repeat
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.logger import logger
+from ..db.session import SessionLocal, engine
+from ..models.models import Forecast
+from .forecast_cache import ForecastCache
+
+HISTORY_DAYS = 60  # Same window as the on-demand forecast in AnalyticsService
+
+def fit_linear_trends(Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Closed-form least squares for every row of a (users x days) matrix at once.
+    x is the day index 0..D-1 (shared by all users), so with centred x:
+        slope = sum((x - x_mean) * y) / sum((x - x_mean)^2),  intercept = y_mean - slope * x_mean
+    Equivalent to LinearRegression().fit(x, y) per row, as one matrix-vector product.
+    """
+    n_days = Y.shape[1]
+    x = np.arange(n_days, dtype=np.float64)
+    x_centred = x - x.mean()
+    sxx = x_centred @ x_centred
+    if sxx == 0:
+        return np.zeros(Y.shape[0]), Y.mean(axis=1)
+
+    slope = (Y @ x_centred) / sxx   # sum(x_centred) == 0, so centring Y is unnecessary
+    intercept = Y.mean(axis=1) - slope * x.mean()
+    return slope, intercept
+
+def _chunk_user_ids(db: Session, first_id: str, last_id: str, base_date: date, today: date) -> List[str]:
+    return list(db.execute(text(
+        "SELECT DISTINCT user_id::text FROM daily_carbon_rollup "
+        "WHERE user_id BETWEEN CAST(:first AS uuid) AND CAST(:last AS uuid) AND day BETWEEN :base AND :today"
+    ), {"first": first_id, "last": last_id, "base": base_date, "today": today}).scalars())
+
+def _load_chunk(db: Session, first_id: str, last_id: str, base_date: date, today: date) -> Tuple[List[str], np.ndarray]:
+    """
+    Loads daily totals for a contiguous user-id range into a dense (users x days) matrix.
+    Days without activity stay 0, matching the reindex in get_time_series_data.
+    """
+    rows = db.execute(text(
+        "SELECT user_id::text, day, SUM(total_carbon) "
+        "FROM daily_carbon_rollup "
+        "WHERE user_id BETWEEN CAST(:first AS uuid) AND CAST(:last AS uuid) AND day BETWEEN :base AND :today "
+        "GROUP BY 1, 2"
+    ), {"first": first_id, "last": last_id, "base": base_date, "today": today}).all()
+
+    n_days = (today - base_date).days + 1
+    if not rows:
+        return [], np.zeros((0, n_days))
+
+    user_col, day_col, carbon_col = zip(*rows)
+    user_ids, user_idx = np.unique(np.asarray(user_col), return_inverse=True)
+    day_idx = (np.asarray(day_col, dtype='datetime64[D]') - np.datetime64(base_date, 'D')).astype(np.int64)
+
+    Y = np.zeros((len(user_ids), n_days))
+    Y[user_idx, day_idx] = np.asarray(carbon_col, dtype=np.float64)
+    return list(user_ids), Y
+
+def _run_chunk(bounds: Tuple[str, str], base_date: date, today: date) -> int:
+    """
+    Load -> fit -> upsert for one user range. Module-level so it can run in a process pool.
+    """
+    db = SessionLocal()
+    try:
+        # Data versions are read before the data, like ForecastCache.get_or_compute: a write
+        # committed after this point bumps past the stored version and the row is never served.
+        # Users missing here (or all of them if Redis is down) get no version and always refit.
+        versions = ForecastCache.versions(_chunk_user_ids(db, bounds[0], bounds[1], base_date, today)) or {}
+        user_ids, Y = _load_chunk(db, bounds[0], bounds[1], base_date, today)
+        # Users with no carbon in the window get no forecast, like the on-demand path
+        active = Y.sum(axis=1) != 0
+        if not active.any():
+            return 0
+
+        slope, intercept = fit_linear_trends(Y[active])
+        computed_at = datetime.now(timezone.utc)
+        records = [
+            {"user_id": uid, "slope": float(s), "intercept": float(i), "base_date": base_date,
+             "history_days": Y.shape[1], "computed_at": computed_at, "data_version": versions.get(uid)}
+            for uid, s, i in zip(np.asarray(user_ids)[active], slope, intercept)
+        ]
+
+        stmt = insert(Forecast)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Forecast.user_id],
+            set_={col: stmt.excluded[col] for col in ("slope", "intercept", "base_date", "history_days", "computed_at", "data_version")}
+        )
+        db.execute(stmt, records)
+        db.commit()
+        return len(records)
+    finally:
+        db.close()
+
+def _reset_engine() -> None:
+    # Forked workers must not reuse the parent's pooled connections
+    engine.dispose(close=False)
+
+class BatchForecastEngine:
+    """
+    Nightly precompute of linear-trend forecasts for all users.
+    Users are processed in chunks of contiguous ids so each chunk is one range scan
+    on the rollup PK and one vectorized fit; chunks can be spread over a process pool.
+    """
+    def __init__(self, chunk_size: int = settings.FORECAST_BATCH_CHUNK_USERS, workers: int = 0,
+                 history_days: int = HISTORY_DAYS):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.history_days = history_days
+
+    def run(self, today: Optional[date] = None) -> Dict[str, int]:
+        today = today or datetime.utcnow().date()
+        base_date = today - timedelta(days=self.history_days)
+
+        db = SessionLocal()
+        try:
+            chunks = list(self._user_ranges(db, base_date))
+        finally:
+            db.close()
+
+        logger.info(f"Batch forecast: {len(chunks)} chunks of up to {self.chunk_size} users (workers={self.workers}).")
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_reset_engine) as pool:
+                written = sum(pool.map(_run_chunk, chunks, repeat(base_date), repeat(today)))
+        else:
+            written = sum(_run_chunk(bounds, base_date, today) for bounds in chunks)
+
+        logger.info(f"Batch forecast complete: {written} forecasts written.")
+        return {"chunks": len(chunks), "forecasts": written}
+
+    def _user_ranges(self, db: Session, base_date: date) -> Iterator[Tuple[str, str]]:
+        """
+        Streams distinct active user ids in order and yields (first, last) every chunk_size ids.
+        """
+        result = db.execute(
+            text("SELECT DISTINCT user_id::text FROM daily_carbon_rollup WHERE day >= :base ORDER BY 1"),
+            {"base": base_date},
+            execution_options={"yield_per": self.chunk_size}
+        )
+
+        first = last = None
+        count = 0
+        for (user_id,) in result:
+            if first is None:
+                first = user_id
+            last = user_id
+            count += 1
+            if count == self.chunk_size:
+                yield first, last
+                first, count = None, 0
+        if first is not None:
+            yield first, last
+
+    @staticmethod
+    def predictions_from_row(row: Forecast, days_ahead: int, today: Optional[date] = None) -> List[Dict[str, object]]:
+        """
+        Formats a precomputed fit exactly like AnalyticsService.predict_future_footprint.
+        """
+        today = today or datetime.utcnow().date()
+        x_today = (today - row.base_date).days
+        return [
+            {
+                "date": (today + timedelta(days=i)).strftime("%Y-%m-%d"),
+                "predicted_carbon": max(0.0, round(row.intercept + row.slope * (x_today + i), 2))
+            }
+            for i in range(1, days_ahead + 1)
+        ]
@@ -0,0 +1,135 @@
+from typing import Tuple
+from ..core.config import settings
+from ..core.logger import logger
+from ..core.metrics import LLM_CIRCUIT_REJECTIONS, LLM_CIRCUIT_STATE, LLM_CIRCUIT_TRANSITIONS
+from ..db.redis_client import get_redis
+
+STATE_CODES = {"closed": 0, "half_open": 1, "open": 2}
+
+# One atomic step of the breaker state machine, on Redis server time so all workers agree.
+#   closed    --failure x threshold within window-->  open
+#   open      --open_ms elapsed-->                    half_open (up to max_probes trial calls)
+#   half_open --probe succeeds-->  closed;  --probe fails-->  open
+# 'release' hands back a half-open probe whose call was never made.
+# Returns {state before, state after, allowed}.
+_BREAKER_LUA = """
+local key, op = KEYS[1], ARGV[1]
+local threshold, window, open_ms = tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local max_probes, probe_timeout = tonumber(ARGV[5]), tonumber(ARGV[6])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local h = redis.call('HMGET', key, 'state', 'failures', 'window_start', 'opened_at', 'probes', 'probe_at')
+local before = h[1] or 'closed'
+local state = before
+local failures, window_start = tonumber(h[2]) or 0, tonumber(h[3]) or now
+local opened_at, probes, probe_at = tonumber(h[4]) or 0, tonumber(h[5]) or 0, tonumber(h[6]) or 0
+local allowed = 0
+
+if state == 'open' and now - opened_at >= open_ms then
+  state, probes = 'half_open', 0
+end
+if state == 'half_open' and probes > 0 and now - probe_at >= probe_timeout then
+  probes = 0  -- the probe never reported back (worker died, call shed...)
+end
+
+if op == 'allow' then
+  if state == 'closed' then
+    allowed = 1
+  elseif state == 'half_open' and probes < max_probes then
+    allowed, probes, probe_at = 1, probes + 1, now
+  end
+elseif op == 'release' then
+  if state == 'half_open' and probes > 0 then
+    probes = probes - 1
+  end
+elseif op == 'success' then
+  -- A late success from before the circuit opened must not close it
+  if state ~= 'open' then
+    state, failures, probes = 'closed', 0, 0
+  end
+elseif op == 'failure' then
+  if state == 'half_open' then
+    state, opened_at, probes = 'open', now, 0
+  elseif state == 'closed' then
+    if now - window_start > window then
+      failures, window_start = 0, now
+    end
+    failures = failures + 1
+    if failures >= threshold then
+      state, opened_at, failures = 'open', now, 0
+    end
+  end
+end
+
+redis.call('HSET', key, 'state', state, 'failures', failures, 'window_start', window_start,
+           'opened_at', opened_at, 'probes', probes, 'probe_at', probe_at)
+return {before, state, allowed}
+"""
+
+class CircuitBreaker:
+    """
+    Circuit breaker whose state lives in Redis, so every worker process trips and recovers together.
+    Callers ask allow() before the protected call and report record_success/record_failure after it,
+    or release() if they end up not making it (a half-open probe slot is handed back).
+    While open, allow() is False and callers should use their local fallback immediately.
+    If Redis is unreachable the breaker stays out of the way (allow() is True).
+    """
+    def __init__(self, name: str,
+                 failure_threshold: int = settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+                 failure_window_seconds: float = settings.LLM_CIRCUIT_FAILURE_WINDOW_SECONDS,
+                 open_seconds: float = settings.LLM_CIRCUIT_OPEN_SECONDS,
+                 half_open_probes: int = settings.LLM_CIRCUIT_HALF_OPEN_PROBES,
+                 probe_timeout_seconds: float = settings.LLM_REQUEST_TIMEOUT_SECONDS * 2):
+        self.name = name
+        self.key = f"circuit:{name}"
+        self.args = [failure_threshold, int(failure_window_seconds * 1000), int(open_seconds * 1000),
+                     half_open_probes, int(probe_timeout_seconds * 1000)]
+        self._script = None
+
+    def allow(self) -> bool:
+        allowed = self._step("allow")[1]
+        if not allowed:
+            LLM_CIRCUIT_REJECTIONS.inc()
+        return allowed
+
+    def record_success(self) -> None:
+        self._step("success")
+
+    def record_failure(self) -> None:
+        self._step("failure")
+
+    def release(self) -> None:
+        self._step("release")
+
+    def state(self) -> str:
+        """
+        closed | half_open | open, unknown when Redis can't be reached, or disabled.
+        """
+        return self._step("state")[0]
+
+    def state_code(self) -> float:
+        return float(STATE_CODES.get(self.state(), -1))
+
+    def _step(self, op: str) -> Tuple[str, bool]:
+        if not settings.LLM_CIRCUIT_ENABLED:
+            return "disabled", True
+        try:
+            if self._script is None:
+                self._script = get_redis().register_script(_BREAKER_LUA)
+            before, after, allowed = self._script(keys=[self.key], args=[op, *self.args])
+        except Exception as e:
+            logger.warning(f"Circuit breaker '{self.name}' unavailable: {e}")
+            LLM_CIRCUIT_STATE.set(-1)
+            return "unknown", True
+
+        before, after = before.decode(), after.decode()
+        # Every call already reads the shared state, so scrapes cost no Redis round trip
+        LLM_CIRCUIT_STATE.set(STATE_CODES[after])
+        if after != before:
+            LLM_CIRCUIT_TRANSITIONS.labels(state=after).inc()
+            log = logger.warning if after == "open" else logger.info
+            log(f"Circuit breaker '{self.name}': {before} -> {after}")
+        return after, bool(allowed)
+
+llm_breaker = CircuitBreaker("llm")
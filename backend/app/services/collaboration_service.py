@@ -1,29 +1,102 @@
-from typing import List, Dict
+from typing import Any, Dict, List, Optional
+from ..core.config import settings
+from ..db.redis_client import get_redis
 from .graph_service import GraphService
 
+# One per process: the service holds no per-instance state worth duplicating
+_graph_service = GraphService()
+
+def _members_key(session_id: str) -> str:
+    return f"collab:session:{session_id}:members"
+
+def _user_sessions_key(user_id: str) -> str:
+    return f"collab:user:{user_id}:sessions"
+
 class CollaborationService:
-    def __init__(self):
-        self.active_sessions: Dict[str, List[str]] = {} # session_id -> list of user_ids
-        self.graph_service = GraphService()
+    """
+    Shared-twin sessions. Membership lives in Redis sets with a sliding TTL
+    (COLLAB_SESSION_TTL_SECONDS), so every API worker and replica sees the same sessions.
+    """
+    def __init__(self, graph_service: Optional[GraphService] = None):
+        self.graph_service = graph_service or _graph_service
+        self.ttl_seconds = settings.COLLAB_SESSION_TTL_SECONDS
 
     def link_twins(self, session_id: str, user_ids: List[str]):
         """
         Creates a 'Shared Twin' context where certain nodes (e.g., Shared Vehicle)
-        are linked across multiple graphs.
+        are linked across multiple graphs. Replaces the session's previous members.
+        """
+        members = list(dict.fromkeys(str(u) for u in user_ids))
+        key = _members_key(session_id)
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.delete(key)
+        if members:
+            pipe.sadd(key, *members)
+            pipe.expire(key, self.ttl_seconds)
+        for user_id in members:
+            pipe.sadd(_user_sessions_key(user_id), session_id)
+            pipe.expire(_user_sessions_key(user_id), self.ttl_seconds)
+        pipe.execute()
+        return {"status": "linked", "session": session_id, "members": members, "expires_in": self.ttl_seconds}
+
+    def get_members(self, session_id: str) -> List[str]:
+        """
+        Current members of a session ([] once it has expired); reading it extends the TTL.
         """
-        self.active_sessions[session_id] = user_ids
-        # In a real implementation, this would merge graph sub-structures
-        return {"status": "linked", "session": session_id, "members": user_ids}
+        key = _members_key(session_id)
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.smembers(key)
+        pipe.expire(key, self.ttl_seconds)
+        members, _ = pipe.execute()
+        return sorted(m.decode() for m in members)
 
-    def share_resource(self, resource_id: str, members: List[str]):
+    def get_user_sessions(self, user_id: str) -> List[str]:
+        """
+        Sessions the user was linked into that are still alive.
+        """
+        session_ids = sorted(s.decode() for s in get_redis().smembers(_user_sessions_key(user_id)))
+        if not session_ids:
+            return []
+        pipe = get_redis().pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.sismember(_members_key(session_id), user_id)
+        return [s for s, alive in zip(session_ids, pipe.execute()) if alive]
+
+    def share_resource(self, resource_id: str, members: Optional[List[str]] = None,
+                       session_id: Optional[str] = None, total_carbon: float = 0.0) -> Dict[str, Any]:
         """
         Apportion carbon footprint of a resource across linked twins.
+        Members come from the argument or from the session. Every member gets an
+        equal share, and all (:User)-[:SHARES {weight: share}]->(:Source) edges
+        are written in one batched graph operation.
         """
+        if members is None and session_id is not None:
+            members = self.get_members(session_id)
+        members = list(dict.fromkeys(str(m) for m in members or []))
+        if not members:
+            raise ValueError("share_resource needs at least one member")
+
         # Logic: If 2 people share 1 car, calculate individual footprint as 50%
         # but keep total resource impact consistent.
         impact_factor = 1.0 / len(members)
+        allocations = [
+            {"user_id": user_id, "share": impact_factor, "carbon": total_carbon * impact_factor}
+            for user_id in members
+        ]
+
+        nodes = [{"label": "User", "properties": {"id": user_id}} for user_id in members]
+        nodes.append({"label": "Source", "properties": {"id": resource_id, "shared": True,
+                                                        "total_carbon": float(total_carbon)}})
+        self.graph_service.create_nodes(nodes, owners=members)
+        edges_written = self.graph_service.create_relationships(
+            ({"source_id": a["user_id"], "target_id": resource_id, "rel_type": "SHARES", "weight": a["share"]}
+             for a in allocations),
+            owners=members
+        )
         return {
             "resource": resource_id,
             "individual_allocation": impact_factor,
+            "allocations": allocations,
+            "edges_written": edges_written,
             "note": "Shared resource detection successful"
         }
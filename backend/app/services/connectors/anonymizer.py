@@ -1,33 +1,59 @@
 import re
+from typing import List
+
+# Precompiled once. Each pattern is an exact equivalent of the original PoC regex, rewritten so
+# the regex engine can skip ahead on its first character (a leading \b or lookbehind prevents that).
+# Mask phone numbers: \b\d{10}\b
+_PHONE_RE = re.compile(r'\d(?<!\w\d)\d{9}(?!\w)')
+# Mask emails (the local part can never give back characters to '@', hence possessive)
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]++@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+# Mask potential names (Simplified: Words starting with uppercase after specific titles)
+_NAME_RE = re.compile(r'(?:Mr\.|Ms\.|Mrs\.|John|Jane|Doe)\s+\w+')
+# Mask exact street addresses (Simplified): \d+\s+[A-Za-z]+\s+(St|Ave|Rd|Blvd)
+_ADDRESS_SUFFIXES = ("St", "Ave", "Rd", "Blvd")
+_ADDRESS_RE = re.compile(r'\d(?<!\d\d)\d*\s+[A-Za-z]+\s+(?:St|Ave|Rd|Blvd)')
+
+_CATEGORY_KEYWORDS = (
+    ("Mobility", ("flight", "travel", "uber", "gas")),
+    ("Consumption", ("food", "grocery", "restaurant", "meat")),
+    ("Housing", ("electricity", "heating", "water", "solar")),
+)
+
+_BATCH_SEPARATOR = "\n\x00\n"  # No pattern can match across it
 
 class Anonymizer:
     @staticmethod
     def strip_pii(text: str) -> str:
         """
         Removes PII like names, exact addresses, and phone numbers.
-        Simplified for PoC using regex.
+        Simplified for PoC using regex. Passes whose required literal ('@', a street
+        suffix) is absent are skipped with a plain substring check.
         """
-        # Mask phone numbers
-        text = re.sub(r'\b\d{10}\b', '[PHONE]', text)
-        # Mask emails
-        text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', text)
-        # Mask potential names (Simplified: Words starting with uppercase after specific titles)
-        text = re.sub(r'(Mr\.|Ms\.|Mrs\.|John|Jane|Doe)\s+\w+', '[NAME]', text)
-        # Mask exact street addresses (Simplified)
-        text = re.sub(r'\d+\s+[A-Za-z]+\s+(St|Ave|Rd|Blvd)', '[ADDRESS]', text)
-        
+        text = _PHONE_RE.sub('[PHONE]', text)
+        if '@' in text:
+            text = _EMAIL_RE.sub('[EMAIL]', text)
+        text = _NAME_RE.sub('[NAME]', text)
+        if any(suffix in text for suffix in _ADDRESS_SUFFIXES):
+            text = _ADDRESS_RE.sub('[ADDRESS]', text)
         return text
 
+    @staticmethod
+    def strip_pii_batch(texts: List[str]) -> List[str]:
+        """
+        strip_pii for many texts at once: they are joined, masked in one run of each pass
+        and split again, so per-call overhead is paid once per batch instead of per text.
+        """
+        if len(texts) < 2 or any(_BATCH_SEPARATOR in t for t in texts):
+            return [Anonymizer.strip_pii(t) for t in texts]
+        return Anonymizer.strip_pii(_BATCH_SEPARATOR.join(texts)).split(_BATCH_SEPARATOR)
+
     @staticmethod
     def categorize(text: str) -> str:
         """
         Groups data into high-level categories for the AI.
         """
         text_lower = text.lower()
-        if any(w in text_lower for w in ["flight", "travel", "uber", "gas"]):
-            return "Mobility"
-        if any(w in text_lower for w in ["food", "grocery", "restaurant", "meat"]):
-            return "Consumption"
-        if any(w in text_lower for w in ["electricity", "heating", "water", "solar"]):
-            return "Housing"
+        for category, keywords in _CATEGORY_KEYWORDS:
+            if any(w in text_lower for w in keywords):
+                return category
         return "Miscellaneous"
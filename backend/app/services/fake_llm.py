@@ -0,0 +1,72 @@
+import asyncio
+import json
+import random
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from ..core.config import settings
+from .rule_classifier import RuleClassifier
+
+# The last item ends where the instructions start, not at the end of the prompt
+_ITEM_RE = re.compile(r"### ITEM (\d+)\n(.*?)(?=\n\n### ITEM \d+\n|\n\nINSTRUCTIONS:|\Z)", re.DOTALL)
+_DATA_RE = re.compile(r"DATA:\s*(.*?)\n\nINSTRUCTIONS:", re.DOTALL)
+
+class FakeLLMError(Exception):
+    """Simulated provider failure (5xx, quota, network)."""
+
+@dataclass
+class FakeMessage:
+    content: str
+
+class FakeLLM:
+    """
+    Offline stand-in for the chat model (LLM_BACKEND=fake), for load tests without a Gemini key.
+    ainvoke() answers single and batch prompts with schema-conformant JSON (values from the local
+    rule classifier) after a simulated delay. Latency is lognormal around latency_ms, plus
+    latency_ms_per_item for batch prompts. A call fails with probability error_rate and is
+    retried up to max_retries times with exponential backoff, like the provider client.
+    """
+    def __init__(self, latency_ms: float = settings.FAKE_LLM_LATENCY_MS,
+                 latency_sigma: float = settings.FAKE_LLM_LATENCY_SIGMA,
+                 latency_ms_per_item: float = settings.FAKE_LLM_LATENCY_MS_PER_ITEM,
+                 error_rate: float = settings.FAKE_LLM_ERROR_RATE,
+                 max_retries: int = settings.LLM_MAX_RETRIES,
+                 retry_backoff_ms: float = settings.FAKE_LLM_RETRY_BACKOFF_MS,
+                 seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.latency_ms_per_item = latency_ms_per_item
+        self.error_rate = error_rate
+        self.max_retries = max_retries
+        self.retry_backoff_ms = retry_backoff_ms
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    async def ainvoke(self, messages: List[Any]) -> FakeMessage:
+        prompt = "\n".join(str(getattr(m, "content", m)) for m in messages)
+        items = [(int(i), text) for i, text in _ITEM_RE.findall(prompt)]
+        for attempt in range(self.max_retries + 1):
+            self.calls += 1
+            await asyncio.sleep(self.sample_latency(len(items)) / 1000.0)
+            if self.rng.random() >= self.error_rate:
+                return FakeMessage(self._answer(prompt, items))
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.retry_backoff_ms * 2 ** attempt / 1000.0)
+        raise FakeLLMError(f"simulated provider error after {self.max_retries + 1} attempts")
+
+    def sample_latency(self, items: int = 0) -> float:
+        return self.latency_ms * self.rng.lognormvariate(0.0, self.latency_sigma) + items * self.latency_ms_per_item
+
+    @staticmethod
+    def _record(text: str) -> Dict[str, Any]:
+        record = RuleClassifier.to_result(RuleClassifier.classify(text), "fake_llm")
+        record.pop("inference_method")
+        return record
+
+    def _answer(self, prompt: str, items: List[Any]) -> str:
+        if items:
+            payload: Any = [{"index": i, **self._record(text)} for i, text in items]
+        else:
+            match = _DATA_RE.search(prompt)
+            payload = self._record(match.group(1) if match else prompt)
+        return f"```json\n{json.dumps(payload)}\n```"
@@ -0,0 +1,93 @@
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from ..core.config import settings
+from ..core.logger import logger
+from ..core.metrics import FORECAST_CACHE_REQUESTS
+from ..db.redis_client import get_redis
+
+class ForecastCache:
+    """
+    Per-user forecast cache in Redis, keyed by user and days_ahead.
+    Every entry carries the user's data version at compute time; writers bump the
+    version after committing new activities, which orphans all of that user's entries.
+    TTL bounds staleness for anything that changes data without bumping.
+    Redis failures degrade to a cache miss, never to a failed request.
+    """
+    @staticmethod
+    def _version_key(user_id: str) -> str:
+        return f"forecast:ver:{user_id}"
+
+    @staticmethod
+    def _version_ttl() -> int:
+        return max(settings.FORECAST_CACHE_TTL_SECONDS * 24, settings.FORECAST_PRECOMPUTED_MAX_AGE_HOURS * 3600)
+
+    @staticmethod
+    def _entry_key(user_id: str, days_ahead: int) -> str:
+        # Forecast dates are relative to "today", so entries never cross a UTC day boundary
+        return f"forecast:{user_id}:{days_ahead}:{datetime.utcnow().date().isoformat()}"
+
+    @staticmethod
+    def get_or_compute(user_id: str, days_ahead: int, compute: Callable[[], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        user_id = str(user_id)
+        entry_key = ForecastCache._entry_key(user_id, days_ahead)
+        try:
+            version, entry = get_redis().mget(ForecastCache._version_key(user_id), entry_key)
+            version = int(version or 0)
+            if entry:
+                cached = json.loads(entry)
+                if cached.get("v") == version:
+                    FORECAST_CACHE_REQUESTS.labels(result="hit").inc()
+                    return cached["data"]
+            FORECAST_CACHE_REQUESTS.labels(result="miss").inc()
+        except Exception as e:
+            logger.warning(f"Forecast cache unavailable: {e}")
+            FORECAST_CACHE_REQUESTS.labels(result="error").inc()
+            return compute()
+
+        # Stored under the version read *before* computing: a concurrent write bumps
+        # the version, so a result computed from older data can never be served as current.
+        data = compute()
+        try:
+            get_redis().set(
+                entry_key,
+                json.dumps({"v": version, "data": data}),
+                ex=settings.FORECAST_CACHE_TTL_SECONDS
+            )
+        except Exception as e:
+            logger.warning(f"Forecast cache write failed: {e}")
+        return data
+
+    @staticmethod
+    def versions(user_ids: Iterable[Any]) -> Optional[Dict[str, int]]:
+        """
+        Current data versions by user id, or None when Redis is unavailable.
+        """
+        user_ids = [str(u) for u in user_ids]
+        if not user_ids:
+            return {}
+        try:
+            values = get_redis().mget([ForecastCache._version_key(u) for u in user_ids])
+        except Exception as e:
+            logger.warning(f"Forecast cache versions unavailable: {e}")
+            return None
+        return {u: int(v or 0) for u, v in zip(user_ids, values)}
+
+    @staticmethod
+    def bump_versions(user_ids: Iterable[Any]) -> None:
+        """
+        Invalidates cached forecasts for the given users. Call after the write is committed.
+        """
+        keys = {ForecastCache._version_key(str(u)) for u in user_ids}
+        if not keys:
+            return
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for key in keys:
+                pipe.incr(key)
+                # Outlives any entry TTL and precomputed forecast, so an expired counter
+                # can't resurrect old entries or rows
+                pipe.expire(key, ForecastCache._version_ttl())
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Forecast cache invalidation failed for {len(keys)} users: {e}")
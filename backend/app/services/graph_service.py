@@ -1,6 +1,79 @@
-from app.db.neo4j_driver import neo4j_driver
+from app.core.config import settings
+from app.db.neo4j_driver import async_neo4j_driver, neo4j_driver
+from collections import defaultdict
 from loguru import logger
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional
+import asyncio
+import pandas as pd
+from .impact_propagation import invalidate_twin_graphs
+
+# SECURITY: labels and relationship types can't be query parameters, so they are
+# interpolated into Cypher only after passing these allowlists (prevents Cypher Injection).
+ALLOWED_LABELS = {"User", "Activity", "Location", "Source"}
+ALLOWED_RELS = {"PERFORMED", "LOCATED_AT", "HAS_SOURCE", "SHARES", "IMPACTS"}
+
+# Endpoint labels implied by each relationship type, so node lookups are index seeks on
+# (:Label {id}). IMPACTS can join any two labels: callers name them explicitly.
+REL_ENDPOINTS = {
+    "PERFORMED": ("User", "Activity"),
+    "LOCATED_AT": ("Activity", "Location"),
+    "HAS_SOURCE": ("Activity", "Source"),
+    "SHARES": ("User", "Source"),  # A user's share of a resource used in a shared-twin session
+}
+
+def _endpoint_labels(rel_type: str, source_label: Optional[str], target_label: Optional[str]):
+    """
+    (source, target) labels for an edge, or None when unknown or not allowlisted.
+    """
+    default_source, default_target = REL_ENDPOINTS.get(rel_type, (None, None))
+    labels = (source_label or default_source, target_label or default_target)
+    if not all(label in ALLOWED_LABELS for label in labels):
+        return None
+    return labels
+
+def _node_query(label: str) -> Optional[str]:
+    if label not in ALLOWED_LABELS:
+        logger.error(f"Security Alert: Attempted to use invalid node label '{label}'")
+        return None
+    return (
+        f"MERGE (n:{label} {{id: $id}}) "
+        "SET n += $props "
+        "RETURN n"
+    )
+
+def _link_query(rel_type: str, source_label: Optional[str], target_label: Optional[str]) -> Optional[str]:
+    if rel_type not in ALLOWED_RELS:
+        logger.error(f"Security Alert: Attempted to use invalid relationship type '{rel_type}'")
+        return None
+    labels = _endpoint_labels(rel_type, source_label, target_label)
+    if labels is None:
+        logger.error(f"Graph Error (Link): no valid endpoint labels for {rel_type} ({source_label}, {target_label})")
+        return None
+    return (
+        f"MATCH (a:{labels[0]} {{id: $source_id}}) "
+        f"MATCH (b:{labels[1]} {{id: $target_id}}) "
+        f"MERGE (a)-[r:{rel_type}]->(b) "
+        "SET r.weight = $weight "
+        "RETURN r"
+    )
+
+def _impact_query(start_label: str) -> Optional[str]:
+    if start_label not in ALLOWED_LABELS:
+        logger.error(f"Security Alert: Attempted to use invalid node label '{start_label}'")
+        return None
+    return (
+        f"MATCH (start:{start_label} {{id: $start_id}})-[r]->(downstream) "
+        "RETURN downstream.id as target, labels(downstream) as label, type(r) as action, r.weight as weight"
+    )
+
+def _impact_result(record: Any, delta: float) -> Dict[str, Any]:
+    # Simple propagation logic: New Delta = Input Delta * Edge Weight
+    return {
+        "target": record["target"],
+        "label": record["label"][0] if record["label"] else "Unknown",
+        "action": record["action"],
+        "magnitude": delta * record["weight"]
+    }
 
 class GraphService:
     """
@@ -15,71 +88,223 @@ class GraphService:
         Creates a node in Neo4j with the given label and properties.
         SECURITY: Validates label against allowlist to prevent Cypher Injection.
         """
-        ALLOWED_LABELS = {"User", "Activity", "Location", "Source"}
-        if label not in ALLOWED_LABELS:
-            logger.error(f"Security Alert: Attempted to use invalid node label '{label}'")
+        query = _node_query(label)
+        if query is None:
             return None
-
-        query = (
-            f"MERGE (n:{label} {{id: $id}}) "
-            "SET n += $props "
-            "RETURN n"
-        )
         try:
             with self.driver.get_session() as session:
                 result = session.run(query, id=properties.get("id"), props=properties)
-                return result.single()[0]
+                node = result.single()[0]
+            invalidate_twin_graphs()
+            return node
         except Exception as e:
             logger.error(f"Graph Error (Create Node): {e}")
             return None
 
-    def create_relationship(self, source_id: str, target_id: str, rel_type: str, weight: float = 1.0):
+    def create_relationship(self, source_id: str, target_id: str, rel_type: str, weight: float = 1.0,
+                            source_label: Optional[str] = None, target_label: Optional[str] = None):
         """
         Creates a directed relationship between two nodes.
-        SECURITY: Validates rel_type against allowlist.
+        Endpoint labels default from REL_ENDPOINTS (required for IMPACTS).
+        SECURITY: Validates rel_type and labels against allowlists.
         """
-        ALLOWED_RELS = {"PERFORMED", "LOCATED_AT", "HAS_SOURCE", "IMPACTS"}
-        if rel_type not in ALLOWED_RELS:
-            logger.error(f"Security Alert: Attempted to use invalid relationship type '{rel_type}'")
+        query = _link_query(rel_type, source_label, target_label)
+        if query is None:
             return
-
-        query = (
-            "MATCH (a), (b) "
-            "WHERE a.id = $source_id AND b.id = $target_id "
-            f"MERGE (a)-[r:{rel_type}]->(b) "
-            "SET r.weight = $weight "
-            "RETURN r"
-        )
         try:
             with self.driver.get_session() as session:
-                session.run(query, source_id=source_id, target_id=target_id, weight=weight)
+                session.run(query, source_id=source_id, target_id=target_id, weight=weight).consume()
+            invalidate_twin_graphs()
         except Exception as e:
             logger.error(f"Graph Error (Link): {e}")
 
-    def simulate_impact(self, start_node_id: str, delta: float) -> List[Dict[str, Any]]:
+    def create_nodes(self, nodes: Iterable[Dict[str, Any]], batch_size: Optional[int] = None,
+                     owners: Optional[Iterable[Any]] = None) -> int:
+        """
+        Bulk create_node: nodes are {"label": ..., "properties": {...}} (properties need an id).
+        Grouped by label and written with UNWIND ... MERGE, one transaction per batch_size rows.
+        owners (user ids whose twins the write touches) limits cache invalidation to them.
+        Returns the number of nodes written.
+        """
+        by_label: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for node in nodes:
+            by_label[node["label"]].append({"id": node["properties"].get("id"), "props": node["properties"]})
+
+        written = 0
+        for label, rows in by_label.items():
+            if label not in ALLOWED_LABELS:
+                logger.error(f"Security Alert: Attempted to use invalid node label '{label}' ({len(rows)} nodes skipped)")
+                continue
+            query = (
+                "UNWIND $rows AS row "
+                f"MERGE (n:{label} {{id: row.id}}) "
+                "SET n += row.props"
+            )
+            written += self._write_batches(query, rows, batch_size, "Create Nodes")
+        if written:
+            invalidate_twin_graphs(owners)
+        return written
+
+    def create_relationships(self, edges: Iterable[Dict[str, Any]], batch_size: Optional[int] = None,
+                             owners: Optional[Iterable[Any]] = None) -> int:
+        """
+        Bulk create_relationship: edges are {"source_id", "target_id", "rel_type"} plus optional
+        "weight", "source_label" and "target_label". Grouped by type and endpoint labels and written
+        with UNWIND ... MERGE, one transaction per batch_size rows. owners as for create_nodes.
+        Returns the number of edges written.
+        """
+        by_type: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+        for edge in edges:
+            key = (edge["rel_type"], edge.get("source_label"), edge.get("target_label"))
+            by_type[key].append({
+                "source_id": edge["source_id"], "target_id": edge["target_id"], "weight": edge.get("weight", 1.0)
+            })
+
+        written = 0
+        for (rel_type, source_label, target_label), rows in by_type.items():
+            if rel_type not in ALLOWED_RELS:
+                logger.error(f"Security Alert: Attempted to use invalid relationship type '{rel_type}' ({len(rows)} edges skipped)")
+                continue
+            labels = _endpoint_labels(rel_type, source_label, target_label)
+            if labels is None:
+                logger.error(f"Graph Error (Link Batch): no valid endpoint labels for {rel_type} "
+                             f"({source_label}, {target_label}); {len(rows)} edges skipped")
+                continue
+            query = (
+                "UNWIND $rows AS row "
+                f"MATCH (a:{labels[0]} {{id: row.source_id}}) "
+                f"MATCH (b:{labels[1]} {{id: row.target_id}}) "
+                f"MERGE (a)-[r:{rel_type}]->(b) "
+                "SET r.weight = row.weight"
+            )
+            written += self._write_batches(query, rows, batch_size, "Link Batch")
+        if written:
+            invalidate_twin_graphs(owners)
+        return written
+
+    def project_activities(self, rows: pd.DataFrame) -> Dict[str, int]:
+        """
+        Projects activity rows (as inserted into Postgres) into the graph:
+        (:User)-[:PERFORMED {weight: carbon_estimate}]->(:Activity).
+        """
+        if rows.empty:
+            return {"nodes": 0, "edges": 0}
+        records = rows.to_dict('records')
+        activities = [{
+            "label": "Activity",
+            "properties": {
+                "id": str(r["id"]),
+                "activity_type": r.get("activity_type"),
+                "description": r.get("description"),
+                "carbon_estimate": float(r["carbon_estimate"]),
+                "timestamp": pd.Timestamp(r["timestamp"]).isoformat(),
+            }
+        } for r in records]
+        users = [{"label": "User", "properties": {"id": user_id}} for user_id in {str(r["user_id"]) for r in records}]
+        edges = [{"source_id": str(r["user_id"]), "target_id": str(r["id"]), "rel_type": "PERFORMED",
+                  "weight": float(r["carbon_estimate"])} for r in records]
+
+        owners = [u["properties"]["id"] for u in users]
+        nodes = self.create_nodes(users + activities, owners=owners)
+        return {"nodes": nodes, "edges": self.create_relationships(edges, owners=owners)}
+
+    def _write_batches(self, query: str, rows: List[Dict[str, Any]], batch_size: Optional[int], what: str) -> int:
+        batch_size = batch_size or settings.GRAPH_WRITE_BATCH_SIZE
+        written = 0
+        try:
+            with self.driver.get_session() as session:
+                for start in range(0, len(rows), batch_size):
+                    batch = rows[start:start + batch_size]
+                    session.execute_write(lambda tx: tx.run(query, rows=batch).consume())
+                    written += len(batch)
+        except Exception as e:
+            logger.error(f"Graph Error ({what}): {e} after {written}/{len(rows)} rows")
+        return written
+
+    def ensure_schema(self) -> int:
+        """
+        Startup bootstrap: a uniqueness constraint on id for every allowed label. Each one is
+        backed by an index, which turns the label-scoped id lookups into index seeks.
+        Idempotent; returns the number of labels covered.
+        """
+        created = 0
+        try:
+            with self.driver.get_session() as session:
+                for label in sorted(ALLOWED_LABELS):
+                    session.run(
+                        f"CREATE CONSTRAINT {label.lower()}_id_unique IF NOT EXISTS "
+                        f"FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+                    ).consume()
+                    created += 1
+        except Exception as e:
+            logger.error(f"Graph Error (Schema): {e}")
+        return created
+
+    def simulate_impact(self, start_node_id: str, delta: float, start_label: str = "User") -> List[Dict[str, Any]]:
         """
         Executes a Cypher query to simulate cascading impact.
         Finds downstream nodes and calculates 'felt' impact based on edge weights.
         """
-        query = (
-            "MATCH (start {id: $start_id})-[r]->(downstream) "
-            "RETURN downstream.id as target, labels(downstream) as label, type(r) as action, r.weight as weight"
-        )
-        
+        query = _impact_query(start_label)
+        if query is None:
+            return []
+
         impact_results = []
         try:
             with self.driver.get_session() as session:
                 records = session.run(query, start_id=start_node_id)
-                for record in records:
-                    # Simple propagation logic: New Delta = Input Delta * Edge Weight
-                    propagated_delta = delta * record["weight"]
-                    impact_results.append({
-                        "target": record["target"],
-                        "label": record["label"][0] if record["label"] else "Unknown",
-                        "action": record["action"],
-                        "magnitude": propagated_delta
-                    })
+                impact_results = [_impact_result(record, delta) for record in records]
         except Exception as e:
             logger.error(f"Graph Error (Simulation): {e}")
         
         return impact_results
+
+class AsyncGraphService:
+    """
+    GraphService for async request handlers: same queries and allowlists, on the async
+    driver, so a Bolt round trip never blocks the event loop. Celery workers keep GraphService.
+    No API route reads or writes the graph yet (graph writes all come from workers);
+    the first async handler that does should use this class, not GraphService.
+    """
+    def __init__(self):
+        self.driver = async_neo4j_driver
+
+    async def create_node(self, label: str, properties: Dict[str, Any]):
+        query = _node_query(label)
+        if query is None:
+            return None
+        try:
+            async with self.driver.get_session() as session:
+                result = await session.run(query, id=properties.get("id"), props=properties)
+                record = await result.single()
+            # Redis round trip on the sync client: off the event loop
+            await asyncio.to_thread(invalidate_twin_graphs)
+            return record[0]
+        except Exception as e:
+            logger.error(f"Graph Error (Create Node): {e}")
+            return None
+
+    async def create_relationship(self, source_id: str, target_id: str, rel_type: str, weight: float = 1.0,
+                                  source_label: Optional[str] = None, target_label: Optional[str] = None):
+        query = _link_query(rel_type, source_label, target_label)
+        if query is None:
+            return
+        try:
+            async with self.driver.get_session() as session:
+                result = await session.run(query, source_id=source_id, target_id=target_id, weight=weight)
+                await result.consume()
+            await asyncio.to_thread(invalidate_twin_graphs)
+        except Exception as e:
+            logger.error(f"Graph Error (Link): {e}")
+
+    async def simulate_impact(self, start_node_id: str, delta: float, start_label: str = "User") -> List[Dict[str, Any]]:
+        query = _impact_query(start_label)
+        if query is None:
+            return []
+        try:
+            async with self.driver.get_session() as session:
+                result = await session.run(query, start_id=start_node_id)
+                return [_impact_result(record, delta) async for record in result]
+        except Exception as e:
+            logger.error(f"Graph Error (Simulation): {e}")
+            return []
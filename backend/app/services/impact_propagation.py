@@ -0,0 +1,196 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
+from ..core.config import settings
+from ..core.logger import logger
+from ..db.neo4j_driver import neo4j_driver
+from ..db.redis_client import get_redis
+from .inference_cache import LRUDict
+
+GLOBAL_VERSION_KEY = "twin_graph:version"
+
+def _user_version_key(user_id: str) -> str:
+    return f"twin_graph:version:{user_id}"
+
+# Bumped by writes in this process, so they invalidate even without Redis: one counter for
+# unscoped writes, one per user for scoped ones (another user's write keeps a twin cached)
+_local_generation = 0
+_local_user_generations: Dict[str, int] = {}
+
+def invalidate_twin_graphs(user_ids: Optional[Iterable[Any]] = None) -> None:
+    """
+    Call after a graph write. With user_ids only those users' cached subgraphs are dropped;
+    without, every cached subgraph is (writes that can't tell which twins they touch).
+    """
+    global _local_generation
+    if user_ids is None:
+        _local_generation += 1
+        keys = [GLOBAL_VERSION_KEY]
+    else:
+        user_ids = {str(u) for u in user_ids}
+        for user_id in user_ids:
+            _local_user_generations[user_id] = _local_user_generations.get(user_id, 0) + 1
+        keys = [_user_version_key(u) for u in user_ids]
+    if not keys:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(key)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Twin graph cache invalidation failed: {e}")
+
+@dataclass
+class TwinGraph:
+    """
+    A user's twin subgraph in CSR form: the out-edges of node i are
+    indices[indptr[i]:indptr[i + 1]] with matching weights.
+    """
+    node_ids: np.ndarray   # str, position = node index
+    labels: np.ndarray     # str, first label of each node
+    indptr: np.ndarray     # int64, len(nodes) + 1
+    indices: np.ndarray    # int64, target node of each edge
+    weights: np.ndarray    # float64, edge weight
+
+    @classmethod
+    def from_edges(cls, edges: Sequence[Tuple[str, str, str, str, float]]) -> "TwinGraph":
+        """
+        edges: (source id, source label, target id, target label, weight); missing weights count as 1.
+        """
+        if not edges:
+            empty = np.array([], dtype=object)
+            return cls(empty, empty, np.zeros(1, dtype=np.int64), np.array([], dtype=np.int64), np.array([]))
+        src, src_label, dst, dst_label, weight = zip(*edges)
+        node_ids, inverse = np.unique(np.asarray(src + dst, dtype=object), return_inverse=True)
+        labels = np.empty(len(node_ids), dtype=object)
+        labels[inverse] = np.asarray(src_label + dst_label, dtype=object)
+
+        sources, targets = inverse[:len(src)], inverse[len(src):]
+        order = np.argsort(sources, kind="stable")
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(node_ids)), out=indptr[1:])
+        weights = np.array([1.0 if w is None else w for w in weight], dtype=np.float64)
+        return cls(node_ids, labels, indptr, targets[order].astype(np.int64), weights[order])
+
+    def index_of(self, node_id: str) -> Optional[int]:
+        i = int(np.searchsorted(self.node_ids, node_id))
+        return i if i < len(self.node_ids) and self.node_ids[i] == node_id else None
+
+    def expand(self, frontier: np.ndarray) -> np.ndarray:
+        """
+        One hop: next[j] = sum over edges i->j of frontier[i] * w(i->j), for each column of a
+        (nodes x scenarios) frontier. Only edges leaving non-zero frontier rows are touched.
+        """
+        active = np.flatnonzero(np.any(frontier != 0, axis=1))
+        nxt = np.zeros_like(frontier)
+        if active.size == 0:
+            return nxt
+        starts = self.indptr[active]
+        counts = self.indptr[active + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return nxt
+        # Positions of all out-edges of the active rows, without a Python loop
+        offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(total)
+        contrib = np.repeat(frontier[active], counts, axis=0) * self.weights[offsets, None]
+        targets = self.indices[offsets]
+        for col in range(frontier.shape[1]):
+            nxt[:, col] = np.bincount(targets, weights=contrib[:, col], minlength=len(self.node_ids))
+        return nxt
+
+class ImpactPropagationEngine:
+    """
+    Multi-hop impact propagation over cached twin subgraphs.
+    A user's subgraph (everything reachable from their User node within IMPACT_MAX_DEPTH hops)
+    is loaded once into a TwinGraph and kept in a per-process LRU; cache entries are checked
+    against version counters in Redis that every graph write bumps (invalidate_twin_graphs).
+    Impact at depth 1 is delta * w (as in GraphService.simulate_impact); every further hop is
+    multiplied by its edge weight and by damping.
+    """
+    def __init__(self, cache_size: int = settings.IMPACT_GRAPH_CACHE_SIZE,
+                 ttl_seconds: float = settings.IMPACT_GRAPH_CACHE_TTL_SECONDS):
+        self.cache = LRUDict(cache_size)
+        self.ttl_seconds = ttl_seconds
+        self.driver = neo4j_driver
+
+    def propagate(self, user_id: str, scenarios: Sequence[Mapping[str, float]],
+                  depth: Optional[int] = None, damping: Optional[float] = None) -> List[List[Dict[str, Any]]]:
+        """
+        scenarios: one {start node id: delta} map per what-if; all of them are propagated together.
+        Returns, per scenario, the affected nodes sorted by |magnitude|, with the hop at which
+        each was first reached.
+        """
+        depth = min(depth or settings.IMPACT_MAX_DEPTH, settings.IMPACT_MAX_DEPTH)
+        damping = settings.IMPACT_DAMPING if damping is None else damping
+        graph = self.twin_graph(user_id)
+        n, m = len(graph.node_ids), len(scenarios)
+
+        frontier = np.zeros((n, m))
+        for col, starts in enumerate(scenarios):
+            for node_id, delta in starts.items():
+                i = graph.index_of(node_id)
+                if i is not None:
+                    frontier[i, col] += delta
+
+        total = np.zeros((n, m))
+        first_hop = np.zeros((n, m), dtype=np.int64)
+        for hop in range(1, depth + 1):
+            frontier = graph.expand(frontier) * (1.0 if hop == 1 else damping)
+            reached = (frontier != 0) & (first_hop == 0)
+            first_hop[reached] = hop
+            total += frontier
+            if not frontier.any():
+                break
+
+        results = []
+        for col in range(m):
+            hit = np.flatnonzero(total[:, col] != 0)
+            hit = hit[np.argsort(-np.abs(total[hit, col]), kind="stable")]
+            results.append([{
+                "target": graph.node_ids[i],
+                "label": graph.labels[i] or "Unknown",
+                "magnitude": float(total[i, col]),
+                "depth": int(first_hop[i, col]),
+            } for i in hit])
+        return results
+
+    def twin_graph(self, user_id: str) -> TwinGraph:
+        versions = self._versions(user_id)
+        cached = self.cache.get(user_id)
+        if cached is not None:
+            graph, cached_versions, loaded_at = cached
+            if cached_versions == versions and time.monotonic() - loaded_at < self.ttl_seconds:
+                return graph
+
+        edges = self._load_edges(user_id)
+        if edges is None:
+            return TwinGraph.from_edges([])  # Not cached: the next call retries the load
+        graph = TwinGraph.from_edges(edges)
+        self.cache.set(user_id, (graph, versions, time.monotonic()))
+        return graph
+
+    @staticmethod
+    def _versions(user_id: str) -> Tuple[Any, ...]:
+        try:
+            remote = tuple(get_redis().mget(GLOBAL_VERSION_KEY, _user_version_key(user_id)))
+        except Exception as e:
+            logger.warning(f"Twin graph versions unavailable (TTL-only caching): {e}")
+            remote = (None, None)
+        return (_local_generation, _local_user_generations.get(user_id, 0)) + remote
+
+    def _load_edges(self, user_id: str) -> Optional[List[Tuple[str, str, str, str, float]]]:
+        # One variable-length traversal per load, not per request; DISTINCT collapses the paths
+        query = (
+            f"MATCH (u:User {{id: $user_id}})-[*0..{settings.IMPACT_MAX_DEPTH - 1}]->(a)-[r]->(b) "
+            "RETURN DISTINCT a.id AS source, head(labels(a)) AS source_label, "
+            "b.id AS target, head(labels(b)) AS target_label, r.weight AS weight"
+        )
+        try:
+            with self.driver.get_session() as session:
+                return [(rec["source"], rec["source_label"], rec["target"], rec["target_label"], rec["weight"])
+                        for rec in session.run(query, user_id=user_id)]
+        except Exception as e:
+            logger.error(f"Graph Error (Load Twin Graph): {e}")
+            return None
@@ -0,0 +1,149 @@
+import os
+import re
+import uuid
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+from fastapi import HTTPException
+from ..core.config import settings
+
+REQUIRED_CSV_COLUMNS = {'activity_type', 'description', 'carbon_estimate'}
+REJECTION_COLUMNS = ['row', 'column', 'reason']
+
+# Canonical hyphenated form only; anything else is reported rather than guessed at
+UUID_REGEX = r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+
+@dataclass
+class ValidatedChunk:
+    rows: pd.DataFrame          # Accepted rows: user_id, activity_type, description, carbon_estimate
+    rejections: pd.DataFrame    # One entry per failed check: row, column, reason
+    rejected_count: int         # Distinct rows rejected (a row can fail several checks)
+
+class ActivityImportValidator:
+    """
+    Columnar validation stage for bulk activity imports.
+    Every check runs on whole columns at once, so a mostly-clean chunk costs a
+    handful of vectorized passes instead of per-row Python work.
+    """
+    def __init__(self, default_user_id: uuid.UUID, max_carbon: float = settings.IMPORT_MAX_CARBON_ESTIMATE):
+        self.default_user_id = str(default_user_id)
+        self.max_carbon = max_carbon
+
+    @staticmethod
+    def check_columns(columns: Iterable[str]) -> None:
+        missing = REQUIRED_CSV_COLUMNS - set(columns)
+        if missing:
+            raise HTTPException(status_code=400, detail=f"CSV missing columns: {missing}")
+
+    def validate(self, chunk: pd.DataFrame, row_offset: int = 0) -> ValidatedChunk:
+        """
+        Validates a chunk parsed with dtype=str.
+        Row numbers in the report are 1-based data rows (header excluded), offset by row_offset.
+        """
+        row_numbers = np.arange(row_offset + 1, row_offset + len(chunk) + 1)
+        failures = []
+
+        activity_type = chunk['activity_type'].str.strip()
+        failures.append((activity_type == '', 'activity_type', 'missing value'))
+
+        carbon = pd.to_numeric(chunk['carbon_estimate'].str.strip(), errors='coerce').astype(float)
+        not_number = ~np.isfinite(carbon)
+        failures.append((not_number, 'carbon_estimate', 'not a number'))
+        failures.append((~not_number & (carbon < 0), 'carbon_estimate', 'negative value'))
+        failures.append((~not_number & (carbon > self.max_carbon), 'carbon_estimate', f'exceeds maximum of {self.max_carbon:g}'))
+
+        user_ids = pd.Series(self.default_user_id, index=chunk.index)
+        if 'user_id' in chunk.columns:
+            raw_ids = chunk['user_id'].str.strip()
+            provided = raw_ids != ''
+            well_formed = raw_ids.str.fullmatch(UUID_REGEX)
+            failures.append((provided & ~well_formed, 'user_id', 'invalid UUID'))
+            user_ids = raw_ids.str.lower().where(provided, self.default_user_id)
+
+        rejected = np.zeros(len(chunk), dtype=bool)
+        frames = []
+        for mask, column, reason in failures:
+            mask = np.asarray(mask, dtype=bool)
+            if not mask.any():
+                continue
+            rejected |= mask
+            frames.append(pd.DataFrame({'row': row_numbers[mask], 'column': column, 'reason': reason}))
+
+        rejections = (
+            pd.concat(frames, ignore_index=True).sort_values('row', kind='stable', ignore_index=True)
+            if frames else pd.DataFrame(columns=REJECTION_COLUMNS)
+        )
+
+        accepted = ~rejected
+        rows = pd.DataFrame({
+            'user_id': user_ids[accepted],
+            'activity_type': activity_type[accepted],
+            'description': chunk.loc[accepted, 'description'],
+            'carbon_estimate': carbon[accepted],
+        })
+        return ValidatedChunk(rows=rows, rejections=rejections, rejected_count=int(rejected.sum()))
+
+class RejectionReport:
+    """
+    Collects rejections across chunks for one import.
+    Small reports are returned inline; once the inline limit is exceeded the full
+    report is spilled to a CSV on disk (memory stays bounded) and offered as a download.
+    """
+    def __init__(self, user_id: str, inline_limit: int = settings.IMPORT_REJECTIONS_INLINE_LIMIT,
+                 report_dir: str = settings.IMPORT_REPORT_DIR):
+        self.user_id = user_id
+        self.inline_limit = inline_limit
+        self.report_dir = report_dir
+        self.preview: List[Dict[str, Any]] = []
+        self.total = 0
+        self.report_id: Optional[str] = None
+
+    def add(self, rejections: pd.DataFrame) -> None:
+        if rejections.empty:
+            return
+
+        if self.report_id is None and self.total + len(rejections) <= self.inline_limit:
+            self.preview.extend(rejections.to_dict('records'))
+            self.total += len(rejections)
+            return
+
+        if self.report_id is None:
+            self.report_id = str(uuid.uuid4())
+            path = self._path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pd.DataFrame(self.preview, columns=REJECTION_COLUMNS).to_csv(path, index=False)
+
+        rejections.to_csv(self._path(), mode='a', header=False, index=False)
+        room = self.inline_limit - len(self.preview)
+        if room > 0:
+            self.preview.extend(rejections.head(room).to_dict('records'))
+        self.total += len(rejections)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rejections": self.preview,
+            "rejections_total": self.total,
+            "rejection_report_id": self.report_id,
+        }
+
+    def _path(self) -> str:
+        return self.path_for(self.user_id, self.report_id, must_exist=False, report_dir=self.report_dir)
+
+    @staticmethod
+    def path_for(user_id: str, report_id: str, must_exist: bool = True,
+                 report_dir: str = settings.IMPORT_REPORT_DIR) -> Optional[str]:
+        """
+        Resolves the on-disk location of a user's report.
+        Reports are namespaced per user; report_id must be a UUID (no path traversal).
+        """
+        try:
+            report_id = str(uuid.UUID(report_id))
+        except ValueError:
+            return None
+
+        owner_dir = re.sub(r'[^A-Za-z0-9_-]', '_', str(user_id))
+        path = os.path.join(report_dir, owner_dir, f"{report_id}.csv")
+        if must_exist and not os.path.isfile(path):
+            return None
+        return path
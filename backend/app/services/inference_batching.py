@@ -0,0 +1,94 @@
+"""
+Helpers for packing many blobs into one LLM call: token-budgeted batch planning
+and a list-aware parser for the structured answer.
+Kept free of LangChain so they can be used (and tested) without the LLM stack.
+"""
+import json
+import re
+from typing import Any, Dict, List, Sequence
+
+CHARS_PER_TOKEN = 4          # Rough average for English text; good enough for budgeting
+ITEM_OVERHEAD_TOKENS = 8     # Item header/separator in the batch prompt
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def plan_batches(texts: Sequence[str], token_budget: int, max_items: int, fixed_tokens: int = 0) -> List[List[int]]:
+    """
+    Greedily groups text indices (in order) so each batch's estimated prompt size stays within
+    token_budget (fixed_tokens covers the template and format instructions) and holds at most
+    max_items. An item too large for any batch still gets a batch of its own.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = fixed_tokens
+    for i, text in enumerate(texts):
+        cost = estimate_tokens(text) + ITEM_OVERHEAD_TOKENS
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], fixed_tokens
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def format_batch_items(texts: Sequence[str]) -> str:
+    return "\n\n".join(f"### ITEM {i}\n{text}" for i, text in enumerate(texts))
+
+class ActivityListParser:
+    """
+    Parses a JSON array of activity records, one per batch item, each tagged with its item index.
+    Uses the same field definitions (ResponseSchema) as the single-item parser. Records that
+    are missing fields or have non-numeric float fields are dropped, so the caller can
+    retry exactly those items.
+    """
+    def __init__(self, response_schemas: Sequence[Any]):
+        self.response_schemas = list(response_schemas)
+
+    def get_format_instructions(self) -> str:
+        fields = "\n".join(
+            f'\t"{s.name}": {s.type}  // {s.description}' for s in self.response_schemas
+        )
+        return (
+            "The output should be a markdown code snippet containing a JSON array with exactly one "
+            "object per ITEM, in any order, formatted in the following schema:\n\n"
+            "```json\n[\n{\n\t\"index\": int  // The ITEM number this record describes\n"
+            f"{fields}\n}}\n]\n```"
+        )
+
+    def parse(self, text: str, expected: int) -> Dict[int, Dict[str, Any]]:
+        """
+        Returns {item index: record} for every valid record with an index in range(expected).
+        Raises ValueError when no JSON array can be found at all.
+        """
+        fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+        payload = fenced.group(1) if fenced else text
+        start, end = payload.find("["), payload.rfind("]")
+        if start < 0 or end < start:
+            raise ValueError("No JSON array in batch response")
+        records = json.loads(payload[start:end + 1])
+        if not isinstance(records, list):
+            raise ValueError("Batch response is not a JSON array")
+
+        parsed: Dict[int, Dict[str, Any]] = {}
+        for record in records:
+            record = self._validate(record)
+            if record is None:
+                continue
+            index = record.pop("index")
+            if 0 <= index < expected and index not in parsed:
+                parsed[index] = record
+        return parsed
+
+    def _validate(self, record: Any):
+        if not isinstance(record, dict):
+            return None
+        try:
+            out = {"index": int(record["index"])}
+            for schema in self.response_schemas:
+                value = record[schema.name]
+                out[schema.name] = float(value) if schema.type == "float" else value
+        except (KeyError, TypeError, ValueError):
+            return None
+        return out
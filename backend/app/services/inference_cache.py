@@ -0,0 +1,97 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+from ..core.config import settings
+from ..core.logger import logger
+from ..core.metrics import INFERENCE_CACHE_LOOKUPS, INFERENCE_CACHE_LOOKUP_SECONDS
+from ..db.redis_client import get_redis
+
+def prompt_fingerprint(*parts: Iterable[str]) -> str:
+    """
+    Stable hash of everything that shapes an LLM answer (template, format instructions, model...).
+    Cache keys embed it, so changing any part starts a fresh keyspace and old entries age out by TTL.
+    """
+    digest = hashlib.sha256(settings.INFERENCE_CACHE_VERSION.encode())
+    for part in parts:
+        digest.update(b"\0" + str(part).encode())
+    return digest.hexdigest()[:16]
+
+class LRUDict:
+    """
+    Small thread-safe LRU map (Celery workers may run inference on several threads).
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class InferenceCache:
+    """
+    Content-addressed cache of LLM inference results.
+    The key is sha256(prompt fingerprint + anonymized text), so repeated receipts, booking
+    emails and retried uploads resolve without an LLM call; only PII-stripped text is ever hashed.
+    Lookups go to an in-process LRU first, then Redis (shared by all workers).
+    Redis failures degrade to a miss, never to a failed inference.
+    """
+    def __init__(self, fingerprint: str, lru_size: int = settings.INFERENCE_CACHE_LRU_SIZE,
+                 ttl_seconds: int = settings.INFERENCE_CACHE_TTL_SECONDS):
+        self.fingerprint = fingerprint
+        self.ttl_seconds = ttl_seconds
+        self._lru = LRUDict(lru_size)
+
+    def key(self, clean_text: str) -> str:
+        digest = hashlib.sha256(f"{self.fingerprint}\0{clean_text}".encode()).hexdigest()
+        return f"inference:{self.fingerprint}:{digest}"
+
+    def get(self, clean_text: str) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        key = self.key(clean_text)
+        result = "miss"
+        value = self._lru.get(key)
+        if value is not None:
+            result = "lru_hit"
+        else:
+            try:
+                raw = get_redis().get(key)
+                if raw:
+                    value = json.loads(raw)
+                    self._lru.set(key, value)
+                    result = "redis_hit"
+            except Exception as e:
+                logger.warning(f"Inference cache unavailable: {e}")
+                result = "error"
+
+        INFERENCE_CACHE_LOOKUPS.labels(result=result).inc()
+        INFERENCE_CACHE_LOOKUP_SECONDS.labels(result=result).observe(time.perf_counter() - started)
+        # Callers may annotate the result; never hand out the cached object itself
+        return dict(value) if value is not None else None
+
+    def set(self, clean_text: str, value: Dict[str, Any]) -> None:
+        key = self.key(clean_text)
+        self._lru.set(key, dict(value))
+        try:
+            get_redis().set(key, json.dumps(value), ex=self.ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Inference cache write failed: {e}")
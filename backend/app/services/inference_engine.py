@@ -8,29 +8,68 @@ Developer Note: We're using LangChain for the heavy lifting, but keep an eye on
 token costs. I've added a fallback to basic heuristics if the LLM is flaky.
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+import asyncio
 import os
 from loguru import logger
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import ResponseSchema, StructuredOutputParser
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
-from .anonymizer import Anonymizer
+from ..core.config import settings
+from .circuit_breaker import llm_breaker
+from .connectors.anonymizer import Anonymizer
+from .fake_llm import FakeLLM
+from .inference_batching import ActivityListParser, estimate_tokens, format_batch_items, plan_batches
+from .inference_cache import InferenceCache, prompt_fingerprint
+from .inference_timing import StageTimer
+from .llm_scheduler import LLMScheduler
+from .rule_classifier import RuleClassifier
+
+LLM_MODEL = "gemini-pro"
+LLM_TEMPERATURE = 0.2  # Keep it creative but grounded
+
+# We want the AI to act like an environmental scientist.
+PROMPT_TEMPLATE = (
+    "SYSTEM: You are the EcoTwin Lifestyle Modeler.\n"
+    "CONTEXT: A user just provided raw data from a source (like an email).\n"
+    "TASK: Create a carbon-aware activity log entry.\n"
+    "DATA: {data}\n\n"
+    "INSTRUCTIONS: {format_instructions}"
+)
+
+# Same role, many items per call: the fixed prompt cost is paid once per batch instead of per blob.
+BATCH_PROMPT_TEMPLATE = (
+    "SYSTEM: You are the EcoTwin Lifestyle Modeler.\n"
+    "CONTEXT: A user just provided {count} raw data items from a source (like emails), "
+    "each starting with its ### ITEM number.\n"
+    "TASK: Create one carbon-aware activity log entry per item.\n"
+    "DATA:\n{data}\n\n"
+    "INSTRUCTIONS: {format_instructions}"
+)
 
 class InferenceEngine:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, llm: Optional[Any] = None):
         # We prefer an explicit key, but fallback to environment vars
         self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
         
-        if not self.api_key:
+        # Any chat model with an async ainvoke(messages) -> message with .content can be plugged in
+        if llm is not None:
+            self.llm = llm
+        elif settings.LLM_BACKEND == "fake":
+            logger.warning("LLM_BACKEND=fake: inference answers come from the simulated LLM.")
+            self.llm = FakeLLM()
+        elif not self.api_key:
             logger.warning("No Google API Key found. Inference engine will run in 'Offline Heuristic' mode.")
             self.llm = None
         else:
             self.llm = ChatGoogleGenerativeAI(
-                model="gemini-pro", 
+                model=LLM_MODEL,
                 google_api_key=self.api_key,
-                temperature=0.2 # Keep it creative but grounded
+                temperature=LLM_TEMPERATURE,
+                # Fail fast: an outage is handled by the circuit breaker, not by client retries
+                timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+                max_retries=settings.LLM_MAX_RETRIES
             )
 
         # Define what we want back from the AI
@@ -43,74 +82,206 @@ class InferenceEngine:
             ResponseSchema(name="reasoning", description="Short explanation for why the AI picked these numbers")
         ]
         self.output_parser = StructuredOutputParser.from_response_schemas(self.response_schemas)
+        self.list_parser = ActivityListParser(self.response_schemas)
+
+        # Prompts depend only on the templates and schemas, so build them once per engine
+        self.prompt = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
+        self.format_instructions = self.output_parser.get_format_instructions()
+        self.batch_prompt = ChatPromptTemplate.from_template(BATCH_PROMPT_TEMPLATE)
+        self.batch_format_instructions = self.list_parser.get_format_instructions()
+        self.batch_fixed_tokens = estimate_tokens(BATCH_PROMPT_TEMPLATE) + estimate_tokens(self.batch_format_instructions)
+        # One scheduler per process; the budgets themselves live in Redis
+        self.scheduler = LLMScheduler()
+
+        # Identical anonymized text + identical prompt/schemas => identical answer, so reuse it.
+        # The format instructions are rendered from response_schemas, so editing either the
+        # template or a schema changes the fingerprint and invalidates every cached result.
+        self.cache = None
+        if settings.INFERENCE_CACHE_ENABLED:
+            self.cache = InferenceCache(prompt_fingerprint(
+                PROMPT_TEMPLATE, self.format_instructions,
+                BATCH_PROMPT_TEMPLATE, self.batch_format_instructions,
+                LLM_MODEL, LLM_TEMPERATURE, type(self.llm).__name__
+            ))
 
-    @retry(
-        stop=stop_after_attempt(3), 
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type(Exception)
-    )
-    async def run_inference(self, raw_blob: str) -> Dict[str, Any]:
+    async def run_inference(self, raw_blob: str, priority: str = "interactive") -> Dict[str, Any]:
         """
         Main entry point for processing data. 
-        Sanitize -> Infer -> Parse -> Return.
+        Sanitize -> Local rules -> Cache lookup -> Circuit check -> Infer -> Parse -> Return.
+        Each stage's latency is recorded under the method that produced the answer.
         """
+        timer = StageTimer()
+        result = await self._run_inference(raw_blob, priority, timer)
+        timer.observe(result.get("inference_method", "unknown"))
+        return result
+
+    async def _run_inference(self, raw_blob: str, priority: str, timer: StageTimer) -> Dict[str, Any]:
         # Step 1: Privacy First. 
         # Scrub names/emails before it ever touches the cloud.
-        clean_text = Anonymizer.strip_pii(raw_blob)
+        with timer.stage("anonymize"):
+            clean_text = Anonymizer.strip_pii(raw_blob)
         logger.info(f"Processing inference for blob: {clean_text[:50]}...")
 
         # Step 2: Fallback Logic
         if not self.llm:
             return self._heuristic_fallback(clean_text)
 
-        # Step 3: Prompt Engineering
-        # We want the AI to act like an environmental scientist.
-        prompt = ChatPromptTemplate.from_template(
-            "SYSTEM: You are the EcoTwin Lifestyle Modeler.\n"
-            "CONTEXT: A user just provided raw data from a source (like an email).\n"
-            "TASK: Create a carbon-aware activity log entry.\n"
-            "DATA: {data}\n\n"
-            "INSTRUCTIONS: {format_instructions}"
-        )
+        # Step 3: Clear-cut receipts (known phrase + quantity) don't need the LLM at all
+        with timer.stage("rules"):
+            local = self._confident_rule_result(clean_text)
+        if local is not None:
+            return local
+
+        # Step 4: Seen this exact (anonymized) text before? Skip the LLM entirely.
+        if self.cache:
+            with timer.stage("cache"):
+                cached = self.cache.get(clean_text)
+            if cached is not None:
+                timer.label = "cache_hit"
+                return cached
 
+        # Step 5: LLM known to be down? Answer locally right away instead of waiting on a timeout.
+        if not llm_breaker.allow():
+            return self._heuristic_fallback(clean_text)
+
+        # Step 6: Prompt Engineering (template and format instructions are prebuilt in __init__)
         try:
-            formatted_input = prompt.format_messages(
-                data=clean_text,
-                format_instructions=self.output_parser.get_format_instructions()
-            )
-            
-            response = await self.llm.ainvoke(formatted_input)
-            structured_data = self.output_parser.parse(response.content)
+            with timer.stage("prompt"):
+                formatted_input = self.prompt.format_messages(
+                    data=clean_text,
+                    format_instructions=self.format_instructions
+                )
+
+            # Wait for a share of the cluster-wide rate budget; past the deadline, answer locally
+            with timer.stage("queue"):
+                admitted = await self.scheduler.acquire(self._call_tokens(formatted_input, items=1), priority)
+            if not admitted:
+                llm_breaker.release()  # Shed calls must not hold on to a half-open probe
+                return self._heuristic_fallback(clean_text)
+
+            with timer.stage("llm"):
+                response = await self._invoke(formatted_input)
+            with timer.stage("parse"):
+                structured_data = self.output_parser.parse(response.content)
             
             # Add a 'source' flag so the UI knows this was 'Premium' inference
             structured_data["inference_method"] = "llm_gemini"
+            # Only real LLM answers are cached; a fallback must not outlive the outage that caused it
+            if self.cache:
+                self.cache.set(clean_text, structured_data)
             return structured_data
 
         except Exception as e:
             logger.error(f"LLM Inference failed: {e}. Falling back to basic matching.")
             return self._heuristic_fallback(clean_text)
 
+    async def run_batch_inference(self, raw_blobs: List[str], priority: str = "backfill") -> List[Dict[str, Any]]:
+        """
+        Batch entry point: one result per blob, in input order.
+        Sanitize -> Local rules -> Cache lookup -> pack the rest into token-budgeted prompts -> Parse list.
+        Items the model skipped or answered malformed are retried one by one via run_inference;
+        if a whole batch call fails, its items get the heuristic fallback.
+        """
+        clean_texts = Anonymizer.strip_pii_batch(raw_blobs)
+        logger.info(f"Processing batch inference for {len(clean_texts)} blobs.")
+
+        if not self.llm:
+            return [self._heuristic_fallback(text) for text in clean_texts]
+
+        # Resolve local rules and cache hits, and collapse duplicates: each distinct text is
+        # inferred at most once
+        resolved: Dict[str, Dict[str, Any]] = {}
+        pending: List[str] = []
+        for text in dict.fromkeys(clean_texts):
+            known = self._confident_rule_result(text)
+            if known is None and self.cache:
+                known = self.cache.get(text)
+            if known is not None:
+                resolved[text] = known
+            else:
+                pending.append(text)
+
+        batches = plan_batches(pending, settings.INFERENCE_BATCH_TOKEN_BUDGET,
+                               settings.INFERENCE_BATCH_MAX_ITEMS, self.batch_fixed_tokens)
+        limiter = asyncio.Semaphore(settings.INFERENCE_BATCH_CONCURRENCY)
+
+        async def _run(batch: List[int]) -> None:
+            texts = [pending[i] for i in batch]
+            async with limiter:
+                results = await self._infer_batch(texts, priority)
+            for text, result in zip(texts, results):
+                resolved[text] = result
+
+        await asyncio.gather(*(_run(batch) for batch in batches))
+        # Copies, so duplicate blobs don't share one mutable dict
+        return [dict(resolved[text]) for text in clean_texts]
+
+    async def _infer_batch(self, texts: List[str], priority: str) -> List[Dict[str, Any]]:
+        if not llm_breaker.allow():
+            return [self._heuristic_fallback(text) for text in texts]
+
+        try:
+            formatted_input = self.batch_prompt.format_messages(
+                count=len(texts),
+                data=format_batch_items(texts),
+                format_instructions=self.batch_format_instructions
+            )
+            if not await self.scheduler.acquire(self._call_tokens(formatted_input, items=len(texts)), priority):
+                llm_breaker.release()
+                return [self._heuristic_fallback(text) for text in texts]
+            response = await self._invoke(formatted_input)
+            parsed = self.list_parser.parse(response.content, expected=len(texts))
+        except Exception as e:
+            logger.error(f"Batch LLM inference failed for {len(texts)} items: {e}. Falling back to basic matching.")
+            return [self._heuristic_fallback(text) for text in texts]
+
+        results: List[Dict[str, Any]] = []
+        for i, text in enumerate(texts):
+            structured_data = parsed.get(i)
+            if structured_data is None:
+                # Just this item was dropped or malformed; the single-item path has its own fallback
+                results.append(await self.run_inference(text, priority))
+                continue
+            structured_data["inference_method"] = "llm_gemini_batch"
+            if self.cache:
+                self.cache.set(text, structured_data)
+            results.append(structured_data)
+
+        missing = sum(1 for i in range(len(texts)) if i not in parsed)
+        if missing:
+            logger.warning(f"Batch LLM inference: {missing}/{len(texts)} items retried individually.")
+        return results
+
+    async def _invoke(self, messages: List[Any]) -> Any:
+        """
+        llm.ainvoke with its outcome reported to the shared circuit breaker.
+        Only the call itself counts; a parse error on a valid response is not an outage.
+        """
+        try:
+            response = await self.llm.ainvoke(messages)
+        except Exception:
+            llm_breaker.record_failure()
+            raise
+        llm_breaker.record_success()
+        return response
+
+    @staticmethod
+    def _call_tokens(messages: List[Any], items: int) -> int:
+        # What the call will cost against the tokens/minute budget: prompt plus expected answer
+        return sum(estimate_tokens(m.content) for m in messages) + items * settings.LLM_OUTPUT_TOKENS_PER_ITEM
+
+    def _confident_rule_result(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        The local classifier's answer when it is unambiguous and confident enough to skip the LLM.
+        """
+        classification = RuleClassifier.classify(text)
+        if classification.ambiguous or classification.confidence < settings.RULE_CLASSIFIER_MIN_CONFIDENCE:
+            return None
+        return RuleClassifier.to_result(classification, "rule_engine")
+
     def _heuristic_fallback(self, text: str) -> Dict[str, Any]:
         """
         Safety net logic. If the AI is down, we don't want the user's dashboard to break.
+        Uses the local rule classifier's best guess, however unsure it is.
         """
-        text = text.lower()
-        # Basic patterns for common stuff
-        if "flight" in text or "airport" in text:
-            return {
-                "activity_type": "Travel",
-                "description": "Likely air travel (estimated)",
-                "carbon_estimate": 250.0,
-                "confidence": 0.6,
-                "reasoning": "Keyword match: flight/airport",
-                "inference_method": "heuristic_fallback"
-            }
-        
-        return {
-            "activity_type": "General",
-            "description": "Activity detected from logs",
-            "carbon_estimate": 1.2,
-            "confidence": 0.3,
-            "reasoning": "Default fallback",
-            "inference_method": "heuristic_fallback"
-        }
+        return RuleClassifier.to_result(RuleClassifier.classify(text), "heuristic_fallback")
@@ -0,0 +1,110 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set
+import redis.asyncio as aioredis
+from ..core.config import settings
+from ..core.logger import logger
+from ..db.redis_client import get_redis
+
+CHANNEL_PREFIX = "inference:events:"
+
+def publish_inference_event(user_id: str, task_id: str, status: str, **payload: Any) -> None:
+    """
+    Worker side: announces a finished inference task on its owner's channel.
+    Best effort; clients that miss the event can still read the result backend.
+    """
+    try:
+        message = json.dumps({"task_id": task_id, "status": status, **payload}, default=str)
+        get_redis().publish(f"{CHANNEL_PREFIX}{user_id}", message)
+    except Exception as e:
+        logger.warning(f"Inference event for task {task_id} not published: {e}")
+
+class InferenceEventHub:
+    """
+    API side fan-out of inference events.
+    One Redis pattern subscription per process (not per client) feeds an asyncio queue
+    per connected client, so waiting clients cost no Redis reads at all.
+    """
+    def __init__(self, queue_size: int = settings.INFERENCE_EVENTS_QUEUE_SIZE,
+                 ready_timeout: float = settings.INFERENCE_EVENTS_READY_TIMEOUT_SECONDS):
+        self.queue_size = queue_size
+        self.ready_timeout = ready_timeout
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()  # Set while the Redis pattern subscription is active
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: str) -> AsyncIterator[asyncio.Queue]:
+        """
+        Queue of the user's events for as long as the context is open.
+        Entered once the Redis subscription is live (also after a reconnect), so every event
+        published from then on is delivered; if Redis doesn't come back within ready_timeout
+        the queue is handed out anyway and callers rely on their own checks.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        try:
+            if not self._ready.is_set():
+                try:
+                    await asyncio.wait_for(self._ready.wait(), self.ready_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning("Inference events not subscribed yet; the client may miss events.")
+            yield queue
+        finally:
+            queues = self._subscribers.get(user_id, set())
+            queues.discard(queue)
+            if not queues:
+                self._subscribers.pop(user_id, None)
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+            self._ready.clear()
+
+    async def _listen(self) -> None:
+        while True:
+            client = aioredis.from_url(str(settings.REDIS_URL))
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                self._ready.set()
+                async for message in pubsub.listen():
+                    self.dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._ready.clear()
+                logger.warning(f"Inference event listener lost Redis: {e}. Reconnecting.")
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+    def dispatch(self, message: Dict[str, Any]) -> None:
+        if message.get("type") != "pmessage":
+            return
+        channel = message["channel"]
+        channel = channel.decode() if isinstance(channel, bytes) else channel
+        queues = self._subscribers.get(channel[len(CHANNEL_PREFIX):])
+        if not queues:
+            return
+        event = json.loads(message["data"])
+        for queue in list(queues):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A client that stopped reading loses events rather than stalling everyone else
+                logger.debug(f"Inference event {event.get('task_id')} dropped for a slow client.")
+
+inference_events = InferenceEventHub()
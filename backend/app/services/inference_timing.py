@@ -0,0 +1,29 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from ..core.metrics import INFERENCE_STAGE_SECONDS
+
+class StageTimer:
+    """
+    Per-stage wall time of one inference call.
+    Which method answers (llm_gemini, heuristic_fallback...) is only known at the end, so
+    durations are collected first and observed together under that label by observe().
+    """
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self.label: Optional[str] = None  # Overrides the result's method (e.g. cache hits)
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - start
+
+    def observe(self, inference_method: str) -> None:
+        method = self.label or inference_method
+        self.durations["total"] = time.perf_counter() - self._started
+        for stage, seconds in self.durations.items():
+            INFERENCE_STAGE_SECONDS.labels(stage=stage, inference_method=method).observe(seconds)
@@ -0,0 +1,172 @@
+import asyncio
+import time
+import uuid
+from typing import Dict, List, Optional
+from ..core.config import settings
+from ..core.logger import logger
+from ..core.metrics import LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT_SECONDS, LLM_SCHEDULER_DECISIONS
+from ..db.redis_client import get_redis
+
+# Lower rank is served first
+PRIORITIES: Dict[str, int] = {"interactive": 0, "backfill": 1}
+PRIORITY_SPAN = 1e13  # Ticket score = rank * span + enqueue time in ms
+
+BURST_SECONDS = 10   # Bucket capacity: bursts above the steady rate stay within ~1/6 of a minute's quota
+LEASE_SECONDS = 5    # A waiter polls at least every 0.5 s; a ticket not seen for this long is abandoned
+
+QUEUE_KEY = "llm:sched:queue"
+RPM_KEY = "llm:sched:rpm"
+TPM_KEY = "llm:sched:tpm"
+LEASE_KEY = "llm:sched:lease"  # ticket -> last poll (ms); refreshed by every poll
+
+# Atomically: drop abandoned tickets (no poll within the lease; never polled = enqueue time),
+# refresh this ticket's lease, then grant the call if this ticket is at the head of the
+# priority queue and both token buckets (requests/min, tokens/min) can cover it.
+# Returns {status, expected wait ms, depth per priority}; status 0 = granted, 1 = wait, -1 = ticket gone.
+_ACQUIRE_LUA = """
+local queue, rpm_key, tpm_key, lease_key = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local ticket = ARGV[1]
+local rpm, tpm, tokens = tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local lease, span, burst = tonumber(ARGV[5]), tonumber(ARGV[6]), tonumber(ARGV[7])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+while true do
+  local head = redis.call('ZRANGE', queue, 0, 0, 'WITHSCORES')
+  if #head == 0 or head[1] == ticket then break end
+  local seen = tonumber(redis.call('HGET', lease_key, head[1])) or math.fmod(tonumber(head[2]), span)
+  if seen >= now - lease then break end
+  redis.call('ZREM', queue, head[1])
+  redis.call('HDEL', lease_key, head[1])
+end
+
+local depth = {redis.call('ZCOUNT', queue, 0, '(' .. span), redis.call('ZCOUNT', queue, span, '+inf')}
+local rank = redis.call('ZRANK', queue, ticket)
+if not rank then return {-1, 0, depth[1], depth[2]} end
+redis.call('HSET', lease_key, ticket, now)
+redis.call('PEXPIRE', lease_key, 120000)
+
+-- Buckets refill at limit/minute and hold at most `burst` seconds' worth
+local function level(key, limit)
+  local capacity = math.max(1, limit * burst / 60)
+  local state = redis.call('HMGET', key, 'level', 'ts')
+  local lvl, ts = tonumber(state[1]), tonumber(state[2])
+  if not lvl then return capacity, capacity end
+  return math.min(capacity, lvl + (now - ts) * limit / 60000), capacity
+end
+
+local r = level(rpm_key, rpm)
+local t, t_capacity = level(tpm_key, tpm)
+-- A call larger than the bucket is let through once the bucket is full
+local need = math.min(tokens, t_capacity)
+local wait = math.max(0, (1 - r) * 60000 / rpm, (need - t) * 60000 / tpm)
+
+if rank == 0 and wait <= 0 then
+  redis.call('HSET', rpm_key, 'level', r - 1, 'ts', now)
+  redis.call('HSET', tpm_key, 'level', t - need, 'ts', now)
+  redis.call('PEXPIRE', rpm_key, 120000)
+  redis.call('PEXPIRE', tpm_key, 120000)
+  redis.call('ZREM', queue, ticket)
+  redis.call('HDEL', lease_key, ticket)
+  return {0, 0, depth[1], depth[2] }
+end
+
+-- Everyone ahead needs roughly one request slot (or this call's token share) first
+local per_call = math.max(60000 / rpm, need * 60000 / tpm)
+return {1, math.ceil(wait + rank * per_call), depth[1], depth[2]}
+"""
+
+class LLMScheduler:
+    """
+    Cluster-wide admission control for LLM calls, coordinated through Redis so every
+    worker process shares one requests-per-minute and one tokens-per-minute budget.
+    Callers queue by priority (interactive before backfill, FIFO within a class) and are
+    admitted in order; when the expected wait would run past the caller's deadline the call
+    is shed and the caller should answer locally instead. Waiters hold a lease refreshed by
+    every poll, so a ticket left behind by a dead worker stops blocking the queue within
+    LEASE_SECONDS. Redis calls run in a worker thread to keep the event loop free.
+    Redis failures let calls through unscheduled rather than blocking inference.
+    """
+    def __init__(self, requests_per_minute: int = settings.LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = settings.LLM_TOKENS_PER_MINUTE):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._script = None
+
+    @staticmethod
+    def max_wait(priority: str) -> float:
+        if priority == "interactive":
+            return settings.LLM_INTERACTIVE_MAX_WAIT_SECONDS
+        return settings.LLM_BACKFILL_MAX_WAIT_SECONDS
+
+    async def acquire(self, tokens: int, priority: str = "interactive", max_wait: Optional[float] = None) -> bool:
+        """
+        Waits for a slot for one call of ~tokens (prompt + expected output).
+        Returns False if the call should be shed.
+        """
+        if not settings.LLM_SCHEDULER_ENABLED:
+            return True
+        rank = PRIORITIES[priority]
+        max_wait = self.max_wait(priority) if max_wait is None else max_wait
+        started = time.monotonic()
+        ticket = uuid.uuid4().hex
+
+        try:
+            await asyncio.to_thread(self._enqueue, ticket, rank)
+        except Exception as e:
+            logger.warning(f"LLM scheduler unavailable, calling unscheduled: {e}")
+            LLM_SCHEDULER_DECISIONS.labels(priority=priority, outcome="bypass").inc()
+            return True
+
+        try:
+            while True:
+                status, wait_ms, interactive_depth, backfill_depth = await asyncio.to_thread(self._poll, ticket, tokens)
+                LLM_QUEUE_DEPTH.labels(priority="interactive").set(interactive_depth)
+                LLM_QUEUE_DEPTH.labels(priority="backfill").set(backfill_depth)
+
+                waited = time.monotonic() - started
+                if status == 0:
+                    return self._decide(priority, "granted", waited)
+                if status < 0 or waited + wait_ms / 1000 > max_wait:
+                    logger.warning(f"LLM call shed: expected wait {wait_ms} ms exceeds the {max_wait}s deadline ({priority}).")
+                    return self._decide(priority, "shed", waited)
+                await asyncio.sleep(min(max(wait_ms / 1000, 0.02), 0.5))
+        except Exception as e:
+            logger.warning(f"LLM scheduler failed, calling unscheduled: {e}")
+            LLM_SCHEDULER_DECISIONS.labels(priority=priority, outcome="bypass").inc()
+            return True
+        finally:
+            try:
+                await asyncio.to_thread(self._release, ticket)
+            except Exception:
+                pass
+
+    def _enqueue(self, ticket: str, rank: int) -> None:
+        redis = get_redis()
+        if self._script is None:
+            self._script = redis.register_script(_ACQUIRE_LUA)
+        redis.zadd(QUEUE_KEY, {ticket: rank * PRIORITY_SPAN + time.time() * 1000})
+
+    def _poll(self, ticket: str, tokens: int) -> List[int]:
+        """
+        One admission attempt: [status, expected wait ms, interactive depth, backfill depth].
+        """
+        return self._script(
+            keys=[QUEUE_KEY, RPM_KEY, TPM_KEY, LEASE_KEY],
+            args=[ticket, self.requests_per_minute, self.tokens_per_minute, tokens,
+                  LEASE_SECONDS * 1000, PRIORITY_SPAN, BURST_SECONDS],
+        )
+
+    @staticmethod
+    def _release(ticket: str) -> None:
+        # No-op once granted
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zrem(QUEUE_KEY, ticket)
+        pipe.hdel(LEASE_KEY, ticket)
+        pipe.execute()
+
+    @staticmethod
+    def _decide(priority: str, outcome: str, waited: float) -> bool:
+        LLM_SCHEDULER_DECISIONS.labels(priority=priority, outcome=outcome).inc()
+        LLM_QUEUE_WAIT_SECONDS.labels(priority=priority, outcome=outcome).observe(waited)
+        return outcome == "granted"
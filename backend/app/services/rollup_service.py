@@ -0,0 +1,138 @@
+import uuid
+import pandas as pd
+from datetime import date, datetime
+from typing import Optional, Dict, Any, List
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from ..models.models import DailyCarbonRollup
+from ..core.logger import logger
+from .forecast_cache import ForecastCache
+
+ROLLUP_KEY = ['user_id', 'day', 'activity_type']
+
+class RollupService:
+    """
+    Maintains daily_carbon_rollup.
+    Write paths call apply_activities/record_activity inside the same transaction
+    as their activity insert; rebuild/reconcile repair the table from the source of truth.
+    """
+
+    @staticmethod
+    def apply_activities(db: Session, rows: pd.DataFrame) -> int:
+        """
+        Folds newly inserted activities into the rollup.
+        rows needs user_id, timestamp, activity_type and carbon_estimate columns.
+        Returns the number of rollup rows touched.
+        """
+        if rows.empty:
+            return 0
+
+        grouped = pd.DataFrame({
+            'user_id': rows['user_id'].astype(str),
+            'day': pd.to_datetime(rows['timestamp'], utc=True).dt.date,
+            'activity_type': rows['activity_type'].fillna('').astype(str),
+            'carbon': rows['carbon_estimate'].astype(float),
+        }).groupby(ROLLUP_KEY)['carbon'].agg(total_carbon='sum', count='count').reset_index()
+
+        RollupService._upsert(db, grouped.to_dict('records'))
+        return len(grouped)
+
+    @staticmethod
+    def record_activity(db: Session, user_id: Any, timestamp: datetime,
+                        activity_type: Optional[str], carbon_estimate: float) -> None:
+        """
+        Single-activity variant of apply_activities for per-row write paths.
+        """
+        ts = pd.Timestamp(timestamp)
+        ts = ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+        RollupService._upsert(db, [{
+            'user_id': str(user_id),
+            'day': ts.date(),
+            'activity_type': activity_type or '',
+            'total_carbon': float(carbon_estimate),
+            'count': 1,
+        }])
+
+    @staticmethod
+    def _upsert(db: Session, records: List[Dict[str, Any]]) -> None:
+        # Records arrive sorted by key (groupby), so concurrent writers lock rows in the same order
+        stmt = insert(DailyCarbonRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=ROLLUP_KEY,
+            set_={
+                'total_carbon': DailyCarbonRollup.total_carbon + stmt.excluded.total_carbon,
+                'count': DailyCarbonRollup.count + stmt.excluded.count,
+            }
+        )
+        db.execute(stmt, records)
+
+    @staticmethod
+    def rebuild(db: Session, user_id: Optional[str] = None, since: Optional[date] = None) -> int:
+        """
+        Backfill: recomputes the rollup from activities for the given scope (all users /
+        all history by default) and commits. The table is locked against concurrent
+        incremental upserts for the duration, so writes racing the rebuild are counted once.
+        Returns the number of rollup rows written.
+        """
+        activity_filters, rollup_filters, params = RollupService._scope(user_id, since)
+
+        db.execute(text("LOCK TABLE daily_carbon_rollup IN SHARE ROW EXCLUSIVE MODE"))
+        db.execute(text(f"DELETE FROM daily_carbon_rollup WHERE TRUE {rollup_filters}"), params)
+        result = db.execute(text(
+            "INSERT INTO daily_carbon_rollup (user_id, day, activity_type, total_carbon, count) "
+            f"{RollupService._recompute_sql(activity_filters)}"
+        ), params)
+        db.commit()
+        if user_id:
+            # Whole-table rebuilds rely on the cache TTL instead of bumping every user
+            ForecastCache.bump_versions([user_id])
+
+        logger.info(f"Rollup rebuild complete: {result.rowcount} rows (user={user_id or 'all'}, since={since or 'start'}).")
+        return result.rowcount
+
+    @staticmethod
+    def reconcile(db: Session, user_id: Optional[str] = None, since: Optional[date] = None,
+                  fix: bool = False) -> Dict[str, Any]:
+        """
+        Compares the stored rollup with a fresh aggregate of activities.
+        Returns the number of drifted (user, day, type) groups; with fix=True the scope is rebuilt.
+        """
+        activity_filters, rollup_filters, params = RollupService._scope(user_id, since)
+        drifted = db.execute(text(
+            f"WITH actual AS ({RollupService._recompute_sql(activity_filters)}), "
+            f"stored AS (SELECT * FROM daily_carbon_rollup WHERE TRUE {rollup_filters}) "
+            "SELECT COUNT(*) FROM actual FULL OUTER JOIN stored USING (user_id, day, activity_type) "
+            "WHERE actual.count IS DISTINCT FROM stored.count "
+            "OR ABS(COALESCE(actual.total_carbon, 0) - COALESCE(stored.total_carbon, 0)) > 1e-6"
+        ), params).scalar()
+
+        report = {"drifted_groups": drifted, "rebuilt_rows": None}
+        if drifted and fix:
+            report["rebuilt_rows"] = RollupService.rebuild(db, user_id, since)
+        elif drifted:
+            logger.warning(f"Rollup drift detected: {drifted} groups (user={user_id or 'all'}).")
+        return report
+
+    @staticmethod
+    def _recompute_sql(activity_filters: str) -> str:
+        return (
+            "SELECT user_id, (timestamp AT TIME ZONE 'UTC')::date AS day, "
+            "COALESCE(activity_type, '') AS activity_type, "
+            "SUM(carbon_estimate) AS total_carbon, COUNT(*) AS count "
+            f"FROM activities WHERE timestamp IS NOT NULL {activity_filters} "
+            "GROUP BY 1, 2, 3"
+        )
+
+    @staticmethod
+    def _scope(user_id: Optional[str], since: Optional[date]):
+        activity_filters, rollup_filters, params = "", "", {}
+        if user_id:
+            params["user_id"] = str(uuid.UUID(str(user_id)))
+            activity_filters += " AND user_id = CAST(:user_id AS uuid)"
+            rollup_filters += " AND user_id = CAST(:user_id AS uuid)"
+        if since:
+            params["since"] = since
+            activity_filters += " AND timestamp >= (CAST(:since AS date) AT TIME ZONE 'UTC')"
+            rollup_filters += " AND day >= :since"
+        return activity_filters, rollup_filters, params
@@ -0,0 +1,288 @@
+"""
+Local rule-based carbon classifier.
+
+Phrases from a dictionary are matched in one pass over the text's tokens with an
+Aho-Corasick automaton; each phrase points at an emission rule (category, factors per
+unit, default when no quantity is stated). Quantities (km, miles, kWh, litres, gallons,
+therms, nights, money) are pulled out with one compiled regex and scale the estimate.
+Common receipts resolve in microseconds; low-confidence results are left for the LLM.
+
+Factors are rough averages (kg CO2e per unit) suitable for a first estimate, not an audit.
+"""
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+@dataclass(frozen=True, eq=False)  # Identity hashing: rules are module-level singletons
+class EmissionRule:
+    activity_type: str        # Same categories the LLM is asked for
+    label: str                # Human readable, used in the description
+    factors: Dict[str, float] # kg CO2e per unit, in order of preference
+    default_kg: float         # When the text states no usable quantity
+    weight: float = 1.0       # How strongly a phrase implies this rule (< 1 for weak hints)
+
+@dataclass
+class Classification:
+    rule: Optional[EmissionRule]
+    carbon_estimate: float
+    confidence: float
+    quantity: Optional[Tuple[float, str]] = None
+    phrases: List[str] = field(default_factory=list)
+    ambiguous: bool = False
+
+FLIGHT = EmissionRule("Travel", "Air travel", {"km": 0.15, "money": 0.45}, 250.0)
+AIRPORT_HINT = EmissionRule("Travel", "Air travel", {"km": 0.15, "money": 0.45}, 250.0, weight=0.5)
+CAR = EmissionRule("Travel", "Car trip", {"km": 0.17, "liter": 2.31, "gallon": 8.89, "money": 0.25}, 4.0)
+RIDE_HAIL = EmissionRule("Travel", "Ride-hailing trip", {"km": 0.19, "money": 0.2}, 3.5)
+BUS = EmissionRule("Travel", "Bus trip", {"km": 0.1, "money": 0.2}, 1.0)
+RAIL = EmissionRule("Travel", "Train trip", {"km": 0.04, "money": 0.05}, 2.0)
+FUEL = EmissionRule("Travel", "Vehicle fuel", {"liter": 2.31, "gallon": 8.89, "money": 2.4}, 40.0)
+HOTEL = EmissionRule("Travel", "Hotel stay", {"night": 15.0, "money": 0.1}, 15.0)
+MICRO = EmissionRule("Travel", "Bike/scooter trip", {"km": 0.02}, 0.1)
+
+ELECTRICITY = EmissionRule("Housing", "Electricity", {"kwh": 0.4, "money": 2.5}, 30.0)
+HEATING = EmissionRule("Housing", "Natural gas / heating", {"therm": 5.3, "kwh": 0.18, "money": 3.5}, 60.0)
+WATER = EmissionRule("Housing", "Water", {"liter": 0.0003, "gallon": 0.0011, "money": 0.3}, 3.0)
+
+GROCERIES = EmissionRule("Food", "Groceries", {"money": 0.4}, 10.0)
+MEAT = EmissionRule("Food", "Meat purchase", {"money": 1.0}, 15.0, weight=1.2)
+RESTAURANT = EmissionRule("Food", "Restaurant meal", {"money": 0.3}, 5.0)
+COFFEE = EmissionRule("Food", "Coffee/snack", {"money": 0.2}, 0.5)
+DELIVERY = EmissionRule("Food", "Food delivery", {"money": 0.35}, 4.0)
+
+CLOTHING = EmissionRule("Lifestyle", "Clothing", {"money": 0.35}, 15.0)
+ELECTRONICS = EmissionRule("Lifestyle", "Electronics", {"money": 0.4}, 60.0)
+ONLINE_SHOPPING = EmissionRule("Lifestyle", "Online shopping", {"money": 0.3}, 8.0, weight=0.8)
+STREAMING = EmissionRule("Lifestyle", "Streaming/subscription", {"money": 0.05}, 0.5)
+FURNITURE = EmissionRule("Lifestyle", "Furniture/home goods", {"money": 0.5}, 40.0)
+
+PHRASES: Dict[str, EmissionRule] = {
+    **dict.fromkeys([
+        "flight", "flights", "airline", "airlines", "boarding pass", "e ticket", "departure gate",
+        "itinerary", "british airways", "lufthansa", "ryanair", "easyjet", "delta air lines",
+        "united airlines", "american airlines", "air france", "klm", "emirates", "jetblue",
+    ], FLIGHT),
+    **dict.fromkeys(["airport", "layover"], AIRPORT_HINT),
+    **dict.fromkeys([
+        "car rental", "rental car", "hertz", "avis", "enterprise rent", "sixt", "road trip",
+        "toll", "parking", "mileage",
+    ], CAR),
+    **dict.fromkeys(["uber", "lyft", "taxi", "cab", "bolt", "rideshare", "chauffeur"], RIDE_HAIL),
+    **dict.fromkeys(["bus", "coach", "greyhound", "flixbus", "megabus", "metro card", "transit"], BUS),
+    **dict.fromkeys(["train", "rail", "amtrak", "eurostar", "subway", "metro", "tram", "underground"], RAIL),
+    **dict.fromkeys([
+        "gas station", "petrol", "gasoline", "diesel", "fuel", "shell", "chevron", "exxon", "bp",
+        "unleaded", "fill up",
+    ], FUEL),
+    **dict.fromkeys(["hotel", "motel", "airbnb", "hostel", "booking com", "check in", "resort"], HOTEL),
+    **dict.fromkeys(["bike share", "scooter", "lime", "citi bike", "e bike"], MICRO),
+
+    **dict.fromkeys([
+        "electricity", "electric bill", "power bill", "kwh", "energy bill", "utility bill",
+        "electric company", "edison",
+    ], ELECTRICITY),
+    **dict.fromkeys(["natural gas", "gas bill", "heating", "therms", "boiler", "furnace", "heating oil"], HEATING),
+    **dict.fromkeys(["water bill", "water utility", "sewer"], WATER),
+
+    **dict.fromkeys([
+        "grocery", "groceries", "supermarket", "whole foods", "tesco", "walmart", "kroger", "aldi",
+        "lidl", "trader joe", "safeway", "costco", "sainsbury", "produce", "vegetables", "veggies",
+        "milk", "bread", "eggs",
+    ], GROCERIES),
+    **dict.fromkeys([
+        "steak", "steaks", "beef", "lamb", "pork", "burger", "burgers", "meat", "bacon", "sausage",
+    ], MEAT),
+    **dict.fromkeys([
+        "restaurant", "dinner", "lunch", "brunch", "bistro", "diner", "cafe", "reservation",
+        "opentable", "gratuity",
+    ], RESTAURANT),
+    **dict.fromkeys(["coffee", "starbucks", "latte", "espresso", "bakery"], COFFEE),
+    **dict.fromkeys(["doordash", "ubereats", "uber eats", "grubhub", "deliveroo", "just eat"], DELIVERY),
+
+    **dict.fromkeys(["clothing", "apparel", "shoes", "jacket", "zara", "h m", "uniqlo", "nike"], CLOTHING),
+    **dict.fromkeys([
+        "laptop", "smartphone", "iphone", "mobile phone", "tablet", "television", "smart tv",
+        "headphones", "best buy", "apple store", "electronics",
+    ], ELECTRONICS),
+    **dict.fromkeys(["amazon", "order shipped", "your order", "ebay", "etsy"], ONLINE_SHOPPING),
+    **dict.fromkeys(["netflix", "spotify", "subscription", "streaming", "disney"], STREAMING),
+    **dict.fromkeys(["ikea", "furniture", "sofa", "mattress"], FURNITURE),
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Placeholders left by Anonymizer.strip_pii; their words ("phone", "name") are not evidence
+_PLACEHOLDER_RE = re.compile(r"\[(?:PHONE|EMAIL|NAME|ADDRESS)\]")
+
+_NUMBER = r"(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)"
+_QUANTITY_RE = re.compile(
+    rf"(?P<money_sym>[$€£]\s?{_NUMBER})"
+    rf"|(?:{_NUMBER}\s?(?:"
+    r"(?P<km>km|kms|kilometers?|kilometres?)"
+    r"|(?P<mile>mi|miles?)"
+    r"|(?P<kwh>kwh)"
+    r"|(?P<liter>l|liters?|litres?)"
+    r"|(?P<gallon>gal|gallons?)"
+    r"|(?P<therm>therms?)"
+    r"|(?P<night>nights?)"
+    r"|(?P<money_code>usd|eur|gbp|dollars?|euros?|pounds?)"
+    r"))\b",
+    re.IGNORECASE,
+)
+_TOTAL_RE = re.compile(r"\b(?:total|amount due|amount|charged|paid)\b", re.IGNORECASE)
+
+class PhraseAutomaton:
+    """
+    Aho-Corasick over word tokens: every dictionary phrase occurring in a token sequence is
+    reported in a single left-to-right pass, whatever the dictionary size.
+    """
+    def __init__(self, phrases: Dict[Tuple[str, ...], Any]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        for tokens, payload in phrases.items():
+            node = 0
+            for token in tokens:
+                nxt = self._goto[node].get(token)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][token] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(tokens), payload))
+
+        # Breadth-first failure links; outputs of the fallback state are inherited
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and token not in self._goto[f]:
+                    f = self._fail[f]
+                fallback = self._goto[f].get(token, 0)
+                self._fail[child] = fallback if fallback != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, tokens: Sequence[str]) -> Iterator[Tuple[int, int, Any]]:
+        """
+        Yields (start token index, phrase length, payload) for every match, overlaps included.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, token in enumerate(tokens):
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            for length, payload in out[node]:
+                yield i - length + 1, length, payload
+
+_AUTOMATON = PhraseAutomaton({tuple(_TOKEN_RE.findall(p)): (p, rule) for p, rule in PHRASES.items()})
+
+def extract_quantities(text: str) -> Dict[str, float]:
+    """
+    Quantities by unit (km, kwh, liter, gallon, therm, night, money); miles become km.
+    Money prefers the amount right after a 'total'-like word, otherwise the largest amount.
+    """
+    found: Dict[str, float] = {}
+    money: List[Tuple[int, float]] = []
+    for m in _QUANTITY_RE.finditer(text):
+        unit = m.lastgroup
+        value = float((m.group(2) if unit == "money_sym" else m.group(3)).replace(",", ""))
+        if unit in ("money_sym", "money_code"):
+            money.append((m.start(), value))
+        elif unit == "mile":
+            found.setdefault("km", value * 1.609)
+        else:
+            found.setdefault(unit, value)
+
+    if money:
+        totals = [t.end() for t in _TOTAL_RE.finditer(text)]
+        after_total = [v for pos, v in money if any(0 <= pos - t <= 24 for t in totals)]
+        found["money"] = after_total[-1] if after_total else max(v for _, v in money)
+    return found
+
+class RuleClassifier:
+    """
+    Scores every matched rule (phrase weight x phrase length, summed per rule), picks the best,
+    and scales its factor by the first quantity the rule understands. A runner-up of a
+    different category scoring close to the winner marks the result ambiguous.
+    """
+    AMBIGUITY_RATIO = 0.8
+
+    @staticmethod
+    def classify(text: str) -> Classification:
+        tokens = _TOKEN_RE.findall(_PLACEHOLDER_RE.sub(" ", text).lower())
+        scores: Dict[EmissionRule, float] = {}
+        phrases: Dict[EmissionRule, List[str]] = {}
+        for _, length, (phrase, rule) in _AUTOMATON.find(tokens):
+            scores[rule] = scores.get(rule, 0.0) + rule.weight * length
+            phrases.setdefault(rule, []).append(phrase)
+
+        if not scores:
+            return Classification(rule=None, carbon_estimate=1.2, confidence=0.3)
+
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        best, best_score = ranked[0]
+        ambiguous = any(
+            rule.activity_type != best.activity_type and score >= best_score * RuleClassifier.AMBIGUITY_RATIO
+            for rule, score in ranked[1:]
+        )
+
+        quantities = extract_quantities(text)
+        quantity = next(((quantities[unit], unit) for unit in best.factors if unit in quantities), None)
+        estimate = quantity[0] * best.factors[quantity[1]] if quantity else best.default_kg
+
+        confidence = 0.6 if quantity else 0.45
+        if best_score >= 2:
+            confidence += 0.15   # Several phrases agree
+        if quantity and quantity[1] != "money":
+            confidence += 0.1    # Physical units beat spend-based factors
+        if best.weight < 1:
+            confidence -= 0.1
+        if ambiguous:
+            confidence = min(confidence, 0.4)
+
+        return Classification(
+            rule=best, carbon_estimate=round(estimate, 2), confidence=round(min(confidence, 0.9), 2),
+            quantity=quantity, phrases=phrases[best], ambiguous=ambiguous,
+        )
+
+    @staticmethod
+    def to_result(c: Classification, inference_method: str) -> Dict[str, Any]:
+        """
+        Formats a classification like an LLM answer (same keys as the engine's response_schemas).
+        """
+        if c.rule is None:
+            return {
+                "activity_type": "General",
+                "description": "Activity detected from logs",
+                "carbon_estimate": c.carbon_estimate,
+                "confidence": c.confidence,
+                "reasoning": "No known activity phrases; default estimate",
+                "inference_method": inference_method,
+            }
+
+        matched = ", ".join(dict.fromkeys(c.phrases))
+        if c.quantity:
+            value, unit = c.quantity
+            amount = f"${value:,.2f}" if unit == "money" else f"{value:g} {unit}"
+            per = "$" if unit == "money" else unit
+            description = f"{c.rule.label} ({amount})"
+            reasoning = f"Matched {matched}; {amount} x {c.rule.factors[unit]} kg CO2e per {per}"
+        else:
+            description = f"{c.rule.label} (estimated)"
+            reasoning = f"Matched {matched}; no quantity found, typical {c.rule.default_kg} kg CO2e"
+        if c.ambiguous:
+            reasoning += " (ambiguous: other categories matched too)"
+
+        return {
+            "activity_type": c.rule.activity_type,
+            "description": description,
+            "carbon_estimate": c.carbon_estimate,
+            "confidence": c.confidence,
+            "reasoning": reasoning,
+            "inference_method": inference_method,
+        }
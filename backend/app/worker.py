@@ -1,11 +1,15 @@
+import glob
 import os
 from celery import Celery
+from celery.signals import worker_init, worker_process_shutdown
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess, start_http_server
 from .core.config import settings
 
 celery_app = Celery(
     "ecotwin_tasks",
     broker=str(settings.REDIS_URL),
-    backend=str(settings.REDIS_URL)
+    backend=str(settings.REDIS_URL),
+    include=["app.core.tasks"]
 )
 
 celery_app.conf.update(
@@ -15,4 +19,31 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
+    # Bulk imports get their own queue (and workers) so ingestion spikes never starve inference
+    task_routes={"import_activities_task": {"queue": settings.IMPORT_QUEUE}},
 )
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    """
+    Serves the worker's custom metrics on WORKER_METRICS_PORT.
+    With the prefork pool, tasks run in child processes: set PROMETHEUS_MULTIPROC_DIR so the
+    children write their samples there and this (parent) process serves the aggregate.
+    """
+    if not settings.WORKER_METRICS_PORT:
+        return
+    registry = REGISTRY
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        # Samples of a previous run would otherwise be summed into this one
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(multiproc_dir, "*.db")):
+            os.remove(path)
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    start_http_server(settings.WORKER_METRICS_PORT, registry=registry)
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
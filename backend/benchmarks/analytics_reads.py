@@ -0,0 +1,73 @@
+"""
+Benchmark for the column-projected analytics reads (ActivityReads) against
+hydrating full Activity ORM objects, as the analytics paths used to.
+
+    python -m benchmarks.analytics_reads [--sizes 10000 100000 1000000] [--repeat 3]
+
+Seeds a throwaway user per size (2 KB raw_data per activity), loads the 90-day
+window both ways and reports median latency and peak Python memory (tracemalloc).
+Needs the Postgres database from DATABASE_URL (seeding uses generate_series and
+gen_random_uuid); seeded rows are deleted afterwards.
+"""
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import pandas as pd
+from app.db.session import SessionLocal
+from app.models.models import Activity
+from app.services.activity_reads import ActivityReads
+from .common import cleanup_user, seed_user
+
+def _orm_window(db, user_id, since) -> pd.DataFrame:
+    activities = db.query(Activity)\
+        .filter(Activity.user_id == user_id, Activity.timestamp >= since)\
+        .all()
+    return pd.DataFrame([{'id': str(a.id), 'carbon': a.carbon_estimate, 'desc': a.description, 'date': a.timestamp} for a in activities])
+
+def _projected_window(db, user_id, since) -> pd.DataFrame:
+    return ActivityReads.user_window(db, user_id, since)
+
+def _measure(db, loader, user_id, repeat: int):
+    since = datetime.utcnow() - timedelta(days=90)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        loader(db, user_id, since)
+        timings.append((time.perf_counter() - start) * 1000)
+        db.expunge_all()
+
+    # Memory measured on a separate run: tracemalloc itself slows allocation-heavy code
+    tracemalloc.start()
+    loader(db, user_id, since)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.expunge_all()
+    return statistics.median(timings), peak / 1e6
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.analytics_reads", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'activities':>12} {'orm ms':>10} {'orm MB':>10} {'proj ms':>10} {'proj MB':>10}")
+    db = SessionLocal()
+    try:
+        for size in args.sizes:
+            user_id = seed_user(db, size)
+            try:
+                orm_ms, orm_mb = _measure(db, _orm_window, user_id, args.repeat)
+                proj_ms, proj_mb = _measure(db, _projected_window, user_id, args.repeat)
+            finally:
+                cleanup_user(db, user_id)
+            print(f"{size:>12} {orm_ms:>10.1f} {orm_mb:>10.1f} {proj_ms:>10.1f} {proj_mb:>10.1f}")
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Benchmark for the AnalyticsService.detect_anomalies backends.
+
+    python -m benchmarks.anomaly_backends [--sizes 1000 100000 1000000] [--repeat 5]
+
+For each size, seeds a throwaway user with that many activities spread over the
+90-day window, seeds its running stats (AnomalyService.rebuild), and times every
+backend. Needs the database from DATABASE_URL; the user and all its rows are
+deleted afterwards.
+"""
+import argparse
+import statistics
+import sys
+import time
+from app.db.session import SessionLocal
+from app.services.analytics import AnalyticsService
+from app.services.anomaly_service import AnomalyService
+from .common import cleanup_user, seed_user
+
+BACKENDS = ("flagged", "sql", "pandas")
+
+def _time(db, user_id: str, backend: str, repeat: int):
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = AnalyticsService.detect_anomalies(db, user_id, backend=backend)
+        timings.append((time.perf_counter() - start) * 1000)
+        db.expunge_all()  # Don't let the identity map make the ORM path look cheaper
+    return statistics.median(timings), result
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.anomaly_backends", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'activities':>12} " + " ".join(f"{b + ' ms':>12}" for b in BACKENDS) + "  agree")
+    db = SessionLocal()
+    try:
+        for size in args.sizes:
+            user_id = seed_user(db, size)
+            try:
+                AnomalyService.rebuild(db, user_id)
+                results = {b: _time(db, user_id, b, args.repeat) for b in BACKENDS}
+            finally:
+                cleanup_user(db, user_id)
+
+            # flagged is scored with the same stats as the window, so all three should agree
+            ids = {b: [r['id'] for r in res] for b, (_, res) in results.items()}
+            agree = ids["sql"] == ids["pandas"] == ids["flagged"]
+            print(f"{size:>12} " + " ".join(f"{results[b][0]:>12.1f}" for b in BACKENDS) + f"  {agree}")
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Throughput benchmark for Anonymizer.strip_pii / categorize against the previous
+multi-pass implementation, on a synthetic email corpus.
+
+    python -m benchmarks.anonymizer_throughput [--emails 20000] [--repeat 5] [--seed 7]
+
+Verifies the outputs are identical before reporting MB/s. No database needed.
+"""
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from app.services.connectors.anonymizer import Anonymizer
+
+def legacy_strip_pii(text: str) -> str:
+    text = re.sub(r'\b\d{10}\b', '[PHONE]', text)
+    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', text)
+    text = re.sub(r'(Mr\.|Ms\.|Mrs\.|John|Jane|Doe)\s+\w+', '[NAME]', text)
+    text = re.sub(r'\d+\s+[A-Za-z]+\s+(St|Ave|Rd|Blvd)', '[ADDRESS]', text)
+    return text
+
+def legacy_categorize(text: str) -> str:
+    text_lower = text.lower()
+    if any(w in text_lower for w in ["flight", "travel", "uber", "gas"]):
+        return "Mobility"
+    if any(w in text_lower for w in ["food", "grocery", "restaurant", "meat"]):
+        return "Consumption"
+    if any(w in text_lower for w in ["electricity", "heating", "water", "solar"]):
+        return "Housing"
+    return "Miscellaneous"
+
+TEMPLATES = [
+    "Booking Confirmation for {title} {last}. Flight {code} from {city} to {city2} departs {time}. "
+    "Questions? Call {phone} or write to {email}.",
+    "Receipt from {shop}: {items}. Total ${amount}. Delivered to {num} {street} {suffix}. Thanks, {first}!",
+    "Hi {first}, your electricity bill for {month} is ready: {kwh} kWh, ${amount}. "
+    "Account contact: {email}. Service address: {num} {street} {suffix}.",
+    "Uber Receipt: Ride to {city} Airport, {km} km, ${amount}. Driver rating requested by {email}.",
+    "Dinner reservation at {shop} restaurant confirmed for {title} {last}, party of {num}. Ref {code}.",
+]
+WORDS = dict(
+    title=["Mr.", "Ms.", "Mrs.", "John", "Jane", "Doe"], last=["Smith", "Garcia", "Okafor", "Chen"],
+    first=["Alex", "Sam", "Priya", "Jordan"], city=["London", "Paris", "Lagos", "Austin"],
+    city2=["Berlin", "Tokyo", "Nairobi", "Denver"], shop=["Whole Foods", "Tesco", "Corner Deli"],
+    items=["Organic Steaks, Milk, and Veggies", "Bread, Eggs", "Coffee beans"],
+    street=["Main", "Oak", "Elm", "Market"], suffix=["St", "Ave", "Rd", "Blvd"],
+    month=["January", "March", "October"],
+)
+
+def build_corpus(n: int, seed: int):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        fields = {k: rng.choice(v) for k, v in WORDS.items()}
+        fields.update(
+            code=f"{rng.choice(['BA', 'UA', 'LH'])}{rng.randint(100, 9999)}", time=f"{rng.randint(1, 12)}:00",
+            phone="".join(rng.choice("0123456789") for _ in range(10)),
+            email=f"{fields['first'].lower()}.{rng.randint(1, 999)}@example.com",
+            amount=f"{rng.uniform(3, 900):.2f}", num=rng.randint(1, 999), kwh=rng.randint(50, 900),
+            km=rng.randint(2, 60),
+        )
+        corpus.append(" ".join(rng.choice(TEMPLATES).format(**fields) for _ in range(rng.randint(1, 4))))
+    return corpus
+
+def _mb_per_s(fn, corpus, megabytes: float, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(corpus)
+        timings.append(time.perf_counter() - start)
+    return megabytes / statistics.median(timings)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.anonymizer_throughput", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.emails, args.seed)
+    megabytes = sum(len(t.encode()) for t in corpus) / 1e6
+
+    expected = [legacy_strip_pii(t) for t in corpus]
+    if [Anonymizer.strip_pii(t) for t in corpus] != expected or Anonymizer.strip_pii_batch(corpus) != expected:
+        print("strip_pii output differs from the legacy implementation")
+        return 1
+    if [Anonymizer.categorize(t) for t in expected] != [legacy_categorize(t) for t in expected]:
+        print("categorize output differs from the legacy implementation")
+        return 1
+
+    cases = {
+        "strip_pii (legacy)": lambda c: [legacy_strip_pii(t) for t in c],
+        "strip_pii (compiled)": lambda c: [Anonymizer.strip_pii(t) for t in c],
+        "strip_pii_batch": Anonymizer.strip_pii_batch,
+        "categorize (legacy)": lambda c: [legacy_categorize(t) for t in c],
+        "categorize": lambda c: [Anonymizer.categorize(t) for t in c],
+    }
+    print(f"{args.emails} emails, {megabytes:.1f} MB; outputs identical")
+    for label, fn in cases.items():
+        print(f"{label:<32} {_mb_per_s(fn, corpus, megabytes, args.repeat):>8.1f} MB/s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+import uuid
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+def seed_user(db: Session, size: int) -> str:
+    """
+    Creates a throwaway user with `size` activities spread uniformly over the last 89 days
+    (mostly small carbon values with a ~1% tail of large ones) and commits. Returns the user id.
+    """
+    user_id = str(uuid.uuid4())
+    db.execute(text(
+        "INSERT INTO users (id, email, hashed_password) VALUES (CAST(:uid AS uuid), :email, 'x')"
+    ), {"uid": user_id, "email": f"bench-{user_id}@example.invalid"})
+    db.execute(text(
+        "INSERT INTO activities (id, user_id, activity_type, description, raw_data, carbon_estimate, "
+        "confidence_score, is_anomaly, timestamp) "
+        "SELECT gen_random_uuid(), CAST(:uid AS uuid), 'benchmark', 'activity ' || g, repeat('x', 2000), "
+        "CASE WHEN random() < 0.01 THEN 50 + random() * 100 ELSE random() * 20 END, 1.0, false, "
+        "now() - random() * interval '89 days' "
+        "FROM generate_series(1, :size) AS g"
+    ), {"uid": user_id, "size": size})
+    db.commit()
+    db.execute(text("ANALYZE activities"))
+    return user_id
+
+def cleanup_user(db: Session, user_id: str) -> None:
+    db.rollback()
+    for table in ("user_carbon_stats", "daily_carbon_rollup", "forecasts", "activities"):
+        db.execute(text(f"DELETE FROM {table} WHERE user_id = CAST(:uid AS uuid)"), {"uid": user_id})
+    db.execute(text("DELETE FROM users WHERE id = CAST(:uid AS uuid)"), {"uid": user_id})
+    db.commit()
@@ -0,0 +1,85 @@
+"""
+Benchmark for label-scoped graph lookups (index seeks on the per-label id constraints)
+against the previous unlabeled pattern, as the graph grows.
+
+    python -m benchmarks.graph_lookup [--sizes 1000 10000 100000] [--lookups 200]
+
+Grows a set of benchmark Location nodes (each with one IMPACTS edge) through the bulk write
+API, and at every size reports the median latency of simulate_impact's start-node lookup
+with and without the label. Needs the Neo4j from NEO4J_URI; benchmark nodes are deleted
+afterwards.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+import uuid
+from app.db.neo4j_driver import neo4j_driver
+from app.services.graph_service import GraphService
+
+UNLABELED_QUERY = (
+    "MATCH (start {id: $start_id})-[r]->(downstream) "
+    "RETURN downstream.id as target, labels(downstream) as label, type(r) as action, r.weight as weight"
+)
+
+def _grow(service: GraphService, run_id: str, ids: list, target: int) -> None:
+    new_ids = [f"bench-{run_id}-{i}" for i in range(len(ids), target)]
+    service.create_nodes({"label": "Location", "properties": {"id": node_id, "bench_run": run_id}}
+                         for node_id in new_ids)
+    # Ring of IMPACTS edges so every start node has a downstream neighbour
+    service.create_relationships(
+        {"source_id": node_id, "target_id": new_ids[(i + 1) % len(new_ids)], "rel_type": "IMPACTS",
+         "source_label": "Location", "target_label": "Location", "weight": 0.5}
+        for i, node_id in enumerate(new_ids)
+    )
+    ids.extend(new_ids)
+
+def _median_ms(fn, ids: list, lookups: int, rng: random.Random) -> float:
+    timings = []
+    for node_id in rng.sample(ids, min(lookups, len(ids))):
+        start = time.perf_counter()
+        fn(node_id)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+def _cleanup(run_id: str) -> None:
+    with neo4j_driver.get_session() as session:
+        while session.run(
+            "MATCH (n:Location {bench_run: $run}) WITH n LIMIT 10000 DETACH DELETE n RETURN count(*) AS c",
+            run=run_id
+        ).single()["c"]:
+            pass
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.graph_lookup", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    service = GraphService()
+    service.ensure_schema()
+    run_id = uuid.uuid4().hex[:8]
+    rng = random.Random(args.seed)
+    ids: list = []
+
+    def _unlabeled(node_id: str) -> None:
+        with neo4j_driver.get_session() as session:
+            session.run(UNLABELED_QUERY, start_id=node_id).consume()
+
+    print(f"{'nodes':>10} {'labeled ms':>12} {'unlabeled ms':>14}")
+    try:
+        for size in sorted(args.sizes):
+            _grow(service, run_id, ids, size)
+            labeled = _median_ms(lambda node_id: service.simulate_impact(node_id, 1.0, start_label="Location"),
+                                 ids, args.lookups, rng)
+            unlabeled = _median_ms(_unlabeled, ids, args.lookups, rng)
+            print(f"{size:>10} {labeled:>12.2f} {unlabeled:>14.2f}")
+    finally:
+        _cleanup(run_id)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Offline load test of the inference pipeline against the simulated LLM (no Gemini key needed).
+
+    python -m benchmarks.inference_load [--requests 400] [--concurrency 1,8,32] [--max-retries 0,1,3]
+        [--latency-ms 800] [--latency-sigma 0.5] [--error-rate 0.05] [--redis] [--seed 7]
+
+Runs analyze_activity_task in Celery eager mode from a thread pool (one thread per worker slot)
+on a synthetic email corpus, for every concurrency x client-retry combination, and reports
+throughput, p50/p95/p99 task latency and how answers were produced (fallback rate).
+Without --redis the Redis-backed parts (result cache, LLM scheduler, circuit breaker, result
+events) are switched off so nothing but this checkout is needed. Results are never persisted.
+"""
+import argparse
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+import numpy as np
+from app.core.config import settings
+from benchmarks.anonymizer_throughput import build_corpus
+
+USER_ID = "00000000-0000-0000-0000-000000000000"
+
+class _DiscardBuffer:
+    def add(self, records: List[Dict[str, Any]]) -> None:
+        pass
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",")]
+
+def run_scenario(tasks, corpus: List[str], concurrency: int) -> Dict[str, Any]:
+    def _one(blob: str):
+        start = time.perf_counter()
+        result = tasks.analyze_activity_task.apply(args=(blob, USER_ID)).get()
+        return time.perf_counter() - start, result.get("inference_method", "unknown")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(_one, corpus))
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array([seconds for seconds, _ in outcomes]) * 1000.0
+    methods = Counter(method for _, method in outcomes)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"throughput": len(corpus) / elapsed, "p50": p50, "p95": p95, "p99": p99, "methods": methods}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.inference_load", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8, 32])
+    parser.add_argument("--max-retries", type=_int_list, default=[settings.LLM_MAX_RETRIES])
+    parser.add_argument("--latency-ms", type=float, default=settings.FAKE_LLM_LATENCY_MS)
+    parser.add_argument("--latency-sigma", type=float, default=settings.FAKE_LLM_LATENCY_SIGMA)
+    parser.add_argument("--error-rate", type=float, default=settings.FAKE_LLM_ERROR_RATE)
+    parser.add_argument("--redis", action="store_true", help="keep cache/scheduler/breaker/events on")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    # Must be in place before the task module builds its engine
+    settings.LLM_BACKEND = "fake"
+    if not args.redis:
+        settings.INFERENCE_CACHE_ENABLED = False
+        settings.LLM_SCHEDULER_ENABLED = False
+        settings.LLM_CIRCUIT_ENABLED = False
+
+    from app.core import tasks
+    from app.services.fake_llm import FakeLLM
+    from app.services.inference_engine import InferenceEngine
+    from app.worker import celery_app
+
+    celery_app.conf.task_always_eager = True
+    tasks.activity_buffer = _DiscardBuffer()
+    if not args.redis:
+        tasks.publish_inference_event = lambda *a, **kw: None
+
+    corpus = build_corpus(args.requests, args.seed)
+    print(f"{args.requests} requests per run; simulated LLM {args.latency_ms:.0f} ms median "
+          f"(sigma {args.latency_sigma}), error rate {args.error_rate:.0%}")
+    print(f"{'concurrency':>11} {'retries':>7} {'tasks/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'fallback':>9}  methods")
+    for retries in args.max_retries:
+        for concurrency in args.concurrency:
+            llm = FakeLLM(latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+                          error_rate=args.error_rate, max_retries=retries, seed=args.seed)
+            tasks.inference_engine = InferenceEngine(llm=llm)
+            report = run_scenario(tasks, corpus, concurrency)
+            methods = report["methods"]
+            fallback = methods.get("heuristic_fallback", 0) / args.requests
+            print(f"{concurrency:>11} {retries:>7} {report['throughput']:>9.1f} {report['p50']:>9.1f} "
+                  f"{report['p95']:>9.1f} {report['p99']:>9.1f} {fallback:>9.1%}  "
+                  + ", ".join(f"{m}={n}" for m, n in methods.most_common()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import uuid
+from types import SimpleNamespace
+from prometheus_client import REGISTRY
+from app.services import activity_writer
+from app.services.activity_writer import ActivityWriteBuffer, inferred_activity_rows
+
+USER = "11111111-1111-1111-1111-111111111111"
+
+def test_rows_have_task_derived_ids():
+    results = [{"activity_type": "Travel", "carbon_estimate": "12.5", "confidence": 0.8},
+               {"activity_type": "Food", "carbon_estimate": None},
+               {"activity_type": "Housing", "carbon_estimate": 3}]
+    rows = inferred_activity_rows("task-1", USER, results)
+    assert [r["activity_type"] for r in rows] == ["Travel", "Housing"]
+    assert rows[0]["carbon_estimate"] == 12.5 and rows[1]["confidence_score"] is None
+    assert rows[0]["user_id"] == uuid.UUID(USER)
+    # A redelivered task maps to the same rows; another task does not
+    assert [r["id"] for r in inferred_activity_rows("task-1", USER, results)] == [r["id"] for r in rows]
+    assert inferred_activity_rows("task-2", USER, results)[0]["id"] != rows[0]["id"]
+
+class _FailingSession:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def _dropped():
+    return REGISTRY.get_sample_value("ecotwin_activity_write_buffer_dropped_total") or 0.0
+
+def test_failed_flush_keeps_rows_and_reports_dropped_ones(monkeypatch):
+    events = []
+    monkeypatch.setattr(activity_writer, "publish_inference_event",
+                        lambda user_id, task_id, status, **payload: events.append((task_id, status, payload)))
+
+    def _fail(db, rows):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(activity_writer.ActivityService, "persist_inferred", _fail)
+    buffer = ActivityWriteBuffer(max_rows=100, max_delay_ms=60_000, max_pending=3,
+                                 session_factory=_FailingSession)
+    first = inferred_activity_rows("task-1", USER, [{"carbon_estimate": 1.0}] * 2)
+    buffer.add(first)
+    assert buffer.flush() == 0
+    assert buffer.pending() == 2 and events == []
+    buffer.add(inferred_activity_rows("task-2", USER, [{"carbon_estimate": 1.0}] * 2))
+    before = _dropped()
+    buffer.flush()
+    assert buffer.pending() == 3  # Capped at max_pending, oldest dropped
+    assert _dropped() - before == 1
+    assert events == [("task-1", "persist_failed", {"activity_ids": [str(first[0]["id"])]})]
+
+def test_successful_flush_announces_persisted_activities(monkeypatch):
+    events = []
+    monkeypatch.setattr(activity_writer, "publish_inference_event",
+                        lambda user_id, task_id, status, **payload: events.append((user_id, task_id, status, payload)))
+    monkeypatch.setattr(activity_writer.ActivityService, "persist_inferred", lambda db, rows: len(rows) - 1)
+    buffer = ActivityWriteBuffer(max_rows=100, max_delay_ms=60_000, session_factory=_FailingSession)
+    first = inferred_activity_rows("task-1", USER, [{"carbon_estimate": 1.0}] * 2)
+    second = inferred_activity_rows("task-2", USER, [{"carbon_estimate": 1.0}])
+    buffer.add(first)
+    buffer.add(second)
+
+    assert buffer.flush() == 2  # One row was already written by an earlier attempt
+    assert events == [
+        (USER, "task-1", "persisted", {"activity_ids": [str(r["id"]) for r in first]}),
+        (USER, "task-2", "persisted", {"activity_ids": [str(second[0]["id"])]}),
+    ]
+
+class _ConflictingSession:
+    """Reports every row but the already-written ones as inserted by ON CONFLICT DO NOTHING."""
+    def __init__(self, written):
+        self.written = set(written)
+        self.updates = []
+        self.committed = False
+
+    def execute(self, stmt, params):
+        if stmt.is_update:
+            self.updates.extend(params)
+            return None
+        inserted = [p["id"] for p in params if p["id"] not in self.written]
+        return SimpleNamespace(scalars=lambda: inserted)
+
+    def commit(self):
+        self.committed = True
+
+def test_persist_inferred_only_counts_rows_it_inserted(monkeypatch):
+    from app.services import activity_service
+    service = activity_service.ActivityService
+    scored, rolled_up = [], []
+
+    def _score(db, rows):
+        scored.extend(rows['id'])
+        return rows.assign(z_score=3.5, is_anomaly=True)
+
+    monkeypatch.setattr(activity_service.AnomalyService, "score_activities", _score)
+    monkeypatch.setattr(activity_service.RollupService, "apply_activities", lambda db, rows: rolled_up.extend(rows['id']))
+    monkeypatch.setattr(activity_service.ForecastCache, "bump_versions", lambda user_ids: None)
+    monkeypatch.setattr(service, "_project_to_graph", lambda rows: None)
+
+    rows = inferred_activity_rows("task-1", USER, [{"carbon_estimate": 1.0}] * 3)
+    db = _ConflictingSession(written=[rows[1]["id"]])  # A concurrent attempt committed item 1
+
+    assert service.persist_inferred(db, rows + rows[:1]) == 2
+    fresh = {rows[0]["id"], rows[2]["id"]}
+    assert set(scored) == set(rolled_up) == fresh
+    assert {u["id"] for u in db.updates} == fresh and all(u["is_anomaly"] for u in db.updates)
+    assert db.committed
+
+    assert service.persist_inferred(_ConflictingSession(written=fresh | {rows[1]["id"]}), rows) == 0
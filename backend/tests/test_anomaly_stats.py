@@ -0,0 +1,28 @@
+import numpy as np
+from app.services.anomaly_service import merge_stats, z_scores, decay_factor
+
+def test_merging_batches_matches_full_welford():
+    rng = np.random.default_rng(7)
+    values = rng.normal(12.0, 3.0, size=200)
+    a, b = values[:130], values[130:]
+
+    n, mean, m2 = merge_stats(
+        np.array([len(a)], dtype=float), np.array([a.mean()]), np.array([((a - a.mean()) ** 2).sum()]),
+        np.array([len(b)], dtype=float), np.array([b.mean()]), np.array([((b - b.mean()) ** 2).sum()]),
+    )
+
+    assert n[0] == 200
+    assert np.isclose(mean[0], values.mean())
+    assert np.isclose(m2[0] / (n[0] - 1), values.var(ddof=1))
+
+def test_merge_into_empty_stats_and_z_scores():
+    n, mean, m2 = merge_stats(np.zeros(1), np.zeros(1), np.zeros(1),
+                              np.array([4.0]), np.array([5.0]), np.array([12.0]))
+    assert (n[0], mean[0], m2[0]) == (4.0, 5.0, 12.0)
+
+    z = z_scores(np.array([9.0, 5.0]), np.repeat(n, 2), np.repeat(mean, 2), np.repeat(m2, 2))
+    assert np.allclose(z, [2.0, 0.0])
+    assert np.isnan(z_scores(np.array([1.0]), np.array([1.0]), np.array([1.0]), np.array([0.0]))[0])
+
+def test_decay_halves_weight_per_half_life():
+    assert np.allclose(decay_factor(np.array([0.0, 30.0, 60.0]), half_life_days=30.0), [1.0, 0.5, 0.25])
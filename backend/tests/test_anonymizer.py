@@ -0,0 +1,33 @@
+import re
+from app.services.connectors.anonymizer import Anonymizer
+
+def _legacy_strip_pii(text):
+    text = re.sub(r'\b\d{10}\b', '[PHONE]', text)
+    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', text)
+    text = re.sub(r'(Mr\.|Ms\.|Mrs\.|John|Jane|Doe)\s+\w+', '[NAME]', text)
+    text = re.sub(r'\d+\s+[A-Za-z]+\s+(St|Ave|Rd|Blvd)', '[ADDRESS]', text)
+    return text
+
+SAMPLES = [
+    "Booking Confirmation for Mr. John Doe. Flight BA123 from London to Paris.",
+    "Call 5551234567 or 55512345678 or x5551234567, write to jane.doe+eco@mail.example.org.",
+    "John 5551234567 lives at 221 Baker St, 12345 Oak Avenue and 7 Elm Rd.",
+    "x.1234567890.y@z.com, 1234567890@x.com, John doe@x.com, a@b.c",
+    "Deliver to 1 Main Street; Mrs.  Smith; Doe\nRay",
+    "",
+]
+
+def test_strip_pii_matches_legacy_multi_pass_output():
+    for text in SAMPLES:
+        assert Anonymizer.strip_pii(text) == _legacy_strip_pii(text)
+
+def test_batch_matches_per_item():
+    assert Anonymizer.strip_pii_batch(SAMPLES) == [Anonymizer.strip_pii(t) for t in SAMPLES]
+    assert Anonymizer.strip_pii_batch(["John Smith"]) == ["[NAME]"]
+    assert Anonymizer.strip_pii_batch([]) == []
+
+def test_categorize_priority():
+    assert Anonymizer.categorize("Restaurant bill, then a FLIGHT home") == "Mobility"
+    assert Anonymizer.categorize("Grocery run and water bill") == "Consumption"
+    assert Anonymizer.categorize("Solar panel check") == "Housing"
+    assert Anonymizer.categorize("Bookshop") == "Miscellaneous"
@@ -0,0 +1,86 @@
+import asyncio
+import io
+import os
+import threading
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException, Response, UploadFile
+from app.api import batch
+from app.services import activity_service
+from app.services.activity_service import ActivityService
+from app.core.config import settings
+
+class _DB:
+    def rollback(self):
+        pass
+
+def _upload():
+    return UploadFile(file=io.BytesIO(b"date,category,carbon_value\n2024-01-01,Travel,1.5\n"), filename="export.csv")
+
+def _spooled():
+    return os.listdir(settings.IMPORT_SPOOL_DIR) if os.path.isdir(settings.IMPORT_SPOOL_DIR) else []
+
+def test_async_upload_spools_the_file_and_queues_a_job(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "IMPORT_SPOOL_DIR", str(tmp_path))
+    queued, copy_threads = [], []
+    monkeypatch.setattr(batch.import_activities_task, "apply_async", lambda args, task_id: queued.append((args, task_id)))
+    copy = activity_service.shutil.copyfileobj
+    monkeypatch.setattr(activity_service.shutil, "copyfileobj",
+                        lambda *args, **kwargs: copy_threads.append(threading.get_ident()) or copy(*args, **kwargs))
+
+    response = Response()
+    result = asyncio.run(batch.bulk_upload_activities(response, _upload(), "async", _DB(), "alice"))
+
+    assert response.status_code == 202
+    assert result["status"] == "queued"
+    [(args, task_id)] = queued
+    assert task_id == result["job_id"]
+    assert args == [str(tmp_path / f"{task_id}.csv"), "alice"]
+    assert os.path.exists(args[0])
+    assert copy_threads and threading.get_ident() not in copy_threads  # Spooled off the event loop
+
+def test_async_upload_removes_the_spool_file_when_queueing_fails(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "IMPORT_SPOOL_DIR", str(tmp_path))
+
+    def broker_down(args, task_id):
+        raise ConnectionError("broker unreachable")
+    monkeypatch.setattr(batch.import_activities_task, "apply_async", broker_down)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(batch.bulk_upload_activities(Response(), _upload(), "async", _DB(), "alice"))
+    assert exc.value.status_code == 500
+    assert _spooled() == []
+
+@pytest.mark.parametrize("state,info,expected", [
+    ("PENDING", None, {"status": "queued"}),
+    ("STARTED", None, {"status": "running", "rows_processed": 0}),
+    ("PROGRESS", {"user_id": "alice", "rows_processed": 5000}, {"status": "running", "rows_processed": 5000}),
+    ("SUCCESS", {"user_id": "alice", "status": "completed"}, {"status": "completed"}),
+])
+def test_job_status_reports_progress_to_the_owner(monkeypatch, state, info, expected):
+    monkeypatch.setattr(batch, "AsyncResult", lambda job_id, app: SimpleNamespace(state=state, info=info))
+    result = asyncio.run(batch.get_import_job("job-1", "alice"))
+    assert result["job_id"] == "job-1"
+    assert expected.items() <= result.items()
+
+@pytest.mark.parametrize("state", ["PROGRESS", "SUCCESS"])
+def test_job_status_hides_other_users_jobs(monkeypatch, state):
+    info = {"user_id": "alice", "rows_processed": 5000}
+    monkeypatch.setattr(batch, "AsyncResult", lambda job_id, app: SimpleNamespace(state=state, info=info))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(batch.get_import_job("job-1", "mallory"))
+    assert exc.value.status_code == 404
+
+@pytest.mark.parametrize("mode", ["inline", "stream"])
+def test_uploads_are_imported_off_the_event_loop(monkeypatch, mode):
+    threads = []
+
+    def _ingest(frames, db, current_user_id, progress=None):
+        rows = sum(len(frame) for frame in frames)
+        threads.append(threading.get_ident())
+        return {"accepted": rows, "rejected": 0, "chunks": [], "rejection_report_id": None}
+    monkeypatch.setattr(ActivityService, "_ingest_frames", _ingest)
+
+    result = asyncio.run(batch.bulk_upload_activities(Response(), _upload(), mode, _DB(), "alice"))
+    assert result["accepted"] == 1
+    assert threads and threading.get_ident() not in threads
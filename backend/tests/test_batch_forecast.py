@@ -0,0 +1,59 @@
+import numpy as np
+from datetime import date
+from types import SimpleNamespace
+from sklearn.linear_model import LinearRegression
+from app.services.analytics import AnalyticsService
+from app.services.batch_forecast import BatchForecastEngine, fit_linear_trends
+from app.services.forecast_cache import ForecastCache
+
+def test_closed_form_matches_per_user_linear_regression():
+    rng = np.random.default_rng(42)
+    Y = rng.gamma(2.0, 5.0, size=(50, 61))
+
+    slope, intercept = fit_linear_trends(Y)
+
+    x = np.arange(Y.shape[1]).reshape(-1, 1)
+    for row in (0, 17, 49):
+        model = LinearRegression().fit(x, Y[row])
+        assert np.isclose(slope[row], model.coef_[0])
+        assert np.isclose(intercept[row], model.intercept_)
+
+def test_predictions_from_row_extrapolate_from_today():
+    row = SimpleNamespace(slope=0.5, intercept=10.0, base_date=date(2026, 1, 1))
+
+    predictions = BatchForecastEngine.predictions_from_row(row, days_ahead=2, today=date(2026, 1, 11))
+
+    assert predictions == [
+        {"date": "2026-01-12", "predicted_carbon": 15.5},
+        {"date": "2026-01-13", "predicted_carbon": 16.0},
+    ]
+
+class _ForecastQuery:
+    def __init__(self, row):
+        self.row = row
+
+    def query(self, model):
+        return self
+
+    def filter(self, *criteria):
+        return self
+
+    def first(self):
+        return self.row
+
+def test_precomputed_row_is_only_served_while_its_data_version_is_current(monkeypatch):
+    row = SimpleNamespace(slope=0.0, intercept=4.0, base_date=date(2026, 1, 1), data_version=3)
+    monkeypatch.setattr(ForecastCache, "get_or_compute", lambda user_id, days_ahead, compute: "refit")
+
+    monkeypatch.setattr(ForecastCache, "versions", lambda user_ids: {"u1": 3})
+    served = AnalyticsService.predict_future_footprint(_ForecastQuery(row), "u1", days_ahead=1)
+    assert served[0]["predicted_carbon"] == 4.0
+
+    # An activity write since the nightly run bumped the version; Redis down proves nothing
+    for versions in ({"u1": 4}, None):
+        monkeypatch.setattr(ForecastCache, "versions", lambda user_ids: versions)
+        assert AnalyticsService.predict_future_footprint(_ForecastQuery(row), "u1", days_ahead=1) == "refit"
+
+    row.data_version = None  # Written before versions were recorded
+    monkeypatch.setattr(ForecastCache, "versions", lambda user_ids: {"u1": 0})
+    assert AnalyticsService.predict_future_footprint(_ForecastQuery(row), "u1", days_ahead=1) == "refit"
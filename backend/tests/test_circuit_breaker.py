@@ -0,0 +1,70 @@
+import time
+import fakeredis
+import pytest
+import redis
+from prometheus_client import REGISTRY
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker
+
+def _redis_down():
+    raise redis.ConnectionError("redis unavailable")
+
+def test_calls_are_allowed_when_redis_is_down(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "get_redis", _redis_down)
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    breaker.record_failure()
+    assert breaker.allow() is True
+    assert breaker.state() == "unknown"
+    assert breaker.state_code() == -1
+    assert _gauge() == -1
+
+def _gauge():
+    return REGISTRY.get_sample_value("ecotwin_llm_circuit_state")
+
+@pytest.fixture
+def clock(monkeypatch):
+    # The Lua script reads Redis TIME, which fakeredis takes from time.time
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(circuit_breaker, "get_redis", lambda: client)
+    return now
+
+def _breaker():
+    return CircuitBreaker("test", failure_threshold=2, failure_window_seconds=60, open_seconds=30,
+                          half_open_probes=1, probe_timeout_seconds=20)
+
+def test_breaker_opens_probes_and_closes(clock):
+    breaker = _breaker()
+    breaker.record_failure()
+    assert breaker.state() == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert _gauge() == 2                  # Set by the call itself, not read at scrape time
+    assert breaker.state() == "open" and not breaker.allow()
+
+    clock[0] += 30
+    assert breaker.allow() is True        # The single probe
+    assert _gauge() == 1
+    assert breaker.allow() is False
+    assert breaker.state() == "half_open"
+    breaker.record_success()
+    assert _gauge() == 0
+    assert breaker.state() == "closed" and breaker.allow()
+
+def test_failed_probe_reopens_and_released_probe_is_reusable(clock):
+    breaker = _breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    clock[0] += 30
+
+    assert breaker.allow() is True
+    breaker.release()                     # Shed before the call was made
+    assert breaker.allow() is True
+    breaker.record_failure()
+    assert breaker.state() == "open" and not breaker.allow()
+
+    clock[0] += 30
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+    clock[0] += 20                        # The probe never reported back
+    assert breaker.allow() is True
@@ -0,0 +1,70 @@
+import fakeredis
+import pytest
+from app.services import collaboration_service
+from app.services.collaboration_service import CollaborationService
+
+class _RecordingGraph:
+    def __init__(self):
+        self.calls = []
+
+    def create_nodes(self, nodes, owners=None):
+        nodes = list(nodes)
+        self.calls.append(("nodes", nodes, owners))
+        return len(nodes)
+
+    def create_relationships(self, edges, owners=None):
+        edges = list(edges)
+        self.calls.append(("edges", edges, owners))
+        return len(edges)
+
+def test_share_resource_apportions_and_writes_edges_in_one_batch():
+    graph = _RecordingGraph()
+    result = CollaborationService(graph_service=graph).share_resource("car-1", ["u1", "u2", "u2", "u3"], total_carbon=300.0)
+
+    assert [a["carbon"] for a in result["allocations"]] == pytest.approx([100.0, 100.0, 100.0])
+    assert sum(a["carbon"] for a in result["allocations"]) == pytest.approx(300.0)
+    assert result["individual_allocation"] == pytest.approx(1 / 3)
+    assert [kind for kind, _, _ in graph.calls] == ["nodes", "edges"]
+    _, edges, owners = graph.calls[1]
+    assert result["edges_written"] == len(edges) == 3
+    assert {e["rel_type"] for e in edges} == {"SHARES"} and owners == ["u1", "u2", "u3"]
+
+def test_share_resource_needs_members():
+    with pytest.raises(ValueError):
+        CollaborationService(graph_service=_RecordingGraph()).share_resource("car-1", [])
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(collaboration_service, "get_redis", lambda: client)
+    return client
+
+def test_link_twins_replaces_the_members(redis_client):
+    service = CollaborationService(graph_service=_RecordingGraph())
+    service.link_twins("s1", ["u1", "u2"])
+    result = service.link_twins("s1", ["u2", "u3", "u3"])
+
+    assert result["members"] == ["u2", "u3"]
+    assert service.get_members("s1") == ["u2", "u3"]
+    assert service.get_members("nope") == []
+
+def test_reading_members_extends_the_session_ttl(redis_client):
+    service = CollaborationService(graph_service=_RecordingGraph())
+    service.link_twins("s1", ["u1"])
+    redis_client.expire("collab:session:s1:members", 5)
+
+    service.get_members("s1")
+    assert redis_client.ttl("collab:session:s1:members") == service.ttl_seconds
+
+def test_user_sessions_skip_sessions_the_user_left_or_that_expired(redis_client):
+    service = CollaborationService(graph_service=_RecordingGraph())
+    service.link_twins("s1", ["u1", "u2"])
+    service.link_twins("s2", ["u1"])
+    service.link_twins("s3", ["u1"])
+    service.link_twins("s1", ["u2"])            # u1 dropped from s1; its reverse index still lists s1
+    redis_client.delete("collab:session:s3:members")  # Expired
+
+    assert redis_client.smembers("collab:user:u1:sessions") == {b"s1", b"s2", b"s3"}
+    assert service.get_user_sessions("u1") == ["s2"]
+    assert service.get_user_sessions("u2") == ["s1"]
+    assert service.get_user_sessions("u4") == []
@@ -0,0 +1,37 @@
+import asyncio
+import json
+import pytest
+from app.services.fake_llm import FakeLLM, FakeLLMError, FakeMessage
+from app.services.inference_batching import ActivityListParser, format_batch_items
+
+class _Schema:
+    def __init__(self, name, type="string"):
+        self.name, self.type, self.description = name, type, name
+
+SCHEMAS = [_Schema("activity_type"), _Schema("description"), _Schema("carbon_estimate", "float"),
+           _Schema("confidence", "float"), _Schema("reasoning")]
+
+def test_batch_answers_parse_with_the_list_parser():
+    texts = ["Uber ride 12 km downtown", "Electricity bill 300 kWh", "Lunch at a cafe, $18"]
+    llm = FakeLLM(latency_ms=0, latency_sigma=0, latency_ms_per_item=0, error_rate=0, seed=1)
+    prompt = (f"DATA:\n{format_batch_items(texts)}\n\n"
+              "INSTRUCTIONS: One JSON record per item; a flight costing $900 counts as Travel.")
+    response = asyncio.run(llm.ainvoke([FakeMessage(prompt)]))
+    parsed = ActivityListParser(SCHEMAS).parse(response.content, expected=len(texts))
+    assert sorted(parsed) == [0, 1, 2]
+    assert parsed[0]["activity_type"] == "Travel"
+    # The last item is answered from its own text only, not the instructions that follow it
+    assert parsed[2]["activity_type"] == "Food"
+    assert parsed[2]["carbon_estimate"] == pytest.approx(18 * 0.3)
+
+def test_single_answer_is_one_json_record():
+    llm = FakeLLM(latency_ms=0, latency_sigma=0, error_rate=0, seed=1)
+    response = asyncio.run(llm.ainvoke([FakeMessage("DATA: Flight 900 km\n\nINSTRUCTIONS: ...")]))
+    record = json.loads(response.content.strip("`").removeprefix("json"))
+    assert {s.name for s in SCHEMAS} <= set(record)
+
+def test_errors_are_retried_then_raised():
+    llm = FakeLLM(latency_ms=0, latency_sigma=0, error_rate=1.0, max_retries=2, retry_backoff_ms=0, seed=1)
+    with pytest.raises(FakeLLMError):
+        asyncio.run(llm.ainvoke([FakeMessage("DATA: x\n\nINSTRUCTIONS: ...")]))
+    assert llm.calls == 3
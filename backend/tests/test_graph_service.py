@@ -0,0 +1,130 @@
+import asyncio
+import threading
+from app.services import graph_service
+from app.services.graph_service import AsyncGraphService, GraphService
+
+class _RecordingSession:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, work):
+        return work(self)
+
+    def run(self, query, **params):
+        self.calls.append((query, params))
+        return self
+
+    def consume(self):
+        return None
+
+class _RecordingDriver:
+    def __init__(self):
+        self.calls = []
+
+    def get_session(self):
+        return _RecordingSession(self.calls)
+
+def _service():
+    service = GraphService()
+    service.driver = _RecordingDriver()
+    return service
+
+def test_nodes_are_grouped_by_label_and_batched():
+    service = _service()
+    nodes = [{"label": "Activity", "properties": {"id": f"a{i}"}} for i in range(5)]
+    nodes += [{"label": "User", "properties": {"id": "u1"}}]
+    assert service.create_nodes(nodes, batch_size=2) == 6
+    queries = [q for q, _ in service.driver.calls]
+    assert sum(":Activity" in q for q in queries) == 3  # 2 + 2 + 1 rows
+    assert sum(":User" in q for q in queries) == 1
+    assert all(q.startswith("UNWIND $rows") for q in queries)
+
+def test_allowlists_still_apply_to_bulk_writes():
+    service = _service()
+    assert service.create_nodes([{"label": "User) DETACH DELETE n //", "properties": {"id": "x"}}]) == 0
+    edges = [{"source_id": "u1", "target_id": "a1", "rel_type": "PERFORMED"},
+             {"source_id": "u1", "target_id": "a2", "rel_type": "OWNS]->() DELETE r //"}]
+    assert service.create_relationships(edges) == 1
+    (query, params), = service.driver.calls
+    assert ":PERFORMED" in query and params["rows"][0]["weight"] == 1.0
+
+def test_edge_lookups_are_label_scoped():
+    service = _service()
+    edges = [{"source_id": "u1", "target_id": "a1", "rel_type": "PERFORMED"},
+             {"source_id": "a1", "target_id": "a2", "rel_type": "IMPACTS",
+              "source_label": "Activity", "target_label": "Activity"},
+             {"source_id": "a1", "target_id": "x", "rel_type": "IMPACTS"}]  # Labels unknown: skipped
+    assert service.create_relationships(edges) == 2
+    queries = [q for q, _ in service.driver.calls]
+    assert "MATCH (a:User {id: row.source_id})" in queries[0]
+    assert "MATCH (b:Activity {id: row.target_id})" in queries[1]
+
+class _AsyncResult:
+    def __init__(self, records):
+        self.records = records
+
+    async def single(self):
+        return self.records[0]
+
+    async def consume(self):
+        return None
+
+    def __aiter__(self):
+        async def _gen():
+            for record in self.records:
+                yield record
+        return _gen()
+
+class _AsyncSession:
+    def __init__(self, calls, records):
+        self.calls, self.records = calls, records
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query, **params):
+        self.calls.append((query, params))
+        return _AsyncResult(self.records)
+
+class _AsyncDriver:
+    def __init__(self, records):
+        self.calls, self.records = [], records
+
+    def get_session(self):
+        return _AsyncSession(self.calls, self.records)
+
+def test_async_simulate_impact_matches_the_sync_result_format():
+    service = AsyncGraphService()
+    service.driver = _AsyncDriver([{"target": "a1", "label": ["Activity"], "action": "PERFORMED", "weight": 0.5}])
+    impacts = asyncio.run(service.simulate_impact("u1", 10.0))
+    assert impacts == [{"target": "a1", "label": "Activity", "action": "PERFORMED", "magnitude": 5.0}]
+    assert "MATCH (start:User {id: $start_id})" in service.driver.calls[0][0]
+    assert asyncio.run(service.simulate_impact("u1", 10.0, start_label="Nope")) == []
+
+def test_async_writes_use_the_allowlisted_queries_and_invalidate_twins(monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(graph_service, "invalidate_twin_graphs", lambda: invalidated.append(threading.get_ident()))
+    service = AsyncGraphService()
+    service.driver = _AsyncDriver([["node"]])
+
+    assert asyncio.run(service.create_node("User", {"id": "u1", "name": "Ada"})) == "node"
+    asyncio.run(service.create_relationship("u1", "a1", "PERFORMED", weight=0.5))
+    (node_query, node_params), (link_query, link_params) = service.driver.calls
+    assert node_query.startswith("MERGE (n:User {id: $id})") and node_params["props"]["name"] == "Ada"
+    assert "MATCH (a:User {id: $source_id})" in link_query and ":PERFORMED" in link_query
+    assert link_params == {"source_id": "u1", "target_id": "a1", "weight": 0.5}
+    assert len(invalidated) == 2
+    assert threading.get_ident() not in invalidated  # Ran off the event loop
+
+    assert asyncio.run(service.create_node("User) DETACH DELETE n //", {"id": "x"})) is None
+    asyncio.run(service.create_relationship("u1", "a1", "OWNS]->() DELETE r //"))
+    assert len(service.driver.calls) == 2 and len(invalidated) == 2
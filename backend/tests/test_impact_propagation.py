@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from app.services import impact_propagation
+from app.services.impact_propagation import ImpactPropagationEngine, TwinGraph
+
+# Location -> Source -> Activity chain, plus a cycle back to the location
+EDGES = [
+    ("loc", "Location", "src", "Source", 0.5),
+    ("src", "Source", "act1", "Activity", 0.8),
+    ("src", "Source", "act2", "Activity", None),
+    ("act2", "Activity", "loc", "Location", 0.1),
+]
+
+class _StaticEngine(ImpactPropagationEngine):
+    loads = 0
+
+    def _load_edges(self, user_id):
+        self.loads += 1
+        return EDGES
+
+@pytest.fixture(autouse=True)
+def _no_redis(monkeypatch):
+    monkeypatch.setattr(impact_propagation, "get_redis", lambda: (_ for _ in ()).throw(ConnectionError("down")))
+
+def test_csr_layout():
+    graph = TwinGraph.from_edges(EDGES)
+    src = graph.index_of("src")
+    targets = set(graph.node_ids[graph.indices[graph.indptr[src]:graph.indptr[src + 1]]])
+    assert targets == {"act1", "act2"}
+    assert graph.labels[graph.index_of("loc")] == "Location"
+    assert graph.index_of("missing") is None
+
+def test_damped_multi_hop_impact_for_many_scenarios():
+    engine = _StaticEngine()
+    by_loc, by_src = engine.propagate("u1", [{"loc": 10.0}, {"src": 1.0, "missing": 5.0}], depth=3, damping=0.5)
+    impact = {r["target"]: (r["magnitude"], r["depth"]) for r in by_loc}
+    assert impact["src"] == pytest.approx((5.0, 1))           # 10 * 0.5
+    assert impact["act1"] == pytest.approx((2.0, 2))          # 5 * 0.8 * 0.5
+    assert impact["act2"] == pytest.approx((2.5, 2))          # 5 * 1.0 * 0.5
+    assert impact["loc"] == pytest.approx((0.125, 3))         # 2.5 * 0.1 * 0.5, through the cycle
+    assert [r["target"] for r in by_src][:2] == ["act2", "act1"]  # Sorted by |magnitude|
+
+def test_subgraph_is_cached_until_a_graph_write():
+    engine = _StaticEngine()
+    engine.propagate("u1", [{"loc": 1.0}])
+    engine.propagate("u1", [{"loc": 2.0}])
+    assert engine.loads == 1
+    impact_propagation.invalidate_twin_graphs(["u1"])
+    engine.propagate("u1", [{"loc": 1.0}])
+    assert engine.loads == 2
+
+def test_a_scoped_write_keeps_other_users_twins_cached():
+    engine = _StaticEngine()
+    engine.twin_graph("alice")
+    engine.twin_graph("bob")
+    impact_propagation.invalidate_twin_graphs(["alice"])
+    engine.twin_graph("bob")
+    assert engine.loads == 2
+    engine.twin_graph("alice")
+    assert engine.loads == 3
+
+    impact_propagation.invalidate_twin_graphs()  # Unscoped: every twin reloads
+    engine.twin_graph("bob")
+    assert engine.loads == 4
+
+def test_expand_matches_dense_matrix_product():
+    rng = np.random.default_rng(3)
+    edges = [(f"n{a}", "Activity", f"n{b}", "Activity", float(w))
+             for a, b, w in zip(rng.integers(0, 30, 200), rng.integers(0, 30, 200), rng.random(200))]
+    graph = TwinGraph.from_edges(edges)
+    dense = np.zeros((len(graph.node_ids),) * 2)
+    for a, _, b, _, w in edges:
+        dense[graph.index_of(a), graph.index_of(b)] += w
+    frontier = rng.random((len(graph.node_ids), 3)) * (rng.random((len(graph.node_ids), 1)) < 0.3)
+    assert np.allclose(graph.expand(frontier), dense.T @ frontier)
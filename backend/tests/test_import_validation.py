@@ -0,0 +1,47 @@
+import io
+import uuid
+import pandas as pd
+from app.services.import_validation import ActivityImportValidator, RejectionReport
+
+DEFAULT_USER = uuid.UUID("22222222-2222-2222-2222-222222222222")
+
+CSV = (
+    "activity_type,description,carbon_estimate,user_id\n"
+    "Travel,Train to work,1.5,\n"
+    "Food,Groceries,abc,\n"
+    ",Missing type,2.0,not-a-uuid\n"
+    "Housing,Heating,-3,\n"
+    "Housing,Solar,4.0,11111111-1111-1111-1111-111111111111\n"
+)
+
+def _frame(text: str = CSV) -> pd.DataFrame:
+    return pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False)
+
+def test_validator_accepts_clean_rows_and_resolves_user_ids():
+    result = ActivityImportValidator(DEFAULT_USER).validate(_frame())
+
+    assert list(result.rows['user_id']) == [str(DEFAULT_USER), "11111111-1111-1111-1111-111111111111"]
+    assert list(result.rows['carbon_estimate']) == [1.5, 4.0]
+    assert result.rejected_count == 3
+
+def test_validator_reports_every_failed_check_with_row_numbers():
+    result = ActivityImportValidator(DEFAULT_USER).validate(_frame(), row_offset=100)
+
+    assert result.rejections.to_dict('records') == [
+        {"row": 102, "column": "carbon_estimate", "reason": "not a number"},
+        {"row": 103, "column": "activity_type", "reason": "missing value"},
+        {"row": 103, "column": "user_id", "reason": "invalid UUID"},
+        {"row": 104, "column": "carbon_estimate", "reason": "negative value"},
+    ]
+
+def test_rejection_report_spills_to_disk_past_inline_limit(tmp_path):
+    rejections = ActivityImportValidator(DEFAULT_USER).validate(_frame()).rejections
+    report = RejectionReport("user-1", inline_limit=2, report_dir=str(tmp_path))
+    report.add(rejections)
+
+    summary = report.as_dict()
+    assert summary["rejections_total"] == 4
+    assert len(summary["rejections"]) == 2
+    path = RejectionReport.path_for("user-1", summary["rejection_report_id"], report_dir=str(tmp_path))
+    assert len(pd.read_csv(path)) == 4
+    assert RejectionReport.path_for("user-1", "../../etc/passwd", report_dir=str(tmp_path)) is None
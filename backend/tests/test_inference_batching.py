@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+import pytest
+from app.services.inference_batching import ActivityListParser, estimate_tokens, plan_batches
+
+SCHEMAS = [
+    SimpleNamespace(name="activity_type", type="string", description="Category"),
+    SimpleNamespace(name="carbon_estimate", type="float", description="kg CO2e"),
+]
+
+def test_plan_batches_respects_token_budget_and_item_cap():
+    texts = ["x" * 400] * 10  # ~101 tokens + overhead each
+    batches = plan_batches(texts, token_budget=350, max_items=10, fixed_tokens=100)
+    assert [len(b) for b in batches] == [2, 2, 2, 2, 2]
+    assert sum(batches, []) == list(range(10))
+
+    assert [len(b) for b in plan_batches(["a"] * 7, token_budget=10_000, max_items=3)] == [3, 3, 1]
+
+def test_oversized_item_gets_its_own_batch():
+    texts = ["short", "y" * 10_000, "short"]
+    assert plan_batches(texts, token_budget=estimate_tokens("y" * 100), max_items=10) == [[0], [1], [2]]
+
+def test_list_parser_keeps_valid_records_by_index():
+    parser = ActivityListParser(SCHEMAS)
+    response = """Here you go:
+```json
+[
+  {"index": 1, "activity_type": "Food", "carbon_estimate": "2.5"},
+  {"index": 0, "activity_type": "Travel", "carbon_estimate": 120},
+  {"index": 2, "activity_type": "Food", "carbon_estimate": "lots"},
+  {"index": 7, "activity_type": "Food", "carbon_estimate": 1.0},
+  {"index": 3, "activity_type": "Housing"}
+]
+```"""
+    parsed = parser.parse(response, expected=4)
+    assert parsed == {
+        0: {"activity_type": "Travel", "carbon_estimate": 120.0},
+        1: {"activity_type": "Food", "carbon_estimate": 2.5},
+    }
+
+def test_list_parser_rejects_non_list_output():
+    with pytest.raises(ValueError):
+        ActivityListParser(SCHEMAS).parse("I could not do that.", expected=2)
@@ -0,0 +1,38 @@
+import redis
+from app.services import inference_cache
+from app.services.inference_cache import InferenceCache, LRUDict, prompt_fingerprint
+
+def _redis_down():
+    raise redis.ConnectionError("redis unavailable")
+
+def test_fingerprint_changes_with_prompt_or_schema():
+    base = prompt_fingerprint("template {data}", "schema: a, b", "model")
+    assert base == prompt_fingerprint("template {data}", "schema: a, b", "model")
+    assert base != prompt_fingerprint("template v2 {data}", "schema: a, b", "model")
+    assert base != prompt_fingerprint("template {data}", "schema: a, b, c", "model")
+
+def test_keys_are_content_addressed_per_fingerprint():
+    a, b = InferenceCache("aaaa"), InferenceCache("bbbb")
+    assert a.key("Flight JFK -> LAX") == a.key("Flight JFK -> LAX")
+    assert a.key("Flight JFK -> LAX") != a.key("Flight JFK -> SFO")
+    assert a.key("Flight JFK -> LAX") != b.key("Flight JFK -> LAX")
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUDict(2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+
+def test_local_tier_serves_hits_when_redis_is_down(monkeypatch):
+    monkeypatch.setattr(inference_cache, "get_redis", _redis_down)
+    cache = InferenceCache("fp")
+
+    assert cache.get("receipt [EMAIL]") is None
+    cache.set("receipt [EMAIL]", {"carbon_estimate": 4.2})
+
+    hit = cache.get("receipt [EMAIL]")
+    assert hit == {"carbon_estimate": 4.2}
+    hit["cached"] = True
+    assert cache.get("receipt [EMAIL]") == {"carbon_estimate": 4.2}
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+import fakeredis
+import pytest
+from app.api import activities
+from app.services import inference_events
+from app.services.inference_events import CHANNEL_PREFIX, InferenceEventHub, publish_inference_event
+
+def _message(user_id, task_id):
+    return {"type": "pmessage", "channel": f"{CHANNEL_PREFIX}{user_id}".encode(),
+            "data": json.dumps({"task_id": task_id, "status": "completed"}).encode()}
+
+def test_events_fan_out_to_the_owners_connections_only():
+    async def scenario():
+        hub = InferenceEventHub(queue_size=1, ready_timeout=0)  # No Redis here
+        try:
+            async with hub.subscribe("alice") as first, hub.subscribe("alice") as second, \
+                    hub.subscribe("bob") as other:
+                hub.dispatch(_message("alice", "t1"))
+                hub.dispatch(_message("alice", "t2"))  # Queues are full: dropped, not blocking
+                assert first.get_nowait()["task_id"] == "t1"
+                assert second.get_nowait()["task_id"] == "t1"
+                assert other.empty()
+            assert hub.subscriber_count() == 0
+        finally:
+            await hub.close()
+
+    asyncio.run(scenario())
+
+def test_subscribe_returns_once_the_redis_subscription_is_live(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(inference_events.aioredis, "from_url", lambda url: fakeredis.FakeAsyncRedis(server=server))
+    publisher = fakeredis.FakeRedis(server=server)
+    monkeypatch.setattr(inference_events, "get_redis", lambda: publisher)
+
+    async def scenario():
+        hub = InferenceEventHub()
+        try:
+            async with hub.subscribe("alice") as events:
+                # Published right away: lost if the pattern subscription weren't active yet
+                publish_inference_event("alice", "t1", "completed")
+                event = await asyncio.wait_for(events.get(), 1.0)
+                assert event == {"task_id": "t1", "status": "completed"}
+        finally:
+            await hub.close()
+
+    asyncio.run(scenario())
+
+@pytest.mark.parametrize("wait", [0, 5])
+def test_task_status_is_read_off_the_event_loop(monkeypatch, wait):
+    threads = []
+
+    def _result(task_id):
+        threads.append(threading.get_ident())
+        return SimpleNamespace(state="SUCCESS", result={"carbon_estimate": 1.0}, ready=lambda: True)
+    monkeypatch.setattr(activities, "AsyncResult", _result)
+
+    @asynccontextmanager
+    async def _subscribe(user_id):
+        yield asyncio.Queue()
+    monkeypatch.setattr(activities.inference_events, "subscribe", _subscribe)
+
+    result = asyncio.run(activities.get_inference_result("t1", wait, "alice"))
+    assert result["status"] == "completed"
+    assert threads and threading.get_ident() not in threads
@@ -0,0 +1,24 @@
+from prometheus_client import REGISTRY
+from app.services.inference_timing import StageTimer
+
+def _observations(stage, method):
+    return REGISTRY.get_sample_value("ecotwin_inference_stage_seconds_count",
+                                     {"stage": stage, "inference_method": method}) or 0
+
+def test_stages_are_observed_under_the_final_method():
+    timer = StageTimer()
+    with timer.stage("rules"):
+        pass
+    with timer.stage("rules"):
+        pass
+    timer.observe("test_method")
+    assert set(timer.durations) == {"rules", "total"}
+    assert _observations("rules", "test_method") == 1  # Repeated stages are summed into one sample
+    assert _observations("total", "test_method") == 1
+
+def test_label_overrides_the_result_method():
+    timer = StageTimer()
+    timer.label = "test_cache_hit"
+    timer.observe("test_llm")
+    assert _observations("total", "test_cache_hit") == 1
+    assert _observations("total", "test_llm") == 0
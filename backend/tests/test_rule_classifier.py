@@ -0,0 +1,48 @@
+import pytest
+from app.services.connectors.anonymizer import Anonymizer
+from app.services.rule_classifier import PhraseAutomaton, RuleClassifier, extract_quantities
+
+def test_automaton_reports_overlapping_phrases_in_one_pass():
+    automaton = PhraseAutomaton({("uber",): "ride", ("uber", "eats"): "delivery", ("eats",): "food"})
+    matches = sorted(automaton.find(["my", "uber", "eats", "order"]))
+    assert matches == [(1, 1, "ride"), (1, 2, "delivery"), (2, 1, "food")]
+
+def test_extract_quantities_normalizes_units_and_prefers_total():
+    q = extract_quantities("Trip 10 miles, fare $12.00, tip $3.00. Total $1,015.50 and 40 L fuel")
+    assert q["km"] == pytest.approx(16.09)
+    assert q["money"] == 1015.50
+    assert q["liter"] == 40.0
+
+def test_quantity_scales_the_estimate():
+    electricity = RuleClassifier.classify("Your electricity bill: 350 kWh, amount due $52.30")
+    assert electricity.rule.activity_type == "Housing"
+    assert electricity.carbon_estimate == pytest.approx(140.0)
+    assert electricity.confidence >= 0.7
+
+    groceries = RuleClassifier.to_result(
+        RuleClassifier.classify("Receipt from Whole Foods: Organic Steaks, Milk, and Veggies. Total $120.45"),
+        "rule_engine",
+    )
+    assert groceries["activity_type"] == "Food"
+    assert groceries["carbon_estimate"] > 0
+    assert groceries["inference_method"] == "rule_engine"
+
+def test_unknown_and_ambiguous_inputs_stay_unsure():
+    unknown = RuleClassifier.classify("Hello there")
+    assert unknown.rule is None and unknown.confidence < 0.5
+
+    mixed = RuleClassifier.classify("Hotel dinner")
+    assert mixed.ambiguous and mixed.confidence < 0.7
+
+@pytest.mark.parametrize("text,label", [
+    ("please call 5551234567 to confirm", None),
+    ("Your flight LHR to JFK is confirmed. Call 5551234567 to change your booking", "Air travel"),
+    ("Lyft receipt: 12 km trip downtown, total $18.40. Questions? Call 5551234567", "Ride-hailing trip"),
+])
+def test_anonymizer_placeholders_are_not_phrases(text, label):
+    anonymized = Anonymizer.strip_pii(text)
+    assert "[PHONE]" in anonymized
+
+    result = RuleClassifier.classify(anonymized)
+    assert (result.rule.label if result.rule else None) == label
+    assert not result.ambiguous
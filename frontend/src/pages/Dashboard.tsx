@@ -16,8 +16,8 @@ const Dashboard = () => {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const data = await activityService.getAll();
-                setActivities(data);
+                const page = await activityService.getAll();
+                setActivities(page.items);
                 setError(null); // Clear any previous errors on successful fetch
             } catch (err) {
                 console.error("Failed to fetch dashboard data:", err);
@@ -34,9 +34,19 @@ export interface Activity {
     raw_data?: string;
 }
 
+export interface ActivityPage {
+    items: Activity[];
+    next_cursor: string | null;
+}
+
 export const activityService = {
-    getAll: async (skip: number = 0, limit: number = 50) => {
-        const response = await apiClient.get<Activity[]>(`/activities?skip=${skip}&limit=${limit}`);
+    // Keyset pagination: pass the previous page's next_cursor to fetch the following page
+    getAll: async (cursor: string | null = null, limit: number = 50) => {
+        const params = new URLSearchParams({ limit: String(limit) });
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
+        const response = await apiClient.get<ActivityPage>(`/activities?${params.toString()}`);
         return response.data;
     },
 